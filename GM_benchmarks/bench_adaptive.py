@@ -0,0 +1,112 @@
+import math
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from GM_data import db_utilities
+from GM_data.db_setup import initialize_database
+from GM_detection_cropping.layout_cache import save_layout
+from GM_pipeline import adaptive
+from GM_pipeline.adaptive import AdaptiveSchedule
+
+
+# ========== ADAPTIVE SCHEDULE: A SIMULATED DAY ==========
+# Replays 24 hours of one meter in simulated time: two drawn dials whose needles turn with the gas used
+# (the second one ten times slower), idle most of the day with a few usage spells (showers, cooking,
+# heating bursts). The gas used between two probes is the flow integrated over that interval, so a
+# spell that starts between probes turns the needles too. Every probe goes through
+# AdaptiveSchedule.should_read on a real frame (cached layout, dial difference), with the
+# default settings (30 min base, 15 s fastest, 10 min slowest). Compared with a read every 15 s:
+# captures, full reads, how long each spell went unnoticed and the read spacing while gas flowed.
+# Then the aliasing case: exactly five turns of the first dial between two probes (30 ft³/h for a
+# 600 s probe interval), probed watching one dial and watching two.
+# Usage: python -m GM_benchmarks.bench_adaptive
+
+LOCATION = "bench_meter"
+FIXED_PERIOD = 15.0
+REVOLUTION = 1.0            # ft³ per turn of the least-significant dial
+SPELLS = [                  # (start hour, minutes, ft³ per hour)
+    (6.5, 12, 60.0), (7.25, 25, 25.0), (12.0, 8, 40.0), (18.0, 55, 30.0), (21.5, 5, 90.0),
+]
+
+
+BOXES = [{"x1": 50, "y1": 120, "x2": 290, "y2": 360}, {"x1": 350, "y1": 120, "x2": 590, "y2": 360}]
+
+
+def flow_at(hour):
+    return sum(rate for start, minutes, rate in SPELLS if start <= hour < start + minutes / 60)
+
+
+def gas_used(begin, end):
+    """ft³ used between two simulated times (s): each spell's rate over its overlap with the interval"""
+    return sum(rate * max(0.0, min(end, (start + minutes / 60) * 3600) - max(begin, start * 3600)) / 3600
+               for start, minutes, rate in SPELLS)
+
+
+def dial_frame(used, noise):
+    """640x480 frame with two dials; the needle angles follow the gas used, least significant first"""
+    frame = np.full((480, 640, 3), 200, np.uint8)
+    for box, revolution in zip(BOXES, (REVOLUTION, 10 * REVOLUTION)):
+        center = ((box["x1"] + box["x2"]) // 2, (box["y1"] + box["y2"]) // 2)
+        cv2.circle(frame, center, 110, (240, 240, 240), -1)
+        angle = 2 * math.pi * (used % revolution) / revolution
+        tip = (int(center[0] + 95 * math.sin(angle)), int(center[1] - 95 * math.cos(angle)))
+        cv2.line(frame, center, tip, (30, 30, 30), 8)
+    return cv2.add(frame, noise)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    noises = [rng.integers(0, 10, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        initialize_database(path)
+        db_utilities.use_database(path)
+        save_layout(LOCATION, dial_frame(0.0, noises[0]), BOXES)
+
+        schedule = AdaptiveSchedule(LOCATION)
+        now, used, probe_time = 0.0, 0.0, 0.0
+        reads, flowing_reads, noticed = [], [], {}
+        while now < 24 * 3600:
+            frame = dial_frame(used, noises[len(reads) % len(noises)])
+            start = time.perf_counter()
+            read = schedule.should_read(frame, now)
+            probe_time += time.perf_counter() - start
+            hour = now / 3600
+            if read:
+                reads.append(now)
+                if flow_at(hour):
+                    flowing_reads.append(now)
+            for i, (begin, minutes, _) in enumerate(SPELLS):
+                if i not in noticed and read and begin <= hour < begin + minutes / 60 + 0.5:
+                    noticed[i] = now - begin * 3600
+            step = schedule.next_interval()
+            used += gas_used(now, now + step)
+            now += step
+
+        probes = schedule.stats["probes"]
+        fixed = int(24 * 3600 / FIXED_PERIOD)
+        print(f"{'every 15 s':<26} {fixed:6d} captures {fixed:6d} reads")
+        print(f"{'adaptive':<26} {probes:6d} captures {len(reads):6d} reads "
+              f"({probes / fixed:.1%} of the captures, {len(reads) / fixed:.1%} of the reads)")
+        print(f"probe cost: {probe_time / probes * 1000:.2f} ms (no detection or dial reading)")
+        print(f"spell noticed after (s): {[round(noticed.get(i, float('nan'))) for i in range(len(SPELLS))]}")
+        gaps = np.diff(flowing_reads)
+        gaps = gaps[gaps < 600]
+        print(f"read spacing while gas flows: median {np.median(gaps):.0f} s, {len(flowing_reads)} reads during "
+              f"{sum(m for _, m, _ in SPELLS)} min of flow")
+
+        for watched in (1, 2):
+            adaptive.WATCHED_DIALS = watched
+            schedule = AdaptiveSchedule(LOCATION)
+            schedule.should_read(dial_frame(0.3, noises[0]), 0.0)
+            moved = schedule.should_read(dial_frame(0.3 + 5 * REVOLUTION, noises[1]), 600.0)
+            print(f"five whole turns between probes, {watched} dial(s) watched: {'read' if moved else 'MISSED'}")
+        db_utilities.close_connections()
+
+
+if __name__ == "__main__":
+    main()
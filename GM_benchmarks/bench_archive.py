@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+from GM_benchmarks.bench_utils import load_samples
+from GM_detection_cropping.detectors import get_detector
+from GM_pipeline import metrics
+from RP_Camera.archive import ArchiveManager
+
+
+# ========== IMAGE ARCHIVE: BYTES PER READING, CALLER COST, RETENTION ==========
+# Replays a stream of 15-second frames of one meter (sensor noise on every frame, the reading moving
+# every 8th frame, 1 in 10 readings rejected) through the archive manager, against the old behaviour
+# of one full-resolution JPEG per frame: disk bytes per reading, time spent on the reading path per
+# frame, duplicates skipped, and the size cap holding once it is set below the archive's size.
+# Usage: python -m GM_benchmarks.bench_archive [frames]
+
+
+def frames(count, image, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = [rng.integers(0, 12, image.shape, dtype=np.uint8) for _ in range(4)]
+    for i in range(count):
+        yield i, cv2.subtract(cv2.add(image, noise[i % 4]), noise[(i + 1) % 4])  # saturating, like a sensor
+
+
+def old_archive(directory, count, image):
+    """One JPEG per frame, as the camera controller archived them before the archive manager"""
+    total = 0
+    for i, frame in frames(count, image):
+        path = os.path.join(directory, f"GMCapture_{i:05d}.jpg")
+        cv2.imwrite(path, frame)
+        total += os.path.getsize(path)
+    return total
+
+
+def new_archive(directory, count, image, crops, max_bytes):
+    archive = ArchiveManager(directory, max_bytes=max_bytes, write_rate=1024 ** 3, queue_size=count)
+    start, caller = datetime(2025, 1, 1), 0.0
+    moved = [cv2.flip(c, 1) for c in crops]  # the needles in another position
+    for i, frame in frames(count, image):
+        failed = i % 10 == 9
+        t = time.perf_counter()
+        archive.archive(frame, start + timedelta(seconds=15 * i), "test_meter", "full" if failed else "crops",
+                        crops=None if failed else (moved if (i // 8) % 2 else crops),
+                        reading=None if failed else 1000000 + i // 8)
+        caller += time.perf_counter() - t
+    archive.close()
+    return caller, archive.usage()
+
+
+def disk_bytes(directory):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, names in os.walk(directory) for f in names)
+
+
+def main(count=200):
+    image = load_samples()["GM5"]
+    crops = [image[b["y1"]:b["y2"], b["x1"]:b["x2"]].copy() for b in get_detector("hough").detect(image)]
+    print(f"frame {image.shape[1]}x{image.shape[0]}, {len(crops)} dial crops, {count} frames")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_dir, new_dir, capped_dir = (os.path.join(tmp, d) for d in ("old", "new", "capped"))
+        os.makedirs(old_dir)
+        old = old_archive(old_dir, count, image)
+        print(f"{'one full JPEG per frame':<34} {old / count / 1024:9.1f} KiB/reading")
+
+        metrics.drain()
+        caller, (images, total) = new_archive(new_dir, count, image, crops, max_bytes=10 ** 12)
+        counters = metrics.drain()["counters"]
+        print(f"{'archive manager':<34} {disk_bytes(new_dir) / count / 1024:9.1f} KiB/reading  "
+              f"({images} images: {counters.get('archive_crops', 0)} crops, {counters.get('archive_full', 0)} full, "
+              f"{counters.get('archive_duplicates', 0)} duplicates skipped)")
+        print(f"{'reading-path cost per frame':<34} {caller / count * 1000:9.2f} ms")
+
+        cap = total // 4
+        new_archive(capped_dir, count, image, crops, max_bytes=cap)
+        print(f"size cap {cap / 1024:.0f} KiB: archive holds {disk_bytes(capped_dir) / 1024:.0f} KiB "
+              f"({metrics.drain()['counters'].get('archive_deleted', 0)} oldest images deleted)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
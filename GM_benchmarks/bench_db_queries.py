@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from GM_data import db_utilities
+from GM_data.db_setup import initialize_database
+
+
+# ========== DAILY QUERY: v0 LIKE SCAN VS v1 INDEXED RANGE ==========
+# Builds a synthetic v0 database (TEXT readings, no indexes) with 15-second readings from several
+# meters, times the old LIKE-prefix daily query, migrates it in place and times the range queries.
+# Usage: python -m GM_benchmarks.bench_db_queries [rows]
+
+LOCATIONS = [f"meter_{i:02d}" for i in range(10)]
+V0_TABLE = """
+    CREATE TABLE readings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, reading TEXT, location TEXT,
+        confidence REAL, image_path TEXT, status TEXT DEFAULT 'success', notes TEXT
+    )
+"""
+
+
+def synthetic_rows(count, start=datetime(2025, 1, 1)):
+    for i in range(count):
+        ts = start + timedelta(seconds=15 * (i // len(LOCATIONS)))
+        yield ts.isoformat(timespec="seconds"), str(1000000 + i // 7), LOCATIONS[i % len(LOCATIONS)], "success"
+
+
+def build_v0(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute(V0_TABLE)
+    conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO readings (timestamp, reading, location, status) VALUES (?, ?, ?, ?)",
+                     synthetic_rows(count))
+    conn.commit()
+    conn.close()
+
+
+def timed(label, fn, repeats=5):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        rows = fn()
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"{label:<45} {elapsed * 1000:9.2f} ms  ({len(rows)} rows)")
+
+
+def main(count=2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        build_v0(path, count)
+        print(f"built {count} rows in {time.perf_counter() - start:.1f} s")
+        day, location = "2025-01-10", LOCATIONS[3]
+
+        conn = sqlite3.connect(path)
+        timed("v0 LIKE day scan (all locations)", lambda: conn.execute(
+            "SELECT * FROM readings WHERE timestamp LIKE ? ORDER BY timestamp DESC", (f"{day}%",)).fetchall())
+        timed("v0 LIKE day scan (one location)", lambda: conn.execute(
+            "SELECT * FROM readings WHERE location = ? AND timestamp LIKE ? ORDER BY timestamp DESC",
+            (location, f"{day}%")).fetchall())
+        conn.close()
+
+        start = time.perf_counter()
+        initialize_database(path)
+        print(f"migrated to v1 in {time.perf_counter() - start:.1f} s")
+
+        db_utilities.use_database(path)
+        try:
+            timed("v1 get_readings_by_date (all locations)", lambda: db_utilities.get_readings_by_date(day))
+            timed("v1 get_readings_by_date (one location)", lambda: db_utilities.get_readings_by_date(day, location))
+            timed("v1 get_readings_between (one location, 1 h)", lambda: db_utilities.get_readings_between(
+                location, f"{day}T06:00:00", f"{day}T07:00:00"))
+        finally:
+            db_utilities.close_connections()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,160 @@
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import requests
+
+from GM_benchmarks.bench_suite import detections_path
+from GM_benchmarks.bench_utils import load_samples, summarize
+from GM_detection_cropping import offline_queue
+from GM_detection_cropping.detectors import DetectorUnavailable, RoboflowDetector
+
+
+# ========== HOSTED DETECTOR CLIENT AGAINST A LOCAL STAND-IN ==========
+# A local HTTP server answers like the hosted model (the recorded detections.json responses), or
+# fails on purpose, to check the client's connection reuse, retries, timeouts and the offline queue:
+#
+#   python -m GM_benchmarks.bench_detection_client
+
+REQUESTS = 30
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers POSTs with the configured response; mode: ok, flaky (503 twice, then ok), hang, down"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the hosted service
+    disable_nagle_algorithm = True
+    response = {"predictions": []}  # recorded on a frame_width wide frame
+    frame_width = 1
+    mode = "ok"
+    hits = 0
+    uploaded = 0
+    connections = set()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        cls = type(self)
+        cls.hits += 1
+        cls.uploaded += length
+        cls.connections.add(self.client_address)
+        if cls.mode == "hang":
+            time.sleep(2.0)
+        if cls.mode == "down" or (cls.mode == "flaky" and cls.hits <= 2):
+            self._send(503, b"{}")
+            return
+        # Like the hosted model, answer in the coordinates of the uploaded (downscaled) image
+        upload = cv2.imdecode(np.frombuffer(body[body.find(b"\xff\xd8"):], dtype=np.uint8), cv2.IMREAD_COLOR)
+        scale = upload.shape[1] / float(cls.frame_width) if upload is not None else 1.0
+        predictions = [dict(p, x=p["x"] * scale, y=p["y"] * scale, width=p["width"] * scale,
+                            height=p["height"] * scale) for p in cls.response["predictions"]]
+        self._send(200, json.dumps({"predictions": predictions}).encode())
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # the client gave up on a hung or failing request on purpose
+
+
+def reset(mode):
+    StandIn.mode, StandIn.hits, StandIn.uploaded, StandIn.connections = mode, 0, 0, set()
+
+
+def main():
+    image = load_samples()["GM5"]
+    with open(detections_path) as f:
+        StandIn.response = json.load(f)["GM5"]
+    StandIn.frame_width = image.shape[1]
+
+    server = StandInServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/detect"
+    detector = RoboflowDetector(url, "key", timeout=(0.5, 1.0), retries=2, backoff=0.05)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    # 1. Connection reuse and upload size. Over loopback the transfer itself is free (and there is no TLS
+    #    handshake to save), so the times mostly show the encode cost; the bytes show the network saving.
+    reset("ok")
+    with quiet:
+        times = []
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            boxes = detector.detect(image)
+            times.append(time.perf_counter() - start)
+    print(f"pooled session, downscaled upload   {summarize(times)}")
+    print(f"  {len(boxes)} boxes, {StandIn.hits} requests over {len(StandIn.connections)} connection(s), "
+          f"{StandIn.uploaded / StandIn.hits / 1024:.0f} KB per upload")
+
+    reset("ok")
+    times = []
+    for _ in range(REQUESTS):  # the previous client: a new connection and a full-size JPEG every time
+        start = time.perf_counter()
+        _, buf = cv2.imencode(".jpg", image)
+        requests.post(url, files={"file": ("frame.jpg", buf.tobytes(), "image/jpeg")})
+        times.append(time.perf_counter() - start)
+    print(f"requests.post, full-size upload     {summarize(times)}")
+    print(f"  {StandIn.hits} requests over {len(StandIn.connections)} connection(s), "
+          f"{StandIn.uploaded / StandIn.hits / 1024:.0f} KB per upload")
+
+    # 2. Retries: two 503s, then an answer
+    reset("flaky")
+    with quiet:
+        boxes = detector.detect(image)
+    print(f"flaky service: {len(boxes)} boxes after {StandIn.hits} attempts, first {boxes[0]}")
+
+    # 3. Timeouts: a hung service is given up on, in bounded time
+    for mode in ("hang", "down"):
+        reset(mode)
+        start = time.perf_counter()
+        try:
+            detector.detect(image)
+            print(f"❌ {mode} service: no error raised")
+        except DetectorUnavailable as e:
+            print(f"{mode} service: {e} after {StandIn.hits} attempts, {time.perf_counter() - start:.2f} s")
+
+    # 4. Offline queue: frames wait while the service is down and are read in order once it is back
+    with tempfile.TemporaryDirectory() as queue_dir:
+        read_order = []
+
+        def handler(frame, capture_time, image_path):
+            with quiet:
+                detector.detect(frame)
+            read_order.append(capture_time)
+
+        reset("down")
+        t0 = datetime(2026, 1, 1, 12, 0, 0)
+        with quiet:
+            for i in range(8):
+                offline_queue.enqueue(image, t0 + timedelta(seconds=15 * i), "bench", queue_dir=queue_dir)
+            offline_queue.drain("bench", handler, queue_dir=queue_dir)
+        print(f"service down: {offline_queue.backlog('bench', queue_dir)} frames queued, {len(read_order)} read")
+        reset("ok")
+        with quiet:
+            while offline_queue.drain("bench", handler, queue_dir=queue_dir):
+                pass
+        in_order = read_order == sorted(read_order)
+        print(f"service back: {len(read_order)} frames read {'in capture order' if in_order else 'OUT OF ORDER'}, "
+              f"{offline_queue.backlog('bench', queue_dir)} left")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
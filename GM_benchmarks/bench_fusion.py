@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from GM_benchmarks.bench_utils import labelled_dials
+from GM_pipeline import metrics
+from GM_reading.reading_main import (AGREE_DEG, circular_distance, fuse_readings, read_frames, start_reading_pool,
+                                     stop_reading_pool)
+
+
+# ========== MULTI-FRAME FUSION: SINGLE FRAME VS BURST ==========
+# Every labelled dial is "captured" as a burst of frames: sensor noise on all of them, and each frame
+# independently spoiled with probability BAD_SHARE (motion blur, or a glare spot on the dial). The
+# single-frame read uses the burst's first frame; the burst read starts with FIRST frames and adds
+# FIRST more while the dial disagrees, up to MAX_FRAMES, fusing the needle angles (fuse_readings).
+# Reports failed and misread dials (needle more than half a digit, 18°, off the label), the angle
+# error, the frames a burst needed, and the reading time of a first round on the pool vs one frame.
+# Usage: python -m GM_benchmarks.bench_fusion [trials per dial]
+
+FIRST, MAX_FRAMES = 2, 4
+BAD_SHARE = 0.3
+MISREAD_DEG = 18.0
+
+
+def spoil(crop, rng):
+    frame = cv2.add(crop, rng.integers(0, 14, crop.shape, dtype=np.uint8))
+    if rng.random() >= BAD_SHARE:
+        return frame
+    h, w = frame.shape[:2]
+    if rng.random() < 0.5:
+        length = int(rng.integers(9, 19))
+        kernel = np.zeros((length, length), np.float32)
+        kernel[length // 2, :] = 1.0 / length
+        m = cv2.getRotationMatrix2D((length / 2, length / 2), float(rng.uniform(0, 180)), 1.0)
+        return cv2.filter2D(frame, -1, cv2.warpAffine(kernel, m, (length, length)))
+    glare = frame.copy()
+    center = (int(rng.uniform(0.3, 0.7) * w), int(rng.uniform(0.3, 0.7) * h))
+    cv2.ellipse(glare, center, (w // 5, h // 8), float(rng.uniform(0, 180)), 0, 360, (255, 255, 255), -1)
+    return cv2.addWeighted(glare, 0.75, frame, 0.25, 0)
+
+
+def read_burst(frames, direction, parallel):
+    """Same rounds as main.read_burst, for one dial"""
+    results, pending = [], frames[:FIRST]
+    while True:
+        results += read_frames([[f] for f in pending], 1, parallel=parallel, directions=[direction])
+        fused = fuse_readings(results, 1, directions=[direction])
+        if fused["agreed"] or len(results) >= MAX_FRAMES:
+            return fused, len(results)
+        pending = frames[len(results):len(results) + FIRST]
+
+
+def summary(label, errors, used=None):
+    read = [e for e in errors if e is not None]
+    failed = len(errors) - len(read)
+    misread = sum(e > MISREAD_DEG for e in read)
+    line = (f"{label:<14} failed {failed / len(errors):6.1%}  misread {misread / len(errors):6.1%}  "
+            f"angle error median {statistics.median(read):5.1f}°  p95 {np.percentile(read, 95):5.1f}°")
+    if used:
+        line += f"  frames {statistics.mean(used):.2f} (agree within {AGREE_DEG:.0f}°)"
+    print(line)
+
+
+def main(trials=6):
+    rng = np.random.default_rng(0)
+    dials = labelled_dials()
+    single, fused, used = [], [], []
+    with contextlib.redirect_stdout(io.StringIO()):  # every read narrates its dials
+        for crop, label in dials:
+            for _ in range(trials):
+                frames = [spoil(crop, rng) for _ in range(MAX_FRAMES)]
+                one = read_frames([[frames[0]]], 1, directions=[label["direction"]])[0][0]
+                single.append(None if one is None else circular_distance(one["angle"], label["angle"]))
+                result, n = read_burst(frames, label["direction"], parallel=False)
+                angle = result["dials"][0]["angle"]
+                fused.append(None if angle is None else circular_distance(angle, label["angle"]))
+                used.append(n)
+    print(f"{len(dials)} labelled dials x {trials} bursts, {BAD_SHARE:.0%} of frames blurred or glared")
+    summary("single frame", single)
+    summary("burst, fused", fused, used)
+
+    # Reading time: one frame of every dial sequentially vs a first round (FIRST frames each) on the pool
+    crops = [crop for crop, _ in dials]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_reading_pool()
+        read_frames([crops] * FIRST, len(crops), parallel=True)  # warm the workers
+        timings = {}
+        for label, sets, parallel in (("one frame, sequential", [crops], False),
+                                      (f"{FIRST} frames, sequential", [crops] * FIRST, False),
+                                      (f"{FIRST} frames, pooled", [crops] * FIRST, True)):
+            start = time.perf_counter()
+            for _ in range(3):
+                read_frames(sets, len(crops), parallel=parallel)
+            timings[label] = (time.perf_counter() - start) / 3
+        stop_reading_pool()
+    metrics.reset()
+    for label, seconds in timings.items():
+        print(f"{label:<24} {seconds * 1000:8.1f} ms for {len(crops)} dials ({os.cpu_count()} CPUs)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6)
@@ -0,0 +1,85 @@
+import timeit
+
+import cv2
+import numpy as np
+
+from GM_benchmarks.bench_utils import load_sample_dials
+from GM_reading.reading_main import (calibrate_gauge, dist_2_pts, line_center_distance, normalize_dial,
+                                     score_needle_lines)
+
+
+# ========== SCALAR VS BATCHED NEEDLE SCORING ==========
+# The scalar loop below is the scoring get_current_value used before score_needle_lines; both must
+# pick the same line for every input.
+
+
+def best_line_loop(lines, x, y, r):
+    candidates = []
+    for L in lines:
+        x1, y1, x2, y2 = L[0]
+        d1 = dist_2_pts(x, y, x1, y1)
+        d2 = dist_2_pts(x, y, x2, y2)
+        dn, df = (d1, d2) if d1 < d2 else (d2, d1)
+        if not (0.20 * r < dn < 0.45 * r and 0.60 * r < df < 1.25 * r):
+            continue
+        lc = line_center_distance(x, y, x1, y1, x2, y2)
+        length = dist_2_pts(x1, y1, x2, y2)
+        candidates.append((length - 8.0 * lc, [x1, y1, x2, y2]))
+    if not candidates:
+        return None
+    candidates.sort(key=lambda t: -t[0])
+    return [int(v) for v in candidates[0][1]]
+
+
+def best_line_batched(lines, x, y, r):
+    segments, keep, scores = score_needle_lines(lines, x, y, r)
+    if not keep.any():
+        return None
+    return [int(v) for v in segments[np.argmax(np.where(keep, scores, -np.inf))]]
+
+
+def dial_lines():
+    """(lines, x, y, r) for every sample dial; a lower vote threshold than get_current_value gives noisy-dial line counts"""
+    cases = []
+    for dial in load_sample_dials():
+        dial = normalize_dial(dial)
+        calib = calibrate_gauge(dial)
+        if calib is None:
+            continue
+        x, y, r = calib[:3]
+        gray = cv2.cvtColor(dial, cv2.COLOR_BGR2GRAY)
+        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+        lines = cv2.HoughLinesP(binary, rho=1, theta=np.pi/180, threshold=30,
+                                minLineLength=int(0.20 * r), maxLineGap=6)
+        if lines is not None:
+            cases.append((lines, x, y, r))
+    return cases
+
+
+def synthetic_lines(n, x=160, y=160, r=130, seed=0):
+    """n random segments, about half of them radial (needle-like) so the filter keeps some"""
+    rng = np.random.default_rng(seed)
+    ang = rng.uniform(0, 2 * np.pi, n)
+    near = rng.uniform(0.1, 0.6, n) * r
+    far = rng.uniform(0.5, 1.3, n) * r
+    jitter = rng.integers(-4, 5, (n, 4))
+    segs = np.stack([x + near * np.sin(ang), y - near * np.cos(ang), x + far * np.sin(ang), y - far * np.cos(ang)], axis=1)
+    return (np.round(segs).astype(np.int32) + jitter).reshape(-1, 1, 4).astype(np.int32), x, y, r
+
+
+def main():
+    cases = dial_lines() + [synthetic_lines(n, seed=n) for n in (50, 200, 1000, 5000)]
+    for lines, x, y, r in cases:
+        assert best_line_loop(lines, x, y, r) == best_line_batched(lines, x, y, r), "batched scoring picked another line"
+    print(f"identical best line on {len(cases)} inputs")
+
+    print("segments |   loop (ms) | batched (ms) | speedup")
+    for lines, x, y, r in sorted(cases, key=lambda c: len(c[0]))[::max(1, len(cases) // 8)]:
+        reps = max(3, 2000 // len(lines))
+        t_loop = timeit.timeit(lambda: best_line_loop(lines, x, y, r), number=reps) / reps
+        t_vec = timeit.timeit(lambda: best_line_batched(lines, x, y, r), number=reps) / reps
+        print(f"{len(lines):8d} | {t_loop * 1000:11.3f} | {t_vec * 1000:12.3f} | {t_loop / t_vec:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from GM_pipeline import metrics, node_api
+
+
+# ========== NODE API: CONCURRENT POLLERS VS THE CAPTURE LOOP ==========
+# Starts the node API with a full ring buffer of readings and a stand-in capture loop on this process
+# (a 50 ms fixed-rate tick that publishes a reading and does a little frame work, like store_reading
+# does after a read). Poller processes (the central server, dashboards) keep CLIENTS keep-alive
+# connections busy cycling through latest, history, metrics and health. Reports requests/s and
+# latency percentiles, and the capture tick lateness with and without the pollers.
+# Usage: python -m GM_benchmarks.bench_node_api [clients] [seconds]
+
+LOCATION = "bench_meter"
+TICK = 0.05
+PATHS = [b"/readings/latest", b"/readings/history?location=bench_meter&limit=100", b"/metrics", b"/health",
+         b"/readings/latest?location=bench_meter"]
+
+
+async def _poller(port, index, stop_at, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = index
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        writer.write(b"GET %s HTTP/1.1\r\nHost: node\r\n\r\n" % PATHS[i % len(PATHS)])
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    writer.close()
+
+
+def _poll(port, clients, seconds, results):
+    """One poller process: `clients` keep-alive connections for `seconds`"""
+    async def run():
+        latencies = []
+        stop_at = time.monotonic() + seconds
+        await asyncio.gather(*(_poller(port, i, stop_at, latencies) for i in range(clients)))
+        return latencies
+    results.put(asyncio.run(run()))
+
+
+def capture_loop(seconds):
+    """Fixed-rate ticks; returns how late each one started (s)"""
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    start, lateness, k = time.monotonic(), [], 0
+    capture_time = datetime(2025, 1, 1)
+    while time.monotonic() - start < seconds:
+        scheduled = start + k * TICK
+        time.sleep(max(0.0, scheduled - time.monotonic()))
+        lateness.append(time.monotonic() - scheduled)
+        np.ascontiguousarray(frame[::2, ::2]).mean()  # frame work on the capture thread
+        node_api.publish(LOCATION, {"timestamp": (capture_time + timedelta(seconds=k)).isoformat(),
+                                    "reading": 1000000 + k, "confidence": 0.9, "status": "ok",
+                                    "image_path": None, "notes": None})
+        k += 1
+    return lateness
+
+
+def jitter(label, lateness):
+    ms = np.array(lateness) * 1000
+    print(f"{label:<28} tick lateness median {np.median(ms):6.2f} ms  p99 {np.percentile(ms, 99):6.2f} ms  "
+          f"max {ms.max():6.2f} ms")
+
+
+def main(clients=200, seconds=5.0):
+    for k in range(node_api.HISTORY_SIZE):
+        node_api.publish(LOCATION, {"timestamp": (datetime(2024, 12, 31) + timedelta(minutes=k)).isoformat(),
+                                    "reading": 1000000 + k, "confidence": 0.9, "status": "ok",
+                                    "image_path": None, "notes": None})
+    health = lambda: {"meters": {LOCATION: {"expected_interval": 1800.0, "offline_backlog": 0}}}
+    api = node_api.NodeAPI(port=0, host="127.0.0.1", trigger=lambda location: [LOCATION], health=health)
+    api.start()
+
+    jitter("capture loop, no pollers", capture_loop(seconds))
+
+    processes = 2
+    results = multiprocessing.Queue()
+    pollers = [multiprocessing.Process(target=_poll, args=(api.port, clients // processes, seconds, results))
+               for _ in range(processes)]
+    for p in pollers:
+        p.start()
+    lateness = capture_loop(seconds)
+    latencies = [t for _ in pollers for t in results.get()]
+    for p in pollers:
+        p.join()
+    jitter(f"capture loop, {clients} pollers", lateness)
+
+    ms = np.array(latencies) * 1000
+    print(f"{clients} keep-alive pollers: {len(latencies) / seconds:8.0f} requests/s  "
+          f"latency median {statistics.median(ms):6.2f} ms  p99 {np.percentile(ms, 99):6.2f} ms  "
+          f"(server counted {api.requests})")
+    api.shutdown()
+    metrics.reset()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, float(sys.argv[2]) if len(sys.argv) > 2 else 5.0)
@@ -0,0 +1,36 @@
+import contextlib
+import io
+import os
+
+from GM_benchmarks.bench_utils import load_sample_dials, time_it, summarize
+from GM_reading.reading_main import r_main, start_reading_pool, stop_reading_pool
+
+
+# ========== SEQUENTIAL VS POOLED r_main ==========
+
+
+def main(repeats=10, gauge_type=5):
+    dials = load_sample_dials()
+    cycles = [dials[i:i + gauge_type] for i in range(0, len(dials) - gauge_type + 1, gauge_type)]
+    print(f"{len(dials)} sample dials -> {len(cycles)} cycles of {gauge_type} dials, {os.cpu_count()} CPUs")
+
+    def run(parallel):
+        # r_main prints every dial; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [r_main(cycle, gauge_type, False, parallel=parallel) for cycle in cycles]
+
+    start_reading_pool()  # pool start-up is a one-off cost, not part of a cycle
+    try:
+        assert run(False) == run(True), "parallel readings differ from sequential readings"
+        sequential = time_it(lambda: run(False), repeats)
+        parallel = time_it(lambda: run(True), repeats)
+    finally:
+        stop_reading_pool()
+
+    print(f"sequential: {summarize(sequential)}")
+    print(f"parallel:   {summarize(parallel)}")
+    print(f"speedup:    {min(sequential) / min(parallel):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
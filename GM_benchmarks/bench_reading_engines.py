@@ -0,0 +1,68 @@
+import contextlib
+import io
+import statistics
+
+from GM_benchmarks.bench_utils import labelled_dials, time_it
+from GM_reading.reading_main import NEEDLE_ENGINES, calibrate_gauge, normalize_dial, read_dial
+
+
+# ========== HOUGH VS RADIAL-PROFILE NEEDLE ENGINE ==========
+# Accuracy on the labelled dials (digit and needle angle error against the hand-labelled angle)
+# and speed of the needle stage alone, on the same calibrated circles for both engines.
+
+DIAL_SIZES = [None, 320]
+
+
+def angle_error(a, b):
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+def bench_accuracy(dials, size):
+    print(f"dial work size {size}")
+    print("engine | digits | median angle err | within 18 deg | confidence ok / wrong")
+    for engine in NEEDLE_ENGINES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [read_dial(crop, dial["direction"] == "ccw", work_size=size, engine=engine) for crop, dial in dials]
+        correct, errors, conf_ok, conf_wrong = 0, [], [], []
+        for result, (_, dial) in zip(results, dials):
+            if result is None:
+                errors.append(180.0)
+                continue
+            ok = result["value"] == dial["digit"]
+            correct += ok
+            errors.append(angle_error(result["angle"], dial["angle"]))
+            if result["confidence"] is not None:
+                (conf_ok if ok else conf_wrong).append(result["confidence"])
+        conf = "-"
+        if conf_ok or conf_wrong:
+            mean = lambda v: f"{statistics.mean(v):.2f}" if v else "-"
+            conf = f"{mean(conf_ok)} / {mean(conf_wrong)}"
+        print(f"{engine:>6} | {correct:2d}/{len(dials)}  | {statistics.median(errors):12.1f} deg "
+              f"| {sum(e < 18 for e in errors):6d}/{len(dials)}  | {conf}")
+
+
+def bench_speed(dials, size, repeats=20):
+    cases = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for crop, _ in dials:
+            crop = normalize_dial(crop, size)
+            calib = calibrate_gauge(crop)
+            if calib is not None:
+                cases.append((crop,) + calib[:3])
+
+    print("engine | ms / dial (needle stage only)")
+    for engine, find_needle in NEEDLE_ENGINES.items():
+        def run():
+            for crop, x, y, r in cases:
+                find_needle(crop, x, y, r)
+        with contextlib.redirect_stdout(io.StringIO()):
+            times = time_it(run, repeats=repeats)
+        print(f"{engine:>6} | {statistics.median(times) * 1000 / len(cases):8.2f}")
+
+
+if __name__ == "__main__":
+    dials = labelled_dials()
+    for size in DIAL_SIZES:
+        bench_accuracy(dials, size)
+        bench_speed(dials, size)
+        print()
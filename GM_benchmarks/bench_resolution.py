@@ -0,0 +1,52 @@
+import contextlib
+import io
+import time
+
+from GM_benchmarks.bench_utils import load_samples, labelled_dials, box_for_label, load_labels
+from GM_detection_cropping.detectors import get_detector, detect_scaled
+from GM_reading.reading_main import run_reading
+
+
+# ========== ACCURACY AND CYCLE TIME PER WORKING SIZE ==========
+# Detection: recall of labelled dials and time per full frame at each detection size.
+# Reading: digit accuracy on the labelled dials and time per dial at each dial working size.
+
+DETECT_SIZES = [None, 1920, 1280, 960, 640]
+DIAL_SIZES = [None, 480, 400, 320, 240, 160]
+
+
+def bench_detection(repeats=3):
+    detector = get_detector("hough", work_size=4096)  # let detect_scaled decide the resolution
+    samples, labels = load_samples(), load_labels()
+    frames = [name for name in labels if name != "GM1"]
+    print("detect max side | recall | ms / frame")
+    for size in DETECT_SIZES:
+        found = total = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for name in frames:
+                boxes = detect_scaled(detector, samples[name], size)
+                for dial in labels[name]["dials"]:
+                    total += 1
+                    found += box_for_label(boxes, dial, 0) in boxes
+        elapsed = (time.perf_counter() - start) / (repeats * len(frames))
+        print(f"{str(size):>15} | {found / total:6.1%} | {elapsed * 1000:9.1f}")
+
+
+def bench_reading(repeats=3):
+    dials = labelled_dials()
+    print("dial work size | accuracy | ms / dial")
+    for size in DIAL_SIZES:
+        correct = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeats):
+                results = [run_reading(crop, dial["direction"] == "ccw", work_size=size) for crop, dial in dials]
+        elapsed = (time.perf_counter() - start) / (repeats * len(dials))
+        correct = sum(value == dial["digit"] for value, (_, dial) in zip(results, dials))
+        print(f"{str(size):>14} | {correct / len(dials):8.1%} | {elapsed * 1000:9.1f}")
+
+
+if __name__ == "__main__":
+    bench_detection()
+    bench_reading()
@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from GM_data import db_utilities, rollups
+from GM_data.db_setup import initialize_database
+
+
+# ========== ROLLUPS: WRITE OVERHEAD, DASHBOARD QUERIES, RETENTION ==========
+# Writes synthetic 15-second readings for a few meters through the batched write path (with and
+# without the rollup upserts), answers a month of daily consumption from raw rows and from the
+# rollups, then applies the raw retention policy (first only up to a replicated id, as on a node whose
+# master has not pulled everything yet) and checks the rollups still answer the same.
+# Usage: python -m GM_benchmarks.bench_rollups [days]
+
+LOCATIONS = ["test_meter", "basement_2", "boiler_room"]
+START = datetime(2025, 1, 1)
+
+
+def synthetic_rows(days):
+    for i in range(days * 24 * 240 * len(LOCATIONS)):
+        k = i // len(LOCATIONS)
+        status = "rejected" if k % 97 == 0 else "success"
+        yield db_utilities._reading_row(1000000 + k // 7, START + timedelta(seconds=15 * k),
+                                        LOCATIONS[i % len(LOCATIONS)], 0.8, None, status, None)
+
+
+def write_all(rows, with_rollups):
+    original = db_utilities.update_rollups
+    if not with_rollups:
+        db_utilities.update_rollups = lambda conn, rows: None
+    try:
+        buffer = db_utilities.ReadingBuffer(batch_size=db_utilities.BATCH_SIZE, flush_interval=3600)
+        start = time.perf_counter()
+        for row in rows:
+            buffer.add(row)
+        buffer.flush()
+        return time.perf_counter() - start
+    finally:
+        db_utilities.update_rollups = original
+
+
+def daily_from_raw(location, days):
+    """The pre-rollup way: every raw row of every day, last minus first"""
+    used = []
+    for d in range(days):
+        day = START + timedelta(days=d)
+        rows = [r for r in db_utilities.get_readings_between(location, day, day + timedelta(days=1))
+                if r[6] in db_utilities.TRUSTED_STATUSES]
+        used.append(rows[0][2] - rows[-1][2] if rows else None)  # newest first
+    return used
+
+
+def timed(label, fn, repeats=5):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    print(f"{label:<42} {(time.perf_counter() - start) / repeats * 1000:9.2f} ms")
+    return result
+
+
+def main(days=60):
+    with tempfile.TemporaryDirectory() as tmp:
+        for with_rollups in (False, True):
+            path = os.path.join(tmp, f"bench_{with_rollups}.db")
+            initialize_database(path)
+            db_utilities.use_database(path)
+            rows = list(synthetic_rows(days))
+            elapsed = write_all(rows, with_rollups)
+            print(f"write path {'with' if with_rollups else 'without'} rollups: {len(rows)} readings, "
+                  f"{len(rows) / elapsed:8.0f} rows/s")
+
+        window = min(30, days)
+        location, month_end = LOCATIONS[0], START + timedelta(days=window)
+        raw = timed(f"{window} daily totals from raw rows", lambda: daily_from_raw(location, window))
+        daily = timed(f"{window} daily totals from rollups (get_rollups)",
+                      lambda: rollups.get_rollups(location, "day", START, month_end))
+        timed("month consumption (get_consumption)", lambda: rollups.get_consumption(location, START, month_end))
+        within = [b["delta"] for b in daily]
+        print(f"rollup deltas match the raw scan: {within == raw}")
+
+        snapshot = lambda: db_utilities.get_connection().execute(
+            "SELECT * FROM rollups ORDER BY granularity, location, bucket").fetchall()
+        incremental = snapshot()
+        start = time.perf_counter()
+        rollups.rebuild_rollups()
+        print(f"rebuild from raw rows: {time.perf_counter() - start:.1f} s, identical to the incremental "
+              f"rollups: {snapshot() == incremental}")
+
+        count = lambda: db_utilities.get_connection().execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+        before_rows, before = count(), rollups.get_rollups(location, "day", START, month_end)
+        acked = before_rows // 4  # the master has pulled the first quarter of the rows so far
+        above = lambda: db_utilities.get_connection().execute(
+            "SELECT COUNT(*) FROM readings WHERE id > ?", (acked,)).fetchone()[0]
+        unreplicated = above()
+        partial = rollups.downsample_raw(now=START + timedelta(days=days), max_id=acked)
+        print(f"retention up to replicated id {acked}: {partial}; unreplicated rows kept: {above() == unreplicated}")
+        start = time.perf_counter()
+        result = rollups.downsample_raw(now=START + timedelta(days=days))
+        result = {k: result[k] + partial[k] for k in result}
+        print(f"retention of the rest: {time.perf_counter() - start:.1f} s in one-day transactions")
+        after = rollups.get_rollups(location, "day", START, month_end)
+        print(f"retention: {before_rows} raw rows -> {count()} ({result}); rollups unchanged: {before == after}")
+        db_utilities.close_connections()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,325 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from GM_benchmarks.bench_utils import box_for_label, load_labels, load_samples
+from GM_detection_cropping.detection_main import d_main
+from GM_detection_cropping.detectors import get_detector, parse_predictions, print_results
+from GM_pipeline import metrics
+from GM_reading.reading_main import READING_ENGINE, read_gauges
+
+
+# ========== REPRODUCIBLE ACCURACY + LATENCY SUITE ==========
+# Runs d_main + read_gauges over every labelled multi-dial sample under a fixed set of synthetic
+# augmentations and reports per-dial detection/reading accuracy, per-stage and end-to-end latency
+# percentiles, throughput and peak memory. Detection is served from a recorded detector response
+# (detections.json, Roboflow response format) so runs are offline and deterministic.
+#
+#   python -m GM_benchmarks.bench_suite                       # writes GM_benchmarks/results/<time>.json
+#   python -m GM_benchmarks.bench_suite --compare GM_benchmarks/results/baseline.json
+#   python -m GM_benchmarks.bench_suite --record-detections   # re-record the detector fixture
+
+detections_path = Path(__file__).resolve().parent / "detections.json"
+results_dir = Path(__file__).resolve().parent / "results"
+
+LATENCY_TOLERANCE = 0.20   # --compare flags a latency regression above +20%
+ACCURACY_TOLERANCE = 0.0   # ...and any accuracy drop
+
+
+# ----- augmentations: image -> (image, 2x3 affine mapping original pixels to augmented ones) -----
+
+
+def _identity(image):
+    return image, np.float32([[1, 0, 0], [0, 1, 0]])
+
+
+def _rotate(degrees):
+    def augment(image):
+        h, w = image.shape[:2]
+        m = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), degrees, 1.0)
+        return cv2.warpAffine(image, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE), m
+    return augment
+
+
+def _blur(image):
+    return cv2.GaussianBlur(image, (7, 7), 0), _identity(image)[1]
+
+
+def _brightness(alpha, beta):
+    def augment(image):
+        return cv2.convertScaleAbs(image, alpha=alpha, beta=beta), _identity(image)[1]
+    return augment
+
+
+def _jpeg(quality):
+    def augment(image):
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR), _identity(image)[1]
+    return augment
+
+
+def _scale(factor):
+    def augment(image):
+        small = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        return small, np.float32([[factor, 0, 0], [0, factor, 0]])
+    return augment
+
+
+AUGMENTATIONS = {
+    "none": _identity,
+    "rotate+3": _rotate(3),
+    "rotate-3": _rotate(-3),
+    "blur": _blur,
+    "dark": _brightness(0.6, 0),
+    "bright": _brightness(1.3, 40),
+    "jpeg30": _jpeg(30),
+    "half_res": _scale(0.5),
+}
+
+
+def transform_point(m, x, y):
+    return float(m[0, 0] * x + m[0, 1] * y + m[0, 2]), float(m[1, 0] * x + m[1, 1] * y + m[1, 2])
+
+
+# ----- offline detector -----
+
+
+def record_detections():
+    """
+    Records detections.json: one prediction per labelled dial, centred on the label, sized like the
+    local detector's box around it (or the median box when it misses the dial), Roboflow format.
+    """
+    detector = get_detector("hough")
+    samples, fixture = load_samples(), {}
+    for name, meta in load_labels().items():
+        if name == "GM1":
+            continue
+        boxes = detector.detect(samples[name])
+        sides = sorted(b["x2"] - b["x1"] for b in boxes)
+        predictions = []
+        for dial in meta["dials"]:
+            b = box_for_label(boxes, dial, sides[len(sides) // 2])
+            side = max(b["x2"] - b["x1"], b["y2"] - b["y1"])
+            confidence = b.get("confidence") if b in boxes else 0.5
+            predictions.append({"x": dial["center"][0], "y": dial["center"][1], "width": side, "height": side,
+                                "confidence": round(float(confidence), 3), "class": "gauge"})
+        fixture[name] = {"predictions": predictions}
+    with open(detections_path, "w") as f:
+        json.dump(fixture, f, indent=1)
+    print(f"✅ Detector responses recorded to {detections_path}")
+
+
+class StubDetector:
+    """Replays a recorded detector response through the same parsing as the hosted backend"""
+
+    name = "stub"
+
+    def __init__(self):
+        self.response = {"predictions": []}
+
+    def detect(self, image, image_path=None):
+        print_results(self.response)
+        return parse_predictions(self.response, image)
+
+
+def augmented_response(response, m):
+    """The recorded response moved by the augmentation's affine transform"""
+    scale = float(np.hypot(m[0, 0], m[1, 0]))
+    predictions = []
+    for p in response["predictions"]:
+        x, y = transform_point(m, p["x"], p["y"])
+        predictions.append(dict(p, x=x, y=y, width=p["width"] * scale, height=p["height"] * scale))
+    return {"predictions": predictions}
+
+
+# ----- the run -----
+
+
+def percentiles(times_ms):
+    ordered = sorted(times_ms)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+    return {"mean": round(statistics.mean(ordered), 2), "p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99),
+            "max": round(ordered[-1], 2)}
+
+
+def run_suite(engine=READING_ENGINE, repeats=3, augmentations=None):
+    with open(detections_path) as f:
+        fixture = json.load(f)
+    samples, labels = load_samples(), load_labels()
+    augmentations = augmentations or list(AUGMENTATIONS)
+    stub = StubDetector()
+
+    frames = []
+    for aug in augmentations:
+        for name, response in fixture.items():
+            image, m = AUGMENTATIONS[aug](samples[name])
+            dials = sorted(labels[name]["dials"], key=lambda d: d["place"])  # d_main order: least significant first
+            frames.append((aug, name, image, augmented_response(response, m), dials, m))
+
+    def process(frame):
+        _, _, image, response, dials, _ = frame
+        stub.response = response
+        with contextlib.redirect_stdout(io.StringIO()):
+            crops, boxes = d_main(image, len(dials), False, detector=stub, detect_max_side=None, return_boxes=True)
+            result = read_gauges(crops, len(dials), False, engine=engine, directions=[d["direction"] for d in dials])
+        return boxes, result
+
+    for frame in frames:  # warm-up: first-call costs (lazy imports, LUT caches) stay out of the numbers
+        process(frame)
+
+    metrics.reset()
+    tracemalloc.start()
+    e2e, records = [], []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            t = time.perf_counter()
+            boxes, result = process(frame)
+            e2e.append((time.perf_counter() - t) * 1000)
+            records.append((frame, boxes, result))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stage_metrics = metrics.snapshot()
+
+    # Accuracy from the last repeat (every repeat sees identical inputs)
+    per_dial, by_aug = [], {}
+    for (aug, name, _, _, dials, m), boxes, result in records[-len(frames):]:
+        for i, dial in enumerate(dials):
+            cx, cy = transform_point(m, *dial["center"])
+            box = boxes[i] if i < len(boxes) else None
+            inside = lambda b: b["x1"] <= cx <= b["x2"] and b["y1"] <= cy <= b["y2"]
+            detected = box is not None and inside(box)  # found and in the position d_main reports it
+            read = result["dials"][i]["digit"] if i < len(result["dials"]) else None
+            per_dial.append({"augmentation": aug, "sample": name, "place": dial["place"], "expected": dial["digit"],
+                             "read": read, "located": any(inside(b) for b in boxes), "detected": detected,
+                             "correct": detected and read == dial["digit"],
+                             "confidence": result["dials"][i]["confidence"] if read is not None else None})
+        entry = by_aug.setdefault(aug, {"readings": 0, "readings_correct": 0})
+        entry["readings"] += 1
+        entry["readings_correct"] += result["reading"] == labels[name]["reading"]
+
+    def accuracy(rows, key):
+        return round(sum(r[key] for r in rows) / len(rows), 4) if rows else None
+
+    for aug, entry in by_aug.items():
+        rows = [r for r in per_dial if r["augmentation"] == aug]
+        entry.update(localization=accuracy(rows, "located"), detection_accuracy=accuracy(rows, "detected"),
+                     dial_accuracy=accuracy(rows, "correct"),
+                     reading_accuracy=round(entry["readings_correct"] / entry["readings"], 4))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "engine": engine, "repeats": repeats, "augmentations": augmentations,
+            "python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+        },
+        "summary": {
+            "frames": len(e2e),
+            "throughput_fps": round(len(e2e) / elapsed, 2),
+            "e2e_ms": percentiles(e2e),
+            "peak_traced_mb": round(peak / 1e6, 1),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+            "localization": accuracy(per_dial, "located"),
+            "detection_accuracy": accuracy(per_dial, "detected"),
+            "dial_accuracy": accuracy(per_dial, "correct"),
+            "reading_accuracy": round(sum(e["readings_correct"] for e in by_aug.values()) /
+                                      sum(e["readings"] for e in by_aug.values()), 4),
+        },
+        "stages": stage_metrics["timers"],
+        "counters": stage_metrics["counters"],
+        "by_augmentation": by_aug,
+        "dials": per_dial,
+    }
+
+
+# ----- reporting -----
+
+
+def print_report(results):
+    s = results["summary"]
+    print(f"engine {results['meta']['engine']}, {s['frames']} frames, {s['throughput_fps']} frames/s, "
+          f"peak traced {s['peak_traced_mb']} MB, max RSS {s['max_rss_mb']} MB")
+    e = s["e2e_ms"]
+    print(f"end-to-end ms: mean {e['mean']}  p50 {e['p50']}  p90 {e['p90']}  p99 {e['p99']}  max {e['max']}")
+    print(f"accuracy: localization {s['localization']:.1%}  detection {s['detection_accuracy']:.1%}  "
+          f"dial {s['dial_accuracy']:.1%}  "
+          f"reading {s['reading_accuracy']:.1%}")
+    print("stage              count    p50 ms    p95 ms")
+    for stage, t in results["stages"].items():
+        print(f"{stage:<18} {t['count']:5d} {t['p50_ms']:9.2f} {t['p95_ms']:9.2f}")
+    print("augmentation  located  detection   dial  reading")
+    for aug, a in results["by_augmentation"].items():
+        print(f"{aug:<12} {a['localization']:8.1%} {a['detection_accuracy']:9.1%} {a['dial_accuracy']:6.1%} "
+              f"{a['reading_accuracy']:8.1%}")
+
+
+def compare(results, baseline):
+    """Prints the change against a baseline run; returns the list of regressions"""
+    regressions = []
+    print(f"\ncompared with {baseline['meta']['timestamp']} ({baseline['meta']['engine']}):")
+    for key in ("p50", "p90", "p99"):
+        old, new = baseline["summary"]["e2e_ms"][key], results["summary"]["e2e_ms"][key]
+        change = (new - old) / old if old else 0.0
+        flag = change > LATENCY_TOLERANCE
+        print(f"  e2e {key:<4} {old:9.2f} -> {new:9.2f} ms  ({change:+.0%}){'  REGRESSION' if flag else ''}")
+        if flag:
+            regressions.append(f"e2e {key}")
+    for key in ("localization", "detection_accuracy", "dial_accuracy", "reading_accuracy"):
+        old, new = baseline["summary"][key], results["summary"][key]
+        flag = new < old - ACCURACY_TOLERANCE
+        print(f"  {key:<19} {old:7.1%} -> {new:7.1%}{'  REGRESSION' if flag else ''}")
+        if flag:
+            regressions.append(key)
+    old, new = baseline["summary"]["peak_traced_mb"], results["summary"]["peak_traced_mb"]
+    print(f"  peak traced memory {old} -> {new} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy and latency benchmark over GM_sample_images.")
+    parser.add_argument("--engine", default=READING_ENGINE, help="needle engine: hough or radial")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--augment", nargs="*", choices=list(AUGMENTATIONS), help="subset of augmentations")
+    parser.add_argument("--out", help="results JSON path (default: GM_benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="baseline results JSON; exits 1 on a regression")
+    parser.add_argument("--record-detections", action="store_true", help="re-record detections.json and exit")
+    args = parser.parse_args(argv)
+
+    if args.record_detections:
+        record_detections()
+        return
+
+    results = run_suite(args.engine, args.repeats, args.augment)
+    print_report(results)
+
+    out = Path(args.out) if args.out else results_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{args.engine}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"✅ Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
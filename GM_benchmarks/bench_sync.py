@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from GM_data import db_utilities, sync
+from GM_data.db_setup import initialize_database
+
+
+# ========== NODE -> CENTRAL REPLICATION ==========
+# Builds a node database with synthetic 15-second readings, serves it from a separate stand-in node
+# process and pulls it into a master database: throughput (rows/s), bytes per row on the wire (vs the
+# node's .db file), an interrupted pull that resumes, idempotence (re-applying everything) and an
+# incremental pull of newly added rows.
+# Usage: python -m GM_benchmarks.bench_sync [rows]
+
+LOCATIONS = ["test_meter", "basement_2", "boiler_room"]
+
+
+def synthetic_rows(count, start=datetime(2025, 1, 1)):
+    for i in range(count):
+        ts = start + timedelta(seconds=15 * (i // len(LOCATIONS)))
+        yield (ts.isoformat(timespec="seconds"), 1000000 + i // 7, LOCATIONS[i % len(LOCATIONS)], 0.8,
+               f"GM_captured_images/GMCapture_{ts.strftime('%Y%m%d_%H%M%S')}.jpg", "success", None)
+
+
+def add_rows(path, count, start):
+    conn = sqlite3.connect(path)
+    conn.executemany(db_utilities.INSERT_READING, synthetic_rows(count, start))
+    conn.commit()
+    conn.close()
+
+
+def serve_node(path, ports):
+    """Stand-in node process: its own database, its own sync server"""
+    db_utilities.use_database(path)
+    server = sync.start_sync_server(port=0, host="127.0.0.1")
+    ports.put(server.server_address[1])
+    threading.Event().wait()
+
+
+def master_count():
+    return db_utilities.get_connection().execute("SELECT COUNT(*) FROM master_readings").fetchone()[0]
+
+
+def report(label, stats):
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    per_row = stats["bytes"] / stats["rows"] if stats["rows"] else 0.0
+    print(f"{label:<28} {stats['rows']:7d} rows  {stats['batches']:3d} batches  {rate:9.0f} rows/s  "
+          f"{per_row:5.1f} bytes/row")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        node_db, master_db = os.path.join(tmp, "node.db"), os.path.join(tmp, "master.db")
+        initialize_database(node_db)
+        add_rows(node_db, count, datetime(2025, 1, 1))
+        print(f"node database: {count} readings, {os.path.getsize(node_db) / count:.1f} bytes/row on disk")
+
+        ports = multiprocessing.Queue()
+        node = multiprocessing.Process(target=serve_node, args=(node_db, ports), daemon=True)
+        node.start()
+        url = f"http://127.0.0.1:{ports.get(timeout=30)}"
+
+        initialize_database(master_db)
+        db_utilities.use_database(master_db)
+
+        # Interrupted after 3 batches, then resumed from the high-water mark
+        report("pull, stopped after 3", sync.pull_node("node-1", url, max_batches=3))
+        report("pull, resumed", sync.pull_node("node-1", url))
+        print(f"master rows: {master_count()} (expected {count}), high-water {sync.high_water('node-1')}")
+
+        # Idempotent: forget the high-water mark and apply every batch again
+        with db_utilities.write_transaction() as conn:
+            conn.execute("UPDATE sync_state SET high_water = 0 WHERE node = 'node-1'")
+        report("re-pull from 0", sync.pull_node("node-1", url))
+        print(f"master rows: {master_count()} after re-applying everything")
+
+        # Incremental: only the new rows travel
+        add_rows(node_db, 1000, datetime(2026, 1, 1))
+        report("incremental pull", sync.pull_node("node-1", url))
+        report("nothing new", sync.pull_node("node-1", url))
+        print(f"master rows: {master_count()} (expected {count + 1000})")
+
+        node.terminate()
+        db_utilities.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+
+from GM_detection_cropping.detectors import get_detector
+
+
+# ========== SHARED BENCHMARK HELPERS ==========
+# Run every benchmark from the repository root, e.g. `python -m GM_benchmarks.bench_parallel_reading`
+
+base_dir = Path(__file__).resolve().parent.parent
+sample_dir = base_dir / "GM_sample_images"
+labels_path = Path(__file__).resolve().parent / "labels.json"
+
+
+def load_samples():
+    """Returns {name: image} for every image in GM_sample_images"""
+    samples = {}
+    for path in sorted(sample_dir.glob("GM*.png")):
+        samples[path.stem] = cv2.imread(str(path))
+    return samples
+
+
+def load_sample_dials():
+    """
+    Dial crops from the sample images, cut out with the local (offline) detector.
+    GM1 is already a single dial and is used as is.
+    """
+    detector = get_detector("hough")
+    dials = []
+    for name, image in load_samples().items():
+        if name == "GM1":
+            dials.append(image)
+            continue
+        for b in detector.detect(image):
+            dials.append(image[b["y1"]:b["y2"], b["x1"]:b["x2"]].copy())
+    return dials
+
+
+def load_labels():
+    with open(labels_path) as f:
+        labels = json.load(f)
+    labels.pop("_comment", None)
+    return labels
+
+
+def box_for_label(boxes, dial, default_side):
+    """The detected box containing the labelled centre, or a square of default_side around it"""
+    cx, cy = dial["center"]
+    for b in boxes:
+        if b["x1"] <= cx <= b["x2"] and b["y1"] <= cy <= b["y2"]:
+            return b
+    half = default_side // 2
+    return {"x1": max(0, cx - half), "y1": max(0, cy - half), "x2": cx + half, "y2": cy + half}
+
+
+def labelled_dials(boxes_by_sample=None):
+    """
+    Returns [(crop, label)] for every labelled dial. Crops come from the local detector's boxes
+    (or boxes_by_sample[name] when given); dials it misses get a box sized like its neighbours.
+    """
+    samples = load_samples()
+    detector = get_detector("hough")
+    dials = []
+    for name, meta in load_labels().items():
+        image = samples[name]
+        if name == "GM1":
+            dials.append((image, meta["dials"][0]))
+            continue
+        boxes = boxes_by_sample[name] if boxes_by_sample else detector.detect(image)
+        sides = sorted(b["x2"] - b["x1"] for b in boxes) or [min(image.shape[:2]) // 4]
+        for dial in meta["dials"]:
+            b = box_for_label(boxes, dial, sides[len(sides) // 2])
+            dials.append((image[b["y1"]:b["y2"], b["x1"]:b["x2"]].copy(), dial))
+    return dials
+
+
+def time_it(fn, repeats=5, warmup=1):
+    """Runs fn repeatedly; returns the list of wall times in seconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times):
+    return f"median {statistics.median(times) * 1000:8.1f} ms  min {min(times) * 1000:8.1f} ms"
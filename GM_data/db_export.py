@@ -0,0 +1,108 @@
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from GM_data.db_utilities import close_thread_connection, get_connection, to_timestamp
+
+
+# ========== STREAMING EXPORT ==========
+# Rows are pulled from the cursor CHUNK_SIZE at a time and written as they arrive, so memory use
+# stays flat however long the time range is. Parquet output needs the optional pyarrow package.
+
+READING_COLUMNS = ["id", "timestamp", "reading", "location", "confidence", "image_path", "status", "notes"]
+CHUNK_SIZE = 5000
+
+
+def iter_readings(start=None, end=None, locations=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields chunks (lists of rows, columns as READING_COLUMNS) in timestamp order.
+    start is inclusive, end exclusive, either may be None; locations=None means all locations.
+    """
+    where, params = [], []
+    if locations is not None:
+        where.append(f"location IN ({', '.join('?' * len(locations))})")
+        params.extend(locations)
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(to_timestamp(start))
+    if end is not None:
+        where.append("timestamp < ?")
+        params.append(to_timestamp(end))
+
+    sql = f"SELECT {', '.join(READING_COLUMNS)} FROM readings"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY timestamp"
+
+    # A dedicated cursor so a consumer can interleave other queries on this thread's connection
+    cursor = get_connection().cursor()
+    cursor.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def write_csv(output_path, chunks):
+    count = 0
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(READING_COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_parquet(output_path, chunks):
+    """Columnar output (one row group per chunk) for pandas/Arrow-based visualization tools"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from None
+
+    schema = pa.schema([
+        ("id", pa.int64()), ("timestamp", pa.timestamp("s")), ("reading", pa.int64()),
+        ("location", pa.string()), ("confidence", pa.float64()), ("image_path", pa.string()),
+        ("status", pa.string()), ("notes", pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            arrays = [pa.array(col).cast(field.type) for col, field in zip(columns, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+def export_readings(output_path, start=None, end=None, locations=None, fmt=None, chunk_size=CHUNK_SIZE):
+    """Streams the selected readings to output_path; fmt defaults to the file extension. Returns the row count."""
+    fmt = fmt or os.path.splitext(str(output_path))[1].lstrip(".").lower() or "csv"
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return WRITERS[fmt](output_path, iter_readings(start, end, locations, chunk_size))
+
+
+def export_locations(output_dir, locations, start=None, end=None, fmt="csv", workers=None):
+    """Exports each location to <output_dir>/<location>.<fmt> in parallel; returns {location: row count}"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    def export_one(location):
+        path = os.path.join(output_dir, f"{location}.{fmt}")
+        try:
+            return location, export_readings(path, start, end, [location], fmt)
+        finally:
+            close_thread_connection()  # the pool's threads end with the export; don't leave their files open
+
+    # Each worker thread reads through its own connection (WAL allows concurrent readers)
+    with ThreadPoolExecutor(max_workers=workers or min(4, len(locations) or 1)) as pool:
+        return dict(pool.map(export_one, locations))
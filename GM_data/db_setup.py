@@ -1,23 +1,177 @@
 import sqlite3
 from secret import *
 
-def initialize_database(db_path=DB_PATH):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
 
-    # Create reading table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS readings (
+# Bumped whenever the schema changes; stored in the database as PRAGMA user_version
+SCHEMA_VERSION = 1
+
+
+READINGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,
-        reading TEXT,
+        timestamp TEXT NOT NULL,    -- ISO 8601 'YYYY-MM-DDTHH:MM:SS', sorts and range-scans correctly
+        reading INTEGER,            -- cubic feet
         location TEXT,
         confidence REAL,
         image_path TEXT,
         status TEXT DEFAULT 'success',
         notes TEXT
     )
+"""
+
+
+# Results of batch reprocessing runs (GM_pipeline/reprocess.py): one row per run and archived image,
+# so a run can be resumed and compared against the original readings without touching them
+REPROCESSED_TABLE = """
+    CREATE TABLE IF NOT EXISTS reprocessed_readings (
+        run TEXT NOT NULL,          -- run name, e.g. the reader version being evaluated
+        image_path TEXT NOT NULL,
+        reading_id INTEGER,         -- readings.id the image was originally read for (DB source only)
+        timestamp TEXT,
+        location TEXT,
+        reading INTEGER,
+        confidence REAL,
+        status TEXT,
+        notes TEXT,
+        PRIMARY KEY (run, image_path)
+    )
+"""
+
+
+# Per-interval stage timings and counters (GM_pipeline/metrics.py); one row per name and interval
+METRICS_TABLE = """
+    CREATE TABLE IF NOT EXISTS metrics (
+        timestamp TEXT NOT NULL,    -- end of the interval
+        name TEXT NOT NULL,         -- stage (timer) or counter name
+        kind TEXT NOT NULL,         -- 'timer' or 'counter'
+        count INTEGER,              -- samples (timer) or value (counter)
+        total_ms REAL,
+        mean_ms REAL,
+        p50_ms REAL,
+        p95_ms REAL,
+        max_ms REAL
+    )
+"""
+
+
+# Hourly/daily/monthly aggregates per location (GM_data/rollups.py), kept up to date on every readings
+# write. bucket is the timestamp prefix: '2025-11-01T06' (hour), '2025-11-01' (day), '2025-11' (month).
+ROLLUPS_TABLE = """
+    CREATE TABLE IF NOT EXISTS rollups (
+        granularity TEXT NOT NULL,  -- 'hour', 'day' or 'month'
+        location TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        samples INTEGER NOT NULL,   -- trusted readings (success/corrected)
+        failures INTEGER NOT NULL,  -- other rows (rejected, unreadable)
+        min_reading INTEGER,
+        max_reading INTEGER,
+        first_reading INTEGER,
+        first_time TEXT,
+        last_reading INTEGER,
+        last_time TEXT,
+        delta INTEGER GENERATED ALWAYS AS (last_reading - first_reading) VIRTUAL,  -- used within the bucket
+        PRIMARY KEY (granularity, location, bucket)
+    )
+"""
+
+
+# Central server only (GM_data/sync.py): every node's readings, replicated incrementally. (node, id)
+# is the node's own readings.id, so applying a batch twice changes nothing.
+MASTER_READINGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS master_readings (
+        node TEXT NOT NULL,
+        id INTEGER NOT NULL,        -- readings.id on the node
+        timestamp TEXT NOT NULL,
+        reading INTEGER,
+        location TEXT,
+        confidence REAL,
+        image_path TEXT,            -- path on the node
+        status TEXT,
+        notes TEXT,
+        PRIMARY KEY (node, id)
+    )
+"""
+
+
+# Per-node high-water mark: the highest readings.id already in master_readings
+SYNC_STATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        node TEXT PRIMARY KEY,
+        high_water INTEGER NOT NULL,
+        rows INTEGER NOT NULL DEFAULT 0,   -- rows replicated so far
+        updated_at TEXT
+    )
+"""
+
+
+def create_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_readings_location_timestamp ON readings (location, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_readings_timestamp ON readings (timestamp)")
+
+
+def migrate_v0_to_v1(cursor):
+    """v0 stored reading as TEXT with no indexes: rebuild the table with a numeric reading column"""
+    cursor.execute("ALTER TABLE readings RENAME TO readings_v0")
+    cursor.execute(READINGS_TABLE.format(name="readings"))
+    cursor.execute("""
+    INSERT INTO readings (id, timestamp, reading, location, confidence, image_path, status, notes)
+    SELECT id, timestamp, CAST(NULLIF(TRIM(reading), '') AS INTEGER), location, confidence, image_path, status, notes
+    FROM readings_v0
     """)
+    cursor.execute("DROP TABLE readings_v0")
+
+
+MIGRATIONS = {
+    0: migrate_v0_to_v1,
+}
+
+
+def migrate_database(conn):
+    """Brings an existing database up to SCHEMA_VERSION, one step per version, each in its own transaction"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    while version < SCHEMA_VERSION:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")  # DDL would otherwise autocommit statement by statement
+        try:
+            MIGRATIONS[version](cursor)
+            cursor.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version += 1
+        print(f"✅ Database migrated to schema version {version}")
+
+
+def backfill_rollups(conn):
+    """
+    Replays the existing readings into a newly created rollups table (what rollups.rebuild_rollups does,
+    but on this connection: callers initialize a database before pointing db_utilities at it).
+    """
+    # Imported here: db_utilities is only needed on this upgrade path
+    from GM_data.db_utilities import update_rollups
+    rows = conn.execute("SELECT timestamp, reading, location, confidence, image_path, status, notes FROM readings")
+    replayed = 0
+    while chunk := rows.fetchmany(5000):
+        update_rollups(conn, chunk)
+        replayed += len(chunk)
+    if replayed:
+        print(f"✅ Rollups backfilled from {replayed} existing readings.")
+
+
+def initialize_database(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    existing = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'readings'").fetchone()
+    if existing:
+        # Older database: upgrade it in place instead of recreating it
+        migrate_database(conn)
+    else:
+        # Create reading table
+        cursor.execute(READINGS_TABLE.format(name="readings"))
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    create_indexes(cursor)
 
     # Create settings table
     cursor.execute("""
@@ -27,10 +181,21 @@ def initialize_database(db_path=DB_PATH):
     )
     """)
 
+    cursor.execute(REPROCESSED_TABLE)
+    cursor.execute(METRICS_TABLE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_name_timestamp ON metrics (name, timestamp)")
+    had_rollups = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'").fetchone()
+    cursor.execute(ROLLUPS_TABLE)
+    if not had_rollups:
+        backfill_rollups(conn)
+    cursor.execute(MASTER_READINGS_TABLE)
+    cursor.execute(SYNC_STATE_TABLE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_master_location_timestamp ON master_readings (location, timestamp)")
+
     # Initialize default settings if not present
     cursor.execute("""
     INSERT OR IGNORE INTO settings (key, value)
-    VALUES ('interval_minutes', '30')
+    VALUES ('interval_minutes', '30'), ('min_interval_seconds', '15'), ('max_interval_minutes', '10')
     """)
 
     conn.commit()
@@ -1,82 +1,295 @@
+import os
 import sqlite3
-import csv
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from secret import *
 
+from GM_pipeline import metrics
 
-# ========== UTILITY FUNCTIONS ==========
 
+# ========== CONNECTION MANAGEMENT ==========
+# Connections are opened once and reused instead of a connect/commit/close per call. The database
+# runs in WAL mode so readers (exports, the IDE, other threads) never block the writer. Reads use
+# one connection per thread; all writes go through a single shared writer connection.
+
+BATCH_SIZE = 20          # queued readings are written once this many are waiting...
+FLUSH_INTERVAL = 60.0    # ...or once the oldest has waited this many seconds
+
+_db_path = DB_PATH
+_generation = 0          # bumped by close_connections() so threads reopen on next use
+_local = threading.local()
+_connections = []
+_conn_lock = threading.Lock()
+_writer = None
+_write_lock = threading.RLock()
+
+
+def _open(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; no fsync per commit in WAL mode
+    with _conn_lock:
+        _connections.append(conn)
+    return conn
+
+
+def get_connection():
+    """This thread's long-lived read connection"""
+    if getattr(_local, "generation", None) != _generation:
+        _local.conn = _open(_db_path)
+        _local.generation = _generation
+    return _local.conn
+
+
+@contextmanager
+def write_transaction():
+    """Shared writer connection; everything inside the block commits as one transaction"""
+    global _writer
+    with _write_lock:
+        if _writer is None:
+            _writer = _open(_db_path)
+        with _writer:
+            yield _writer
+
+
+def close_thread_connection():
+    """Closes this thread's read connection (for short-lived worker threads); reopened on next use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    with _conn_lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    conn.close()
+    _local.conn = _local.generation = None
+
+
+def close_connections():
+    """Closes every pooled connection (threads transparently reopen on next use)"""
+    global _writer, _generation
+    with _write_lock, _conn_lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+        _writer = None
+        _generation += 1
 
-def add_reading(reading, timestamp, location="ART-BUILDING", confidence=None, image_path=None, status="success", notes=None):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    formatted_timestamp = timestamp.isoformat(timespec='seconds')
 
-    cursor.execute("""
+def use_database(db_path):
+    """Points the module at another database file (tools, benchmarks, the central master)"""
+    global _db_path
+    flush_readings()
+    close_connections()
+    _db_path = db_path
+
+
+# ========== BATCHED READING WRITER ==========
+
+
+INSERT_READING = """
     INSERT INTO readings (timestamp, reading, location, confidence, image_path, status, notes)
     VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (formatted_timestamp, reading, location, confidence, image_path, status, notes))
+"""
 
-    conn.commit()
-    conn.close()
 
+# ----- rollups, updated in the same transaction as the readings they summarize -----
 
-def get_readings_by_date(date_str):
-    """date_str example: '2025-11-01'"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+TRUSTED_STATUSES = ("success", "corrected")
+ROLLUP_PREFIX = {"hour": 13, "day": 10, "month": 7}   # bucket = this many characters of the timestamp
+
+# ?6 = reading and ?7 = timestamp, both NULL for untrusted rows (which only count as failures)
+UPSERT_ROLLUP = """
+    INSERT INTO rollups (granularity, location, bucket, samples, failures, min_reading, max_reading,
+                         first_reading, first_time, last_reading, last_time)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?6, ?6, ?7, ?6, ?7)
+    ON CONFLICT (granularity, location, bucket) DO UPDATE SET
+        samples = samples + excluded.samples,
+        failures = failures + excluded.failures,
+        min_reading = COALESCE(MIN(min_reading, excluded.min_reading), min_reading, excluded.min_reading),
+        max_reading = COALESCE(MAX(max_reading, excluded.max_reading), max_reading, excluded.max_reading),
+        first_reading = CASE WHEN first_time IS NULL OR excluded.first_time < first_time
+                             THEN excluded.first_reading ELSE first_reading END,
+        first_time = CASE WHEN first_time IS NULL OR excluded.first_time < first_time
+                          THEN excluded.first_time ELSE first_time END,
+        last_reading = CASE WHEN last_time IS NULL OR excluded.last_time >= last_time
+                            THEN excluded.last_reading ELSE last_reading END,
+        last_time = CASE WHEN last_time IS NULL OR excluded.last_time >= last_time
+                         THEN excluded.last_time ELSE last_time END
+"""
+
+
+def update_rollups(conn, rows):
+    """Folds INSERT_READING rows into the rollups (any order; first/last go by timestamp)"""
+    params = []
+    for timestamp, reading, location, _, _, status, _ in rows:
+        trusted = status in TRUSTED_STATUSES and reading is not None
+        for granularity, n in ROLLUP_PREFIX.items():
+            params.append((granularity, location or "", timestamp[:n], int(trusted), int(not trusted),
+                           reading if trusted else None, timestamp if trusted else None))
+    conn.executemany(UPSERT_ROLLUP, params)
+
+
+class ReadingBuffer:
+    """Collects reading rows and writes them with one executemany per flush"""
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, row):
+        with self.lock:
+            self.rows.append(row)
+            full = len(self.rows) >= self.batch_size
+            if not full and self.timer is None:
+                # Time-based flush for the oldest waiting row
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.rows = self.rows, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if rows:
+            try:
+                with metrics.timer("db.flush"), write_transaction() as conn:
+                    conn.executemany(INSERT_READING, rows)
+                    update_rollups(conn, rows)
+                metrics.count("readings_written", len(rows))
+            except sqlite3.Error:
+                # Keep the batch for the next flush instead of dropping it
+                with self.lock:
+                    self.rows[:0] = rows
+                raise
+        return len(rows)
+
+
+_reading_buffer = ReadingBuffer()
 
-    cursor.execute("""
+
+def _reading_row(reading, timestamp, location, confidence, image_path, status, notes):
+    formatted_timestamp = timestamp.isoformat(timespec='seconds')
+    return formatted_timestamp, reading, location, confidence, image_path, status, notes
+
+
+def queue_reading(reading, timestamp, location="ART-BUILDING", confidence=None, image_path=None, status="success", notes=None):
+    """Like add_reading, but batched: written on the next size- or time-triggered flush"""
+    _reading_buffer.add(_reading_row(reading, timestamp, location, confidence, image_path, status, notes))
+
+
+def flush_readings():
+    """Writes every queued reading now; returns how many were written"""
+    return _reading_buffer.flush()
+
+
+def close_database():
+    """Clean shutdown: flush queued readings, then close all connections"""
+    flush_readings()
+    close_connections()
+
+
+# ========== UTILITY FUNCTIONS ==========
+
+
+def add_reading(reading, timestamp, location="ART-BUILDING", confidence=None, image_path=None, status="success", notes=None):
+    row = _reading_row(reading, timestamp, location, confidence, image_path, status, notes)
+    with metrics.timer("db.add_reading"), write_transaction() as conn:
+        conn.execute(INSERT_READING, row)
+        update_rollups(conn, [row])
+    metrics.count("readings_written")
+
+
+def to_timestamp(value):
+    """datetime/date/ISO string -> the ISO text stored in readings.timestamp"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def get_readings_between(location, start, end):
+    """
+    Readings with start <= timestamp < end, newest first; location=None means every location.
+    start/end: datetime, date or ISO string (e.g. '2025-11-01' or '2025-11-01T06:00:00').
+    Served from the (location, timestamp) / (timestamp) indexes, not a table scan.
+    """
+    cursor = get_connection().cursor()
+    params = [to_timestamp(start), to_timestamp(end)]
+    where = "timestamp >= ? AND timestamp < ?"
+    if location is not None:
+        where = "location = ? AND " + where
+        params.insert(0, location)
+
+    cursor.execute(f"""
     SELECT * FROM readings
-    WHERE timestamp LIKE ?
+    WHERE {where}
     ORDER BY timestamp DESC
-    """, (f"{date_str}%",))
+    """, params)
+
+    return cursor.fetchall()
 
-    rows = cursor.fetchall()
-    conn.close()
 
-    return rows
+def get_latest_reading(location, statuses=("success", "corrected")):
+    """Newest (reading, timestamp) stored for the location with one of the given statuses, or None"""
+    cursor = get_connection().cursor()
+    cursor.execute(f"""
+    SELECT reading, timestamp FROM readings
+    WHERE location = ? AND status IN ({', '.join('?' * len(statuses))})
+    ORDER BY timestamp DESC
+    LIMIT 1
+    """, (location, *statuses))
+    return cursor.fetchone()
 
 
-def update_setting(key, value):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def get_readings_by_date(date_str, location=None):
+    """date_str example: '2025-11-01'"""
+    day = date.fromisoformat(date_str)
+    return get_readings_between(location, day, day + timedelta(days=1))
 
-    cursor.execute("""
-    INSERT INTO settings (key, value)
-    VALUES (?, ?)
-    ON CONFLICT(key) DO UPDATE SET value = excluded.value
-    """, (key, str(value)))
 
-    conn.commit()
-    conn.close()
+def update_setting(key, value):
+    with write_transaction() as conn:
+        conn.execute("""
+        INSERT INTO settings (key, value)
+        VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (key, str(value)))
 
 
 def get_setting(key):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
 
     row = cursor.fetchone()
-    conn.close()
-
     if row:
         return row[0]
     return None
 
 
-def export_to_csv(date_str, output_path):
-    readings = get_readings_by_date(date_str)
-    if not readings:
-        print("⚠️ No readings found for this date.")
-        return
+def delete_setting(key):
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM settings WHERE key = ?", (key,))
+
 
-    headers = ["id", "timestamp", "reading", "confidence", "image_path", "status", "notes"]
+def export_to_csv(date_str, output_path, location=None):
+    from GM_data.db_export import export_readings  # db_export builds on this module
 
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        writer.writerows(readings)
+    day = date.fromisoformat(date_str)
+    count = export_readings(output_path, day, day + timedelta(days=1),
+                            None if location is None else [location], fmt="csv")
+    if not count:
+        os.remove(output_path)  # header-only file
+        print("⚠️ No readings found for this date.")
+        return
 
     print(f"✅ CSV exported: {output_path}")
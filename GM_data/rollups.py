@@ -0,0 +1,227 @@
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from GM_data.db_export import iter_readings
+from GM_data.db_setup import initialize_database
+from GM_data.db_utilities import (ROLLUP_PREFIX, TRUSTED_STATUSES, get_connection, to_timestamp, update_rollups,
+                                  use_database, write_transaction)
+from GM_pipeline import metrics
+
+
+# ========== CONSUMPTION ROLLUPS + RAW RETENTION ==========
+# The rollups table holds hourly, daily and monthly aggregates per location (samples, failures,
+# min/max/first/last reading, delta). Every readings write updates them in the same transaction
+# (db_utilities.update_rollups), so dashboards and billing read a few rollup rows through the
+# primary key instead of scanning raw readings:
+#
+#   get_rollups("test_meter", "day", "2025-11-01", "2025-12-01")   # 30 rows, consumption + flow rate
+#   get_consumption("test_meter", "2025-11-01", "2025-12-01")      # two index lookups
+#
+# Raw rows are downsampled once the rollups have them: full resolution for FULL_RESOLUTION_DAYS,
+# then one reading per location and hour, and none after RAW_RETENTION_DAYS. The rollups are kept.
+# Retention runs on its own background thread (start_retention), one day of readings per write
+# transaction, so the writer lock is never held for long and captures keep storing meanwhile. On a
+# node that replicates to a master (GM_data/sync.py), rows past the id the master has confirmed are
+# left alone until it has pulled them.
+# rebuild_rollups() recomputes them from raw rows (e.g. for a database that predates them); only do
+# that while the raw rows are still at full resolution.
+
+FULL_RESOLUTION_DAYS = 30     # raw readings kept as captured
+RAW_RETENTION_DAYS = 365      # hourly raw readings kept until then, deleted after
+MAINTAIN_INTERVAL = 24 * 3600.0
+DELETE_CHUNK = 5000           # rows per delete transaction
+
+ROLLUP_COLUMNS = ["bucket", "samples", "failures", "min_reading", "max_reading", "first_reading", "first_time",
+                  "last_reading", "last_time", "delta"]
+
+
+def bucket_of(value, granularity):
+    """Bucket key containing value (datetime, date or ISO string)"""
+    return to_timestamp(value)[:ROLLUP_PREFIX[granularity]]
+
+
+def _hours_between(start, end):
+    return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() / 3600.0
+
+
+# ----- queries -----
+
+
+def reading_at(location, when):
+    """(reading, timestamp) of the last trusted reading up to the end of when's hour, or None"""
+    return get_connection().execute("""
+    SELECT last_reading, last_time FROM rollups
+    WHERE granularity = 'hour' AND location = ? AND bucket <= ? AND last_reading IS NOT NULL
+    ORDER BY bucket DESC
+    LIMIT 1
+    """, (location, bucket_of(when, "hour"))).fetchone()
+
+
+def get_rollups(location, granularity, start, end):
+    """
+    Buckets from start's bucket up to (not including) end's bucket, oldest first, as dicts of
+    ROLLUP_COLUMNS plus consumption (since the previous bucket's last reading) and rate_per_hour.
+    Served from the rollups primary key: cost grows with the buckets returned, not the raw rows.
+    """
+    conn = get_connection()
+    first, last = bucket_of(start, granularity), bucket_of(end, granularity)
+    rows = conn.execute(f"""
+    SELECT {', '.join(ROLLUP_COLUMNS)} FROM rollups
+    WHERE granularity = ? AND location = ? AND bucket >= ? AND bucket < ?
+    ORDER BY bucket
+    """, (granularity, location, first, last)).fetchall()
+    previous = conn.execute("""
+    SELECT last_reading, last_time FROM rollups
+    WHERE granularity = ? AND location = ? AND bucket < ? AND last_reading IS NOT NULL
+    ORDER BY bucket DESC
+    LIMIT 1
+    """, (granularity, location, first)).fetchone()
+
+    buckets = []
+    for row in rows:
+        bucket = dict(zip(ROLLUP_COLUMNS, row))
+        bucket["consumption"] = bucket["rate_per_hour"] = None
+        if bucket["last_reading"] is not None:
+            if previous is not None:
+                bucket["consumption"] = bucket["last_reading"] - previous[0]
+                hours = _hours_between(previous[1], bucket["last_time"])
+                if hours > 0:
+                    bucket["rate_per_hour"] = round(bucket["consumption"] / hours, 3)
+            previous = (bucket["last_reading"], bucket["last_time"])
+        buckets.append(bucket)
+    return buckets
+
+
+def get_consumption(location, start, end):
+    """
+    Gas used between start and end (hour resolution) and the mean flow per hour:
+    {"consumption", "rate_per_hour", "from", "to"}, or None without readings on both sides.
+    """
+    before, after = reading_at(location, start), reading_at(location, end)
+    if before is None or after is None:
+        return None
+    hours = _hours_between(before[1], after[1])
+    consumption = after[0] - before[0]
+    return {"consumption": consumption, "rate_per_hour": round(consumption / hours, 3) if hours > 0 else None,
+            "from": before[1], "to": after[1]}
+
+
+# ----- maintenance -----
+
+
+def rebuild_rollups(location=None):
+    """Recomputes the rollups of one location (None = all) from the raw readings; returns rows replayed"""
+    replayed = 0
+    with write_transaction() as conn:
+        if location is None:
+            conn.execute("DELETE FROM rollups")
+        else:
+            conn.execute("DELETE FROM rollups WHERE location = ?", (location,))
+        # iter_readings reads on this thread's own connection; the writes go through the writer
+        for chunk in iter_readings(locations=None if location is None else [location]):
+            update_rollups(conn, [row[1:] for row in chunk])  # drop the id: INSERT_READING column order
+            replayed += len(chunk)
+    print(f"✅ Rollups rebuilt from {replayed} readings.")
+    return replayed
+
+
+DOWNSAMPLE_HOURLY = f"""
+    DELETE FROM readings
+    WHERE timestamp >= :start AND timestamp < :end AND id <= :max_id AND id NOT IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY location, substr(timestamp, 1, 13)
+                ORDER BY status IN ({', '.join(repr(s) for s in TRUSTED_STATUSES)}) DESC, timestamp DESC
+            ) AS rank
+            FROM readings WHERE timestamp >= :start AND timestamp < :end
+        ) WHERE rank = 1
+    )
+"""
+
+
+DELETE_EXPIRED = """
+    DELETE FROM readings WHERE id IN (
+        SELECT id FROM readings WHERE timestamp < ? AND id <= ? LIMIT ?
+    )
+"""
+
+
+def downsample_raw(now=None, max_id=None):
+    """
+    Applies the raw retention policy: readings older than FULL_RESOLUTION_DAYS are thinned to the last
+    trusted one per location and hour, readings older than RAW_RETENTION_DAYS are deleted. Only rows
+    with id <= max_id are touched (None = all). Commits one day (or DELETE_CHUNK rows) at a time.
+    Returns {"thinned", "deleted"}.
+    """
+    now = now or datetime.now()
+    max_id = 2 ** 63 - 1 if max_id is None else max_id  # SQLite's largest integer
+    hourly_cutoff = to_timestamp(now - timedelta(days=FULL_RESOLUTION_DAYS))
+    delete_cutoff = to_timestamp(now - timedelta(days=RAW_RETENTION_DAYS))
+    thinned = deleted = 0
+    with metrics.timer("db.retention"):
+        while True:
+            with write_transaction() as conn:
+                removed = conn.execute(DELETE_EXPIRED, (delete_cutoff, max_id, DELETE_CHUNK)).rowcount
+            deleted += removed
+            if removed < DELETE_CHUNK:
+                break
+
+        oldest = get_connection().execute("SELECT MIN(timestamp) FROM readings").fetchone()[0]
+        day = datetime.fromisoformat(oldest[:10]) if oldest else None
+        while day is not None and to_timestamp(day) < hourly_cutoff:
+            end = min(to_timestamp(day + timedelta(days=1)), hourly_cutoff)
+            with write_transaction() as conn:  # whole hours per day, so the thinning matches one pass
+                thinned += conn.execute(DOWNSAMPLE_HOURLY, {"start": to_timestamp(day), "end": end,
+                                                            "max_id": max_id}).rowcount
+            day += timedelta(days=1)
+    metrics.count("readings_thinned", thinned)
+    metrics.count("readings_deleted", deleted)
+    return {"thinned": thinned, "deleted": deleted}
+
+
+def start_retention(interval=MAINTAIN_INTERVAL, replicated=None):
+    """
+    Runs downsample_raw() every interval on a background thread (the first run after one interval).
+    replicated() returns the highest id safe to thin (e.g. sync.replicated_id); None = every row.
+    Returns the thread's stop event (set() to stop).
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                print(f"✅ Raw readings: {downsample_raw(max_id=replicated() if replicated else None)}")
+            except Exception as e:
+                print(f"⚠️ Raw retention failed (retried in {interval:.0f} s): {e}")
+
+    threading.Thread(target=run, name="retention", daemon=True).start()
+    return stop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consumption rollups and raw reading retention.")
+    parser.add_argument("command", choices=["show", "rebuild", "retention"])
+    parser.add_argument("--db", help="database file (default: DB_PATH)")
+    parser.add_argument("--location", help="meter location (required for show)")
+    parser.add_argument("--granularity", choices=list(ROLLUP_PREFIX), default="day")
+    parser.add_argument("--start", help="show: first bucket (ISO)")
+    parser.add_argument("--end", help="show: end (exclusive, ISO)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        initialize_database(args.db)
+        use_database(args.db)
+
+    if args.command == "rebuild":
+        rebuild_rollups(args.location)
+    elif args.command == "retention":
+        print(f"✅ Raw readings: {downsample_raw()}")
+    else:
+        for b in get_rollups(args.location, args.granularity, args.start, args.end):
+            print(f"{b['bucket']:<14} {b['samples']:6d} samples {b['failures']:4d} failures  "
+                  f"reading {b['last_reading']}  used {b['consumption']}  rate {b['rate_per_hour']} ft³/h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import argparse
+import json
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from GM_data.db_export import READING_COLUMNS
+from GM_data.db_setup import initialize_database
+from GM_data.db_utilities import get_connection, get_setting, update_setting, use_database, write_transaction
+from GM_pipeline import metrics
+
+
+# ========== EDGE -> CENTRAL REPLICATION ==========
+# Each node serves its readings table in id order over HTTP; the central server pulls every node
+# incrementally into master_readings:
+#
+#   node:     python -m GM_data.sync serve --port 8471
+#   central:  python -m GM_data.sync pull --db master.db --node pi-basement=http://10.0.0.21:8471 ...
+#
+# readings ids only grow (AUTOINCREMENT) and rows are never updated after insert, so the highest id
+# already replicated is a complete high-water mark. A batch is zlib-compressed JSON; the master
+# applies it with INSERT OR REPLACE on (node, id) and advances the node's high-water mark in the same
+# transaction, so an interrupted pull resumes from the last committed batch and a batch applied twice
+# changes nothing. A request for the rows after id X therefore also tells the node that the master
+# holds every row up to X, as far as this node served those rows: the node records X capped at the
+# highest id it has served (and its own MAX(id)) as replicated_id, so raw retention
+# (rollups.downsample_raw) never thins rows the master has not pulled yet. A master asking from
+# further back (restored, or its state reset) lowers the mark again.
+
+SYNC_PORT = 8471
+BATCH_ROWS = 5000               # rows per batch
+COMPRESS_LEVEL = 6
+TIMEOUT = (3.05, 30.0)          # (connect, read) seconds per batch request
+ACKED_KEY = "sync_replicated_id"  # settings key: highest id the master has confirmed holding
+
+_acked = None                   # replicated_id, loaded from settings on first use
+_served = 0                     # highest id sent to the master by this process
+_acked_lock = threading.Lock()
+
+SELECT_BATCH = f"SELECT {', '.join(READING_COLUMNS)} FROM readings WHERE id > ? ORDER BY id LIMIT ?"
+APPLY_ROW = f"""
+    INSERT OR REPLACE INTO master_readings (node, {', '.join(READING_COLUMNS)})
+    VALUES (?, {', '.join('?' * len(READING_COLUMNS))})
+"""
+UPDATE_STATE = """
+    INSERT INTO sync_state (node, high_water, rows, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(node) DO UPDATE SET high_water = excluded.high_water, rows = rows + excluded.rows,
+                                    updated_at = excluded.updated_at
+"""
+
+
+# ----- node side -----
+
+
+def encode_batch(after_id, limit=BATCH_ROWS):
+    """(compressed batch, rows in it, last id) of the readings after after_id"""
+    cursor = get_connection().cursor()
+    try:
+        rows = cursor.execute(SELECT_BATCH, (after_id, limit)).fetchall()
+    finally:
+        cursor.close()
+    body = json.dumps({"columns": READING_COLUMNS, "rows": rows}, separators=(",", ":")).encode()
+    return zlib.compress(body, COMPRESS_LEVEL), len(rows), rows[-1][0] if rows else after_id
+
+
+def replicated_id():
+    """Highest readings id the master has confirmed holding (0 before the first pull)"""
+    global _acked
+    with _acked_lock:
+        if _acked is None:
+            try:
+                _acked = int(get_setting(ACKED_KEY) or 0)
+            except ValueError:
+                _acked = 0
+        return _acked
+
+
+def served(last_id):
+    """Notes the highest id sent in a batch"""
+    global _served
+    with _acked_lock:
+        _served = max(_served, last_id)
+
+
+def acknowledge(after_id):
+    """
+    Records that the master holds every row up to after_id (it only asks for rows past its high-water
+    mark), capped at what this node has actually served; a lower after_id lowers the mark.
+    """
+    global _acked
+    stored = replicated_id()
+    newest = get_connection().execute("SELECT MAX(id) FROM readings").fetchone()[0] or 0
+    with _acked_lock:
+        mark = max(0, min(after_id, max(_served, stored), newest))
+        if mark == _acked:
+            return
+        _acked = mark
+    update_setting(ACKED_KEY, mark)
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    """GET /sync/readings?after=<id>&limit=<n>"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/sync/readings":
+            self._send(404, b"")
+            return
+        query = parse_qs(url.query)
+        try:
+            after = int(query.get("after", ["0"])[0])
+            limit = min(int(query.get("limit", [BATCH_ROWS])[0]), BATCH_ROWS)
+        except ValueError:
+            self._send(400, b"")
+            return
+        acknowledge(after)
+        with metrics.timer("sync.encode"):
+            body, count, last_id = encode_batch(after, limit)
+        if count:
+            served(last_id)
+        self._send(200, body, {"X-Rows": count, "X-Last-Id": last_id})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_sync_server(port=SYNC_PORT, host="0.0.0.0"):
+    """Serves this node's readings on a background thread; returns the server (call shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), SyncHandler)
+    threading.Thread(target=server.serve_forever, name="sync-server", daemon=True).start()
+    print(f"✅ Sync server listening on {host}:{server.server_address[1]}")
+    return server
+
+
+# ----- central side -----
+
+
+def high_water(node):
+    row = get_connection().execute("SELECT high_water FROM sync_state WHERE node = ?", (node,)).fetchone()
+    return row[0] if row else 0
+
+
+def apply_batch(node, rows, last_id):
+    """Writes one batch and the node's new high-water mark atomically"""
+    with write_transaction() as conn:
+        conn.executemany(APPLY_ROW, [(node, *row) for row in rows])
+        conn.execute(UPDATE_STATE, (node, last_id, len(rows), datetime.now().isoformat(timespec='seconds')))
+
+
+def pull_node(node, url, session=None, max_batches=None, batch_rows=BATCH_ROWS):
+    """
+    Pulls every reading of node (base url of its sync server) past the high-water mark.
+    Returns {"rows", "batches", "bytes", "seconds"}; rerun to resume after an interruption.
+    """
+    session = session or requests.Session()
+    after = high_water(node)
+    stats = {"rows": 0, "batches": 0, "bytes": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    while max_batches is None or stats["batches"] < max_batches:
+        with metrics.timer("sync.fetch"):
+            response = session.get(f"{url.rstrip('/')}/sync/readings", params={"after": after, "limit": batch_rows},
+                                   timeout=TIMEOUT)
+            response.raise_for_status()
+        batch = json.loads(zlib.decompress(response.content))
+        if batch["columns"] != READING_COLUMNS:
+            raise ValueError(f"{node} sent columns {batch['columns']}, expected {READING_COLUMNS}")
+        rows = batch["rows"]
+        if not rows:
+            break
+        with metrics.timer("sync.apply"):
+            apply_batch(node, rows, rows[-1][0])
+        metrics.count("sync_rows", len(rows))
+        after = rows[-1][0]
+        stats["rows"] += len(rows)
+        stats["batches"] += 1
+        stats["bytes"] += len(response.content)
+        if len(rows) < batch_rows:
+            break
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def pull_all(nodes, max_batches=None):
+    """Pulls {node: url} one node after another; a failing node doesn't stop the others"""
+    results = {}
+    with requests.Session() as session:
+        for node, url in nodes.items():
+            try:
+                results[node] = pull_node(node, url, session, max_batches)
+                print(f"✅ {node}: {results[node]['rows']} rows in {results[node]['batches']} batch(es)")
+            except (requests.RequestException, ValueError, zlib.error) as e:
+                results[node] = {"error": str(e)}
+                print(f"❌ {node}: {e} (resumes from the last committed batch next time)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replicate node readings to the central master database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="node: serve this node's readings")
+    serve.add_argument("--port", type=int, default=SYNC_PORT)
+    serve.add_argument("--db", help="database file (default: DB_PATH)")
+    pull = sub.add_parser("pull", help="central: pull new readings from every node")
+    pull.add_argument("--db", help="master database file (default: DB_PATH)")
+    pull.add_argument("--node", action="append", required=True, metavar="NAME=URL",
+                      help="node name and sync server url, e.g. pi-basement=http://10.0.0.21:8471")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        initialize_database(args.db)
+        use_database(args.db)
+    else:
+        initialize_database()
+
+    if args.command == "serve":
+        server = start_sync_server(args.port)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        pull_all(dict(node.split("=", 1) for node in args.node))
+
+
+if __name__ == "__main__":
+    main()
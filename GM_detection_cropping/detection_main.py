@@ -1,19 +1,27 @@
 from secret import *
 import cv2
-import requests
+import numpy as np
+
+from GM_detection_cropping.detectors import get_detector, detect_scaled, print_results
+from GM_detection_cropping.layout_cache import cached_boxes, save_layout
+from GM_pipeline import metrics
 
 
 # Model Configuration
 API_KEY = GM_API
 API_URL = f"https://detect.roboflow.com/{GM_ID}"
 
+# Detector backend: "roboflow" (hosted API), "hough" (local classical CV) or "onnx" (local model)
+DETECTOR_BACKEND = "roboflow"
+DETECTOR_OPTIONS = {
+    "roboflow": {"api_url": API_URL, "api_key": API_KEY},
+    "hough": {},
+    "onnx": {"model_path": "GM_detection_cropping/gauge_detector.onnx"},
+}
 
-def print_results(result):
-    """Outputting Detection Results"""
-    if "predictions" in result:
-        for pred in result["predictions"]:
-            print(f"Detected {pred['class']} at ({pred['x']}, {pred['y']}) "
-                  f"with confidence {pred['confidence']:.2f}")
+# Detection runs on a copy downscaled to this longest side (None = full resolution);
+# boxes are mapped back so the crops keep full detail
+DETECT_MAX_SIDE = 1280
 
 
 def four_gauge_filter(boxes, tolerance):
@@ -64,45 +72,57 @@ def five_gauge_filter(boxes, tolerance):
     return gauges_ordered
 
 
-def d_main(image_path, filter_type, debug, y_tolerance_ratio=0.065):
-    image = cv2.imread(image_path)
-    if image is None:
-        raise FileNotFoundError(f"Could not load image: {image_path}")
-
-    # Run API Model
-    with open(image_path, "rb") as f:
-        response = requests.post(
-            API_URL,
-            params={"api_key": API_KEY},
-            files={"file": f},
-        )
-    result = response.json()
-    # print(result)
-    print_results(result)
-
-    predictions = result.get("predictions", [])
-    if not predictions:
-        print("No gauges detected.")
-        return []
+def resolve_detector(detector):
+    """Accepts a backend name or an already built detector instance"""
+    if detector is None:
+        detector = DETECTOR_BACKEND
+    if isinstance(detector, str):
+        return get_detector(detector, **DETECTOR_OPTIONS.get(detector, {}))
+    return detector
 
-    # Extract bounding boxes and sort them by x-coordinate (rightmost first)
-    boxes = []
-    height, width = image.shape[:2]
-    for pred in predictions:
-        x_center, y_center = pred["x"], pred["y"]
-        w, h = pred["width"], pred["height"]
 
-        # Convert (x, y, w, h) to corner coordinates
-        x1 = int(max(0, x_center - w / 2))
-        y1 = int(max(0, y_center - h / 2))
-        x2 = int(min(width, x_center + w / 2))
-        y2 = int(min(height, y_center + h / 2))
+def crop_gauges(image, boxes, debug):
+    cropped_gauges = []
+    for i, b in enumerate(boxes):
+        crop = image[b["y1"]:b["y2"], b["x1"]:b["x2"]]
+        cropped_gauges.append(crop)
+        if debug:
+            cv2.imwrite(f"cropped_gauge_{i}.png", crop) # optional debug output
+    return cropped_gauges
+
 
-        boxes.append({
-            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
-        })
+def d_main(image_path, filter_type, debug, y_tolerance_ratio=0.065, detector=None, location=None,
+           detect_max_side=DETECT_MAX_SIDE, return_boxes=False):
+    """Returns the ordered gauge crops, or (crops, boxes) with return_boxes (boxes keep the detector's confidence)"""
+    if isinstance(image_path, np.ndarray):
+        image = image_path
+        image_path = None
+    else:
+        with metrics.timer("decode"):
+            image = cv2.imread(image_path)
+        if image is None:
+            raise FileNotFoundError(f"Could not load image: {image_path}")
+
+    # Fixed mount: reuse the last good layout unless the camera has drifted
+    if location is not None:
+        with metrics.timer("layout_check"):
+            boxes = cached_boxes(location, image)
+        metrics.count("layout_cache_hits" if boxes is not None else "layout_cache_misses")
+        if boxes is not None:
+            cropped_gauges = crop_gauges(image, boxes, debug)
+            print(f"\nReused cached layout, cropped {len(cropped_gauges)} gauges.\n")
+            return (cropped_gauges, boxes) if return_boxes else cropped_gauges
+
+    # Run detection model (boxes come back as x1, y1, x2, y2 dicts)
+    with metrics.timer("detect"):
+        boxes = detect_scaled(resolve_detector(detector), image, detect_max_side, image_path)
+    if not boxes:
+        metrics.count("detect_failures")
+        print("No gauges detected.")
+        return ([], []) if return_boxes else []
 
     # Filter vertically misaligned detections
+    height = image.shape[0]
     y_tolerance = int(height * y_tolerance_ratio)
     if filter_type == 5:
         boxes = sketchy_five_gauge_filter(boxes, y_tolerance)
@@ -111,15 +131,14 @@ def d_main(image_path, filter_type, debug, y_tolerance_ratio=0.065):
 
     if not boxes:
         print("No horizontally aligned gauges found.")
-        return []
+        return ([], []) if return_boxes else []
+
+    # Only a complete layout is worth caching for the next frames
+    if location is not None and len(boxes) == filter_type:
+        save_layout(location, image, boxes)
 
     # Crop gauges
-    cropped_gauges = []
-    for i, b in enumerate(boxes):
-        crop = image[b["y1"]:b["y2"], b["x1"]:b["x2"]]
-        cropped_gauges.append(crop)
-        if debug:
-            cv2.imwrite(f"cropped_gauge_{i}.png", crop) # optional debug output
+    cropped_gauges = crop_gauges(image, boxes, debug)
 
     print(f"\nDetected and cropped {len(cropped_gauges)} gauges.\n")
-    return cropped_gauges
+    return (cropped_gauges, boxes) if return_boxes else cropped_gauges
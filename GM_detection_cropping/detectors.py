@@ -0,0 +1,271 @@
+import math
+import cv2
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from GM_detection_cropping.edges import edge_support
+from GM_pipeline import metrics
+
+
+# ========== DETECTOR BACKENDS ==========
+# Every backend exposes detect(image, image_path=None) and returns a list of box dicts
+# {"x1", "y1", "x2", "y2", "confidence"} in full-frame pixel coordinates, so the
+# gauge filters and cropping in detection_main work unchanged whichever engine is used.
+
+
+def clip_box(x_center, y_center, w, h, width, height, confidence=None):
+    """Convert (x, y, w, h) to a corner box clipped to the frame"""
+    return {
+        "x1": int(max(0, x_center - w / 2)),
+        "y1": int(max(0, y_center - h / 2)),
+        "x2": int(min(width, x_center + w / 2)),
+        "y2": int(min(height, y_center + h / 2)),
+        "confidence": confidence,
+    }
+
+
+def parse_predictions(result, image, scale=1.0):
+    """Roboflow response JSON -> clipped box dicts for this frame (scale = size of the uploaded copy)"""
+    height, width = image.shape[:2]
+    return [
+        clip_box(p["x"] / scale, p["y"] / scale, p["width"] / scale, p["height"] / scale, width, height,
+                 p.get("confidence"))
+        for p in result.get("predictions", [])
+    ]
+
+
+class DetectorUnavailable(ConnectionError):
+    """The hosted detector did not answer (after retries); the frame can be queued and read later"""
+
+
+def make_session(retries, backoff, pool_size=4):
+    """
+    Keep-alive session (one TLS handshake, then reused connections) that retries connection errors,
+    read timeouts and 429/5xx answers with exponential backoff. Detection is idempotent, so POSTs are
+    retried too.
+    """
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"POST"}),
+                  respect_retry_after_header=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RoboflowDetector:
+    """
+    Remote inference on the Roboflow hosted model (needs a network connection).
+    Uploads a downscaled JPEG over a pooled session with strict timeouts; when the service stays
+    unreachable through the retries it raises DetectorUnavailable instead of stalling the loop.
+    """
+
+    name = "roboflow"
+
+    def __init__(self, api_url, api_key, timeout=(3.05, 10.0), retries=2, backoff=0.5, upload_max_side=1280,
+                 upload_quality=85):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = timeout                  # (connect, read) seconds per attempt
+        self.upload_max_side = upload_max_side  # longest side of the uploaded copy (None = full size)
+        self.upload_quality = upload_quality    # JPEG quality of the upload
+        self.session = make_session(retries, backoff)
+
+    def detect(self, image, image_path=None):
+        height, width = image.shape[:2]
+        # Whole-number decimation: INTER_AREA has a fast path for integer factors (~3x cheaper)
+        factor = 1 if not self.upload_max_side else math.ceil(max(height, width) / float(self.upload_max_side))
+        small = cv2.resize(image, (width // factor, height // factor), interpolation=cv2.INTER_AREA) \
+            if factor > 1 else image
+        scale = small.shape[1] / float(width)
+        ok, buf = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.upload_quality])
+        if not ok:
+            raise ValueError("Could not encode frame for upload.")
+
+        try:
+            with metrics.timer("detect.http"):
+                response = self.session.post(
+                    self.api_url,
+                    params={"api_key": self.api_key},
+                    files={"file": ("frame.jpg", buf.tobytes(), "image/jpeg")},
+                    timeout=self.timeout,
+                )
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError) as e:
+            metrics.count("detect_unavailable")
+            raise DetectorUnavailable(f"Detector unreachable: {e.__class__.__name__}") from e
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code >= 500:
+                metrics.count("detect_unavailable")
+                raise DetectorUnavailable(f"Detector unavailable: HTTP {e.response.status_code}") from e
+            raise
+        result = response.json()
+        print_results(result)
+        return parse_predictions(result, image, scale)
+
+
+class HoughDialDetector:
+    """
+    Local classical-CV detector: Hough circles over a downscaled copy of the frame, then
+    layout clustering (dials on one meter share a radius) and overlap suppression.
+    Work is done at a fixed working size, so latency is bounded regardless of camera resolution.
+    """
+
+    name = "hough"
+
+    def __init__(self, work_size=960, min_radius_ratio=0.02, max_radius_ratio=0.12,
+                 radius_tolerance=0.15, box_scale=2.4, min_support=0.25, max_dials=8):
+        self.work_size = work_size              # longest side (px) the frame is processed at
+        self.min_radius_ratio = min_radius_ratio  # dial radius limits relative to the longest side
+        self.max_radius_ratio = max_radius_ratio
+        self.radius_tolerance = radius_tolerance  # accepted radius spread within one meter's layout
+        self.box_scale = box_scale              # crop side as a multiple of the dial radius
+        self.min_support = min_support          # minimum fraction of the circle backed by edges
+        self.max_dials = max_dials
+
+    def detect(self, image, image_path=None):
+        height, width = image.shape[:2]
+        scale = min(1.0, self.work_size / float(max(height, width)))
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        side = max(gray.shape[:2])
+        min_r = max(8, int(self.min_radius_ratio * side))
+        max_r = int(self.max_radius_ratio * side)
+
+        # HOUGH_GRADIENT_ALT only keeps near-perfect circles (param2 = circularity), which is far
+        # cheaper than the accumulator-threshold variant over a wide radius range
+        circles = cv2.HoughCircles(
+            gray, cv2.HOUGH_GRADIENT_ALT, dp=1.5, minDist=int(1.6 * min_r),
+            param1=150, param2=0.8, minRadius=min_r, maxRadius=max_r
+        )
+        if circles is None:
+            return []
+
+        edges = cv2.Canny(gray, 60, 120)
+        scored = []
+        for cx, cy, r in circles[0]:
+            support = edge_support(edges, cx, cy, r)
+            if support >= self.min_support:
+                scored.append((support, float(cx), float(cy), float(r)))
+
+        layout = cluster_layout(suppress_overlaps(scored), self.radius_tolerance)[:self.max_dials]
+
+        boxes = []
+        for support, cx, cy, r in layout:
+            s = self.box_scale * r / scale
+            boxes.append(clip_box(cx / scale, cy / scale, s, s, width, height, round(support, 3)))
+        return boxes
+
+
+class OnnxDialDetector:
+    """
+    Local OpenCV-DNN inference on an exported (YOLOv8-style) ONNX gauge model.
+    The network is loaded once in the constructor and reused for every frame.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, input_size=640, score_threshold=0.40, nms_threshold=0.45):
+        self.net = cv2.dnn.readNetFromONNX(str(model_path))
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.input_size = input_size
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+
+    def detect(self, image, image_path=None):
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(image, 1 / 255.0, (self.input_size, self.input_size), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        out = self.net.forward()
+
+        # (1, 4 + classes, N) -> (N, 4 + classes)
+        preds = np.squeeze(out, axis=0).T
+        scores = preds[:, 4:].max(axis=1)
+        keep = scores >= self.score_threshold
+        preds, scores = preds[keep], scores[keep]
+        if not len(preds):
+            return []
+
+        sx, sy = width / float(self.input_size), height / float(self.input_size)
+        rects = [[float((cx - w / 2) * sx), float((cy - h / 2) * sy), float(w * sx), float(h * sy)]
+                 for cx, cy, w, h in preds[:, :4]]
+        idxs = cv2.dnn.NMSBoxes(rects, scores.tolist(), self.score_threshold, self.nms_threshold)
+
+        boxes = []
+        for i in np.array(idxs).flatten():
+            x, y, w, h = rects[i]
+            boxes.append(clip_box(x + w / 2, y + h / 2, w, h, width, height, round(float(scores[i]), 3)))
+        return boxes
+
+
+# ========== UTILITY FUNCTIONS ==========
+
+
+def print_results(result):
+    """Outputting Detection Results"""
+    if "predictions" in result:
+        for pred in result["predictions"]:
+            print(f"Detected {pred['class']} at ({pred['x']}, {pred['y']}) "
+                  f"with confidence {pred['confidence']:.2f}")
+
+
+def suppress_overlaps(scored):
+    """Greedy NMS on circles: keep the best-supported circle of any overlapping group"""
+    kept = []
+    for c in sorted(scored, key=lambda t: -t[0]):
+        _, cx, cy, r = c
+        if all(math.hypot(cx - k[1], cy - k[2]) > 0.8 * (r + k[3]) for k in kept):
+            kept.append(c)
+    return kept
+
+
+def cluster_layout(scored, tolerance):
+    """Keep the largest group of circles with a common radius (the meter's dial row)"""
+    best = []
+    for _, _, _, ref_r in scored:
+        group = [c for c in scored if abs(c[3] - ref_r) <= tolerance * ref_r]
+        if len(group) > len(best) or (len(group) == len(best) and sum(c[0] for c in group) > sum(c[0] for c in best)):
+            best = group
+    return sorted(best, key=lambda t: -t[0])
+
+
+def detect_scaled(detector, image, max_side=None, image_path=None):
+    """
+    Runs the detector on a copy whose longest side is at most max_side and maps the boxes
+    back to full-resolution coordinates (None = detect at native resolution).
+    """
+    height, width = image.shape[:2]
+    scale = 1.0 if not max_side else min(1.0, max_side / float(max(height, width)))
+    if scale >= 1.0:
+        return detector.detect(image, image_path)
+
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    boxes = detector.detect(small)  # the file on disk is full size, so upload the small copy instead
+    for b in boxes:
+        b["x1"], b["y1"] = int(b["x1"] / scale), int(b["y1"] / scale)
+        b["x2"], b["y2"] = min(width, int(b["x2"] / scale)), min(height, int(b["y2"] / scale))
+    return boxes
+
+
+_DETECTORS = {}
+
+
+def get_detector(name="roboflow", **kwargs):
+    """Returns a warm detector instance; each backend is built once per process and reused"""
+    key = (name, tuple(sorted(kwargs.items())))
+    if key not in _DETECTORS:
+        if name == "roboflow":
+            _DETECTORS[key] = RoboflowDetector(**kwargs)
+        elif name == "hough":
+            _DETECTORS[key] = HoughDialDetector(**kwargs)
+        elif name == "onnx":
+            _DETECTORS[key] = OnnxDialDetector(**kwargs)
+        else:
+            raise ValueError(f"Unknown detector backend: {name}")
+    return _DETECTORS[key]
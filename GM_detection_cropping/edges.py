@@ -0,0 +1,22 @@
+import math
+
+import numpy as np
+
+
+# ========== CIRCLE EDGE SUPPORT ==========
+# Shared by the hough detector (scoring candidate dials) and the dial geometry cache (checking a
+# cached circle still lies on the rim). Only needs NumPy, so the dial reader and its pool workers
+# can import it without the detector's HTTP dependencies.
+
+
+def edge_support(edges, cx, cy, r, samples=72):
+    """Fraction of points on the circle that land on (or next to) an edge pixel"""
+    h, w = edges.shape[:2]
+    angles = np.linspace(0, 2 * math.pi, samples, endpoint=False)
+    xs = np.clip(np.round(cx + r * np.cos(angles)).astype(int), 1, w - 2)
+    ys = np.clip(np.round(cy + r * np.sin(angles)).astype(int), 1, h - 2)
+    hits = np.zeros(samples, dtype=bool)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            hits |= edges[ys + dy, xs + dx] > 0
+    return float(hits.mean())
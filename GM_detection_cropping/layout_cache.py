@@ -0,0 +1,116 @@
+import base64
+import json
+import cv2
+import numpy as np
+
+from GM_data.db_utilities import get_setting, update_setting, delete_setting
+
+
+# ========== FIXED-MOUNT LAYOUT CACHE ==========
+# The ordered gauge boxes of the last good detection are stored per location (in the settings
+# table) together with a small grayscale reference thumbnail. Each new frame is phase-correlated
+# against that thumbnail; if the camera has not moved further than the drift threshold, the cached
+# boxes (nudged by the measured shift) are reused and detection is skipped entirely.
+
+THUMB_WIDTH = 256           # width (px) of the reference thumbnail used for the drift check
+MAX_DRIFT_RATIO = 0.10      # re-detect once the shift exceeds this fraction of the mean box width
+MIN_RESPONSE = 0.10         # phase-correlation peak below this means the scene itself changed
+
+_LAYOUTS = {}
+
+
+def make_thumbnail(image):
+    """Small grayscale copy of the frame for phase correlation"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    scale = THUMB_WIDTH / float(gray.shape[1])
+    thumb = cv2.resize(gray, (THUMB_WIDTH, max(1, int(round(gray.shape[0] * scale)))), interpolation=cv2.INTER_AREA)
+    return thumb
+
+
+def _setting_key(location):
+    return f"layout:{location}"
+
+
+def load_layout(location):
+    """Returns the cached layout for this location, or None"""
+    if location in _LAYOUTS:
+        return _LAYOUTS[location]
+
+    raw = get_setting(_setting_key(location))
+    if raw is None:
+        return None
+    data = json.loads(raw)
+    png = np.frombuffer(base64.b64decode(data["thumb"]), dtype=np.uint8)
+    layout = {
+        "boxes": data["boxes"],
+        "frame_size": tuple(data["frame_size"]),
+        "thumb": cv2.imdecode(png, cv2.IMREAD_GRAYSCALE),
+    }
+    _LAYOUTS[location] = layout
+    return layout
+
+
+def save_layout(location, image, boxes):
+    """Stores the ordered boxes of a good detection plus a reference thumbnail"""
+    thumb = make_thumbnail(image)
+    ok, png = cv2.imencode(".png", thumb)
+    if not ok:
+        return
+    layout = {"boxes": [dict(b) for b in boxes], "frame_size": tuple(image.shape[:2]), "thumb": thumb}
+    update_setting(_setting_key(location), json.dumps({
+        "boxes": layout["boxes"],
+        "frame_size": list(layout["frame_size"]),
+        "thumb": base64.b64encode(png.tobytes()).decode("ascii"),
+    }))
+    _LAYOUTS[location] = layout
+
+
+def clear_layout(location):
+    """Forgets the cached layout so the next frame is fully re-detected"""
+    _LAYOUTS.pop(location, None)
+    delete_setting(_setting_key(location))
+
+
+def measure_drift(layout, image):
+    """
+    Phase-correlates the frame against the reference thumbnail.
+    Returns (dx, dy, response) with the shift in full-resolution pixels.
+    """
+    thumb = make_thumbnail(image)
+    ref = layout["thumb"]
+    if thumb.shape != ref.shape:
+        return None
+    window = cv2.createHanningWindow(ref.shape[::-1], cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(np.float32(ref), np.float32(thumb), window)
+    scale = image.shape[1] / float(THUMB_WIDTH)
+    return dx * scale, dy * scale, response
+
+
+def cached_boxes(location, image):
+    """
+    Returns the cached boxes shifted to the current frame, or None when the cache is empty,
+    the frame size changed, or the camera drifted past the threshold.
+    """
+    layout = load_layout(location)
+    if layout is None or tuple(image.shape[:2]) != layout["frame_size"]:
+        return None
+
+    drift = measure_drift(layout, image)
+    if drift is None:
+        return None
+    dx, dy, response = drift
+
+    mean_width = sum(b["x2"] - b["x1"] for b in layout["boxes"]) / float(len(layout["boxes"]))
+    if response < MIN_RESPONSE or np.hypot(dx, dy) > MAX_DRIFT_RATIO * mean_width:
+        print(f"Camera drift detected (shift {dx:.1f}, {dy:.1f} px, response {response:.2f}); re-detecting.")
+        return None
+
+    height, width = image.shape[:2]
+    ox, oy = int(round(dx)), int(round(dy))
+    boxes = []
+    for b in layout["boxes"]:
+        shifted = dict(b)
+        shifted["x1"], shifted["x2"] = max(0, b["x1"] + ox), min(width, b["x2"] + ox)
+        shifted["y1"], shifted["y2"] = max(0, b["y1"] + oy), min(height, b["y2"] + oy)
+        boxes.append(shifted)
+    return boxes
@@ -0,0 +1,88 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+from GM_detection_cropping.detectors import DetectorUnavailable
+from GM_pipeline import metrics
+
+
+# ========== OFFLINE FRAME QUEUE ==========
+# Frames the hosted detector could not be reached for are kept on disk, one directory per location
+# (JPEG + JSON sidecar with capture time and archive path), so they survive restarts. Once the service
+# answers again they are read oldest first; while a backlog exists new frames join its end, so the
+# temporal check always sees readings in capture order. The queue is bounded: the oldest frames go first.
+
+QUEUE_DIR = Path(__file__).resolve().parent.parent / "GM_offline_queue"
+MAX_QUEUED = 1000       # frames kept per location
+DRAIN_PER_CYCLE = 5     # queued frames read per reading cycle while catching up
+QUEUE_QUALITY = 90      # JPEG quality of queued frames
+
+
+def _location_dir(location, queue_dir):
+    return Path(queue_dir or QUEUE_DIR) / str(location)
+
+
+def pending(location, queue_dir=None):
+    """Sidecar paths of the queued frames, oldest first"""
+    directory = _location_dir(location, queue_dir)
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob("*.json"))
+
+
+def backlog(location, queue_dir=None):
+    return len(pending(location, queue_dir))
+
+
+def _remove(sidecar):
+    sidecar.with_suffix(".jpg").unlink(missing_ok=True)
+    sidecar.unlink(missing_ok=True)
+
+
+def enqueue(frame, capture_time, location, image_path=None, queue_dir=None):
+    """Stores a frame for later reading; returns the queue length"""
+    directory = _location_dir(location, queue_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = directory / capture_time.strftime("%Y%m%d_%H%M%S_%f")
+    if not cv2.imwrite(str(stem.with_suffix(".jpg")), frame, [cv2.IMWRITE_JPEG_QUALITY, QUEUE_QUALITY]):
+        raise OSError(f"Could not write queued frame {stem}.jpg")
+    with open(stem.with_suffix(".json"), "w") as f:
+        json.dump({"capture_time": capture_time.isoformat(), "location": location, "image_path": image_path}, f)
+    metrics.count("offline_queued")
+
+    queued = pending(location, queue_dir)
+    for sidecar in queued[:max(0, len(queued) - MAX_QUEUED)]:
+        _remove(sidecar)
+        metrics.count("offline_dropped")
+    print(f"📥 Frame queued for later reading ({min(len(queued), MAX_QUEUED)} waiting).")
+    return min(len(queued), MAX_QUEUED)
+
+
+def drain(location, handler, limit=DRAIN_PER_CYCLE, queue_dir=None):
+    """
+    Calls handler(frame, capture_time, image_path) for up to limit queued frames, oldest first.
+    Stops (keeping the frame) when the detector is still unavailable; frames that fail otherwise are
+    dropped. Returns the number of frames taken off the queue.
+    """
+    drained = 0
+    for sidecar in pending(location, queue_dir)[:limit]:
+        with open(sidecar) as f:
+            entry = json.load(f)
+        frame = cv2.imread(str(sidecar.with_suffix(".jpg")))
+        try:
+            if frame is None:
+                raise ValueError(f"could not load {sidecar.with_suffix('.jpg')}")
+            handler(frame, datetime.fromisoformat(entry["capture_time"]), entry["image_path"])
+        except DetectorUnavailable:
+            break
+        except Exception as e:
+            metrics.count("offline_failed")
+            print(f"Error reading queued frame {sidecar.stem}: {e}")
+        _remove(sidecar)
+        drained += 1
+    if drained:
+        metrics.count("offline_drained", drained)
+        print(f"📤 Read {drained} queued frame(s), {backlog(location, queue_dir)} still waiting.")
+    return drained
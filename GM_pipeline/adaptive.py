@@ -0,0 +1,105 @@
+import time
+
+import cv2
+import numpy as np
+
+from GM_data.db_utilities import get_setting
+from GM_detection_cropping.layout_cache import load_layout
+from GM_pipeline import metrics
+
+
+# ========== ADAPTIVE CAPTURE SCHEDULE ==========
+# Instead of reading every period, each meter is probed on an interval that follows its flow: every
+# probe captures a frame and compares the two least-significant dials (first boxes of the cached
+# layout) with how they looked at the last stored reading. The second dial catches whole turns of
+# the first between two probes, which leave the first dial looking unchanged. That costs a capture
+# and two 64x64 differences, no detection or dial reading.
+#   - dial moved:   read the frame, next probe after min_interval_seconds (dense data while gas flows)
+#   - dial still:   skip the frame, next probe BACKOFF times later, up to max_interval_minutes
+#   - nothing stored for interval_minutes: read the frame anyway (an idle meter still reports)
+# The three intervals come from the settings table and are re-read on every probe, so changing them
+# (update_setting) takes effect without a restart. Without a cached layout every probe is read.
+
+BACKOFF = 2.0               # idle probe interval growth per probe without movement
+ROI_SIZE = 64               # the dial region is compared at this size (px)
+PIXEL_DELTA = 24            # grey levels a pixel must change by to count
+MOVED_FRACTION = 0.02       # share of changed pixels that means the needle moved
+WATCHED_DIALS = 2           # least-significant dials compared per probe
+DEFAULTS = {"interval_minutes": 30.0, "min_interval_seconds": 15.0, "max_interval_minutes": 10.0}
+
+
+def _setting(key):
+    try:
+        return float(get_setting(key))
+    except (TypeError, ValueError):
+        return DEFAULTS[key]
+
+
+def schedule_settings():
+    """(base, min, max) intervals in seconds from the settings table"""
+    base = _setting("interval_minutes") * 60
+    fastest = _setting("min_interval_seconds")
+    slowest = max(fastest, _setting("max_interval_minutes") * 60)
+    return base, fastest, slowest
+
+
+def dial_rois(location, view):
+    """The WATCHED_DIALS least-significant dials of the cached layout, grey and ROI_SIZE square (None: no layout)"""
+    layout = load_layout(location)
+    if layout is None or tuple(view.shape[:2]) != layout["frame_size"]:
+        return None
+    rois = []
+    for b in layout["boxes"][:WATCHED_DIALS]:  # boxes are ordered least significant first
+        crop = view[b["y1"]:b["y2"], b["x1"]:b["x2"]]
+        if crop.size == 0:
+            return None
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        rois.append(cv2.GaussianBlur(cv2.resize(gray, (ROI_SIZE, ROI_SIZE), interpolation=cv2.INTER_AREA), (5, 5), 0))
+    return rois
+
+
+def changed_fraction(a, b):
+    return float(np.count_nonzero(cv2.absdiff(a, b) > PIXEL_DELTA)) / a.size
+
+
+class AdaptiveSchedule:
+    """Probe interval and read/skip decision of one meter"""
+
+    def __init__(self, location):
+        self.location = location
+        self.base, self.fastest, self.slowest = schedule_settings()
+        self.interval = self.fastest
+        self.reference = None   # dial ROIs at the last frame read
+        self.last_read = None   # monotonic time of the last frame read
+        self.stats = {"probes": 0, "reads": 0, "skipped": 0, "moved": 0}
+
+    def should_read(self, view, now=None, force=False):
+        """
+        Probes one frame (the meter's view); returns True when it should be read and stored (always
+        with force, e.g. a "read now" request). Sets the interval until the next probe.
+        """
+        now = time.monotonic() if now is None else now
+        self.base, self.fastest, self.slowest = schedule_settings()
+        self.stats["probes"] += 1
+        with metrics.timer("probe"):
+            rois = dial_rois(self.location, view)
+        moved = (rois is None or self.reference is None or len(rois) != len(self.reference)
+                 or any(changed_fraction(a, b) >= MOVED_FRACTION for a, b in zip(rois, self.reference)))
+        due = self.last_read is None or now - self.last_read >= self.base
+
+        if moved:
+            self.stats["moved"] += 1
+            self.interval = self.fastest
+        else:
+            self.interval = min(self.interval * BACKOFF, self.slowest)
+        if not (moved or due or force):
+            self.stats["skipped"] += 1
+            metrics.count("probes_skipped")
+            return False
+        self.reference = rois
+        self.last_read = now
+        self.stats["reads"] += 1
+        return True
+
+    def next_interval(self):
+        return self.interval
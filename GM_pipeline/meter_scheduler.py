@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from GM_pipeline import metrics
+
+
+# ========== MULTI-METER SCHEDULER ==========
+# Runs the reading cycles of several meters (several cameras, or several meters in one camera's view)
+# on one node. Every meter keeps its own drift-free schedule: tick k is due at start + offset + k * period,
+# and its deadline is the next tick. Due cycles go to a shared pool of worker threads earliest deadline
+# first, with at most one cycle per meter in flight, so a slow meter only ever delays itself:
+#   - a meter whose cycle overruns skips the ticks it missed instead of queueing them up
+#   - a cycle that cannot start before its deadline is skipped (counted as a deadline miss)
+# Dial reading itself runs on the process-wide reading pool (reading_main), shared by all meters.
+# With interval=, a meter's next tick is instead interval(meter) seconds after the tick of the cycle
+# that just finished, so that cycle can speed up or back off its own meter (GM_pipeline/adaptive.py).
+# trigger(location) makes a meter due at once (the node API's "read now", GM_pipeline/node_api.py).
+
+
+class MeterScheduler:
+    def __init__(self, meters, cycle, workers=2, interval=None):
+        """meters: dicts with at least "location" and "period"; cycle(meter) runs one reading cycle"""
+        self.meters = meters
+        self.cycle = cycle
+        self.interval = interval
+        self.due = []
+        self.workers = max(1, min(workers, len(meters)))
+        self.stop_event = threading.Event()
+        self.changed = threading.Condition()
+        self.busy = set()
+        self.stats = {m["location"]: {"cycles": 0, "failed": 0, "deadline_misses": 0,
+                                      "overruns": 0, "max_latency": 0.0} for m in meters}
+
+    def _run_cycle(self, index, scheduled, deadline):
+        meter = self.meters[index]
+        failed = False
+        try:
+            with metrics.timer(f"cycle.{meter['location']}"):
+                self.cycle(meter)
+        except Exception as e:
+            failed = True
+            print(f"Error during reading cycle of {meter['location']}: {e}")
+        finally:
+            finished = time.monotonic()
+            with self.changed:
+                stats = self.stats[meter["location"]]
+                stats["cycles"] += 1
+                stats["failed"] += failed
+                stats["max_latency"] = max(stats["max_latency"], round(finished - scheduled, 3))
+                if finished > deadline:
+                    stats["overruns"] += 1  # the reading landed after the meter's next tick
+                if self.interval is not None:
+                    self.due[index] = scheduled + self.interval(meter)
+                self.busy.discard(index)
+                self.changed.notify()
+
+    def period(self, i):
+        return self.meters[i]["period"] if self.interval is None else self.interval(self.meters[i])
+
+    def run(self, max_cycles=None):
+        """Runs until stop() (or every meter has had max_cycles ticks); returns per-meter stats"""
+        start = time.monotonic()
+        # Spread the meters over the shortest period so their cycles don't all start together
+        spread = min(m["period"] for m in self.meters) / len(self.meters)
+        due = self.due = [start + i * spread for i in range(len(self.meters))]
+        ticks = [0] * len(self.meters)
+
+        def finished(i):
+            return max_cycles is not None and ticks[i] >= max_cycles
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="meter") as pool:
+            while not self.stop_event.is_set():
+                with self.changed:
+                    if all(finished(i) for i in range(len(self.meters))) and not self.busy:
+                        break
+                    now = time.monotonic()
+                    idle = [i for i in range(len(self.meters)) if i not in self.busy and not finished(i)]
+                    ready = [i for i in idle if due[i] <= now]
+                    ready.sort(key=lambda i: due[i] + self.period(i))  # earliest deadline first
+                    for i in ready[:self.workers - len(self.busy)]:
+                        period = self.period(i)
+                        missed = int((now - due[i]) // period)
+                        if missed:
+                            # Only the latest tick is still worth reading; the others' deadlines are gone
+                            self.stats[self.meters[i]["location"]]["deadline_misses"] += missed
+                            metrics.count("deadline_misses", missed)
+                            due[i] += missed * period
+                        scheduled, deadline = due[i], due[i] + period
+                        due[i] = deadline
+                        ticks[i] += 1 + missed
+                        self.busy.add(i)
+                        pool.submit(self._run_cycle, i, scheduled, deadline)
+                    # Sleep until the next idle meter is due, or until a worker frees up
+                    waiting = [due[i] for i in range(len(self.meters)) if i not in self.busy and not finished(i)]
+                    if len(self.busy) >= self.workers or not waiting:
+                        self.changed.wait()
+                    else:
+                        self.changed.wait(max(0.0, min(waiting) - time.monotonic()))
+
+        return self.stats
+
+    def trigger(self, location):
+        """Makes the meter due now (a cycle of it already running is not repeated)"""
+        with self.changed:
+            for i, meter in enumerate(self.meters):
+                if meter["location"] == location and self.due:
+                    self.due[i] = min(self.due[i], time.monotonic())
+            self.changed.notify()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.changed:
+            self.changed.notify()
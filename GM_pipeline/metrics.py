@@ -0,0 +1,201 @@
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+# ========== STAGE METRICS ==========
+# Always-on, low-overhead instrumentation: timer(stage) costs two perf_counter calls and a dict
+# update, count(name) a dict update. Aggregates accumulate in-process and are exported per interval
+# (then reset) to the metrics table or a JSON-lines file, so every row covers one interval:
+#
+#   with metrics.timer("detect"): ...
+#   metrics.count("dials_read")
+#   metrics.maybe_export("sqlite")        # or a path such as "metrics.jsonl"
+#
+# Worker processes keep their own registry; drain() hands it to the parent, which merge()s it.
+
+SAMPLES = 512            # most recent durations kept per stage for the percentiles
+EXPORT_INTERVAL = 300.0  # seconds between maybe_export() writes
+
+_lock = threading.Lock()
+_timers = {}     # stage -> {"count", "total", "max", "samples"}
+_counters = {}   # name -> value
+_last_export = time.monotonic()
+
+
+def record(stage, seconds):
+    with _lock:
+        t = _timers.get(stage)
+        if t is None:
+            t = _timers[stage] = {"count": 0, "total": 0.0, "max": 0.0, "samples": []}
+        t["count"] += 1
+        t["total"] += seconds
+        if seconds > t["max"]:
+            t["max"] = seconds
+        t["samples"].append(seconds)
+        if len(t["samples"]) > SAMPLES:
+            del t["samples"][:len(t["samples"]) - SAMPLES]
+
+
+@contextmanager
+def timer(stage):
+    """Times the block as one sample of stage (also when it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _percentile(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+def snapshot():
+    """{"timers": {stage: {count, total_ms, mean_ms, p50_ms, p95_ms, max_ms}}, "counters": {name: value}}"""
+    with _lock:
+        timers = {stage: dict(t, samples=sorted(t["samples"])) for stage, t in _timers.items()}
+        counters = dict(_counters)
+    summary = {}
+    for stage, t in sorted(timers.items()):
+        samples = t["samples"]
+        summary[stage] = {
+            "count": t["count"],
+            "total_ms": round(t["total"] * 1000, 3),
+            "mean_ms": round(t["total"] * 1000 / t["count"], 3),
+            "p50_ms": round(_percentile(samples, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(samples, 0.95) * 1000, 3),
+            "max_ms": round(t["max"] * 1000, 3),
+        }
+    return {"timers": summary, "counters": dict(sorted(counters.items()))}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def drain():
+    """Raw aggregates for merge() in another process; clears this process's registry"""
+    with _lock:
+        raw = {"timers": {s: dict(t, samples=list(t["samples"])) for s, t in _timers.items()},
+               "counters": dict(_counters)}
+        _timers.clear()
+        _counters.clear()
+    return raw
+
+
+def merge(raw):
+    """Adds a drain() result (e.g. from a pool worker) into this process's registry"""
+    if not raw:
+        return
+    with _lock:
+        for stage, other in raw["timers"].items():
+            t = _timers.get(stage)
+            if t is None:
+                t = _timers[stage] = {"count": 0, "total": 0.0, "max": 0.0, "samples": []}
+            t["count"] += other["count"]
+            t["total"] += other["total"]
+            t["max"] = max(t["max"], other["max"])
+            t["samples"].extend(other["samples"])
+            if len(t["samples"]) > SAMPLES:
+                del t["samples"][:len(t["samples"]) - SAMPLES]
+        for name, value in raw["counters"].items():
+            _counters[name] = _counters.get(name, 0) + value
+
+
+# ----- export -----
+
+
+INSERT_METRIC = """
+    INSERT INTO metrics (timestamp, name, kind, count, total_ms, mean_ms, p50_ms, p95_ms, max_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def export_sqlite(snap, timestamp):
+    from GM_data.db_utilities import write_transaction  # only needed when exporting to the database
+
+    rows = [(timestamp, stage, "timer", t["count"], t["total_ms"], t["mean_ms"], t["p50_ms"], t["p95_ms"], t["max_ms"])
+            for stage, t in snap["timers"].items()]
+    rows += [(timestamp, name, "counter", value, None, None, None, None, None)
+             for name, value in snap["counters"].items()]
+    with write_transaction() as conn:
+        conn.executemany(INSERT_METRIC, rows)
+
+
+def export_jsonl(snap, timestamp, path):
+    with open(path, "a") as f:
+        f.write(json.dumps({"timestamp": timestamp, **snap}) + "\n")
+
+
+def export(target="sqlite"):
+    """Writes the current interval's aggregates to target ("sqlite" or a .jsonl path) and resets them"""
+    global _last_export
+    snap = snapshot()
+    reset()
+    _last_export = time.monotonic()
+    if not snap["timers"] and not snap["counters"]:
+        return snap
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    if target == "sqlite":
+        export_sqlite(snap, timestamp)
+    else:
+        export_jsonl(snap, timestamp, target)
+    return snap
+
+
+def maybe_export(target="sqlite", interval=EXPORT_INTERVAL):
+    """export() once at least interval seconds have passed since the last one"""
+    if target and time.monotonic() - _last_export >= interval:
+        return export(target)
+    return None
+
+
+# ----- single-cycle profiling -----
+
+
+def profile_cycle(fn, out_dir, top=25):
+    """
+    Runs fn() once under cProfile and tracemalloc; writes cycle-<time>.prof (for snakeviz/pstats)
+    and cycle-<time>.txt (top functions by cumulative time, top allocation sites, peak memory).
+    Only the calling thread is profiled: work done on the reading pool shows up as waiting.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = out_dir / ("cycle-" + datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn()
+    finally:
+        profiler.disable()
+        allocations = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    profiler.dump_stats(f"{stem}.prof")
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+    report.write(f"\nPeak traced memory: {peak / 1e6:.1f} MB\nTop allocation sites:\n")
+    for stat in allocations.statistics("lineno")[:top]:
+        report.write(f"  {stat}\n")
+    with open(f"{stem}.txt", "w") as f:
+        f.write(report.getvalue())
+    print(f"✅ Cycle profile written to {stem}.prof / {stem}.txt (peak {peak / 1e6:.1f} MB)")
+    return result
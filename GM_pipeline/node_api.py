@@ -0,0 +1,279 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+from GM_data.db_utilities import get_connection
+from GM_pipeline import metrics
+
+
+# ========== NODE HTTP API ==========
+# A small asyncio HTTP/1.1 server on each node for the central server (or a browser) to poll:
+#
+#   GET  /readings/latest[?location=]           latest reading, status and confidence per meter
+#   GET  /readings/history?location=&limit=     recent readings, newest first
+#   GET  /metrics                               stage timings and counters (metrics.snapshot)
+#   GET  /health                                ok / stale / starting, per-meter reading age, backlog
+#   POST /read[?location=]                      read now: queues a capture into the reading loop
+#
+# Every answer comes from memory: store_reading publishes each reading into a per-meter ring buffer
+# and the JSON of the latest ones is encoded once per reading, not once per request. Metrics and the
+# node's health callable (disk globs) are cached for a few seconds and computed off the event loop.
+# The server runs its own event loop on one background thread; it never takes the camera lock or
+# queries the database per request, so any number of pollers cannot hold up a capture.
+
+API_PORT = 8472
+HISTORY_SIZE = 500              # readings kept per meter
+METRICS_TTL = 2.0               # seconds a metrics snapshot is reused
+HEALTH_TTL = 5.0                # seconds a health check is reused
+KEEPALIVE_TIMEOUT = 15.0        # idle keep-alive connections are closed after this
+MAX_HEADER_BYTES = 8192
+MAX_BODY_BYTES = 8192           # larger request bodies get 413 and the connection is closed
+STALE_FACTOR = 2.0              # a meter is stale after this many expected intervals without a reading
+_SEVERITY = ["ok", "starting", "stale"]  # /health reports the worst meter
+
+_lock = threading.Lock()
+_history = {}                   # location -> deque of reading dicts, oldest first
+_latest_body = b"{}"            # encoded /readings/latest for all meters
+_history_bodies = {}            # (location, limit) -> encoded history, until the next publish
+_version = 0                    # bumped by every publish
+_started = time.time()
+
+HISTORY_FIELDS = ["timestamp", "reading", "confidence", "status", "image_path", "notes"]
+
+
+# ----- state (called from the reading threads) -----
+
+
+def publish(location, entry):
+    """Adds a stored reading ({HISTORY_FIELDS}) to the location's ring buffer"""
+    global _latest_body, _version
+    with _lock:
+        _version += 1
+        _history.setdefault(location, deque(maxlen=HISTORY_SIZE)).append(entry)
+        latest = {loc: entries[-1] for loc, entries in _history.items() if entries}
+        _latest_body = json.dumps(latest).encode()
+        _history_bodies.clear()
+
+
+def seed_history(location, limit=HISTORY_SIZE):
+    """Fills the location's ring buffer from the database once (e.g. at start-up)"""
+    rows = get_connection().execute(f"""
+    SELECT {', '.join(HISTORY_FIELDS)} FROM readings
+    WHERE location = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+    """, (location, limit)).fetchall()
+    for row in reversed(rows):
+        publish(location, dict(zip(HISTORY_FIELDS, row)))
+
+
+def latest(location=None):
+    with _lock:
+        if location is None:
+            return {loc: entries[-1] for loc, entries in _history.items() if entries}
+        entries = _history.get(location)
+        return entries[-1] if entries else None
+
+
+def history(location, limit=HISTORY_SIZE):
+    """Newest first"""
+    with _lock:
+        entries = list(_history.get(location, ()))
+    return entries[::-1][:limit]
+
+
+def history_body(location, limit):
+    """history() encoded, cached until the next reading is published"""
+    with _lock:
+        body, version = _history_bodies.get((location, limit)), _version
+    if body is None:
+        body = json.dumps(history(location, limit)).encode()
+        with _lock:
+            if version == _version:  # nothing was published meanwhile
+                _history_bodies[(location, limit)] = body
+    return body
+
+
+def _age(entry, now):
+    """Seconds since the entry's capture time"""
+    try:
+        return round((now - datetime.fromisoformat(entry["timestamp"])).total_seconds(), 1)
+    except (TypeError, ValueError):
+        return None
+
+
+# ----- server -----
+
+
+class NodeAPI:
+    def __init__(self, port=API_PORT, host="0.0.0.0", trigger=None, health=None):
+        """
+        trigger(location or None) requests a reading now and returns the locations it queued;
+        health() returns {"meters": {location: {"expected_interval": s, ...}}, ...} (run off the loop).
+        """
+        self.port = port
+        self.host = host
+        self.trigger = trigger
+        self.health = health
+        self.loop = None
+        self.server = None
+        self.cache = {}         # name -> (expires, body)
+        self.requests = 0
+        self.connections = {}     # open _handle task -> its writer (keep-alive clients)
+        self.ready = threading.Event()
+        self.thread = None
+
+    # ----- cached bodies -----
+
+    async def _cached(self, name, ttl, compute):
+        now = time.monotonic()
+        cached = self.cache.get(name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        body = json.dumps(await self.loop.run_in_executor(None, compute)).encode()
+        self.cache[name] = (now + ttl, body)
+        return body
+
+    def _health(self):
+        extra = self.health() if self.health else {}
+        now = datetime.now()
+        meters, status = {}, "ok"
+        uptime = time.time() - _started
+        for location, info in extra.get("meters", {}).items():
+            entry = latest(location)
+            age = _age(entry, now) if entry else None
+            expected = info.get("expected_interval")
+            stale = age is None or (expected is not None and age > STALE_FACTOR * expected + 60)
+            meters[location] = dict(info, last_reading_age=age, last_status=entry and entry["status"],
+                                    stale=stale)
+            if stale:
+                starting = age is None and uptime < STALE_FACTOR * (expected or 0) + 60
+                status = max(status, "starting" if starting else "stale", key=_SEVERITY.index)  # never downgraded
+        return dict(extra, status=status, uptime=round(uptime), meters=meters)
+
+    # ----- request handling -----
+
+    async def _route(self, method, target):
+        url = urlparse(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        location = query.get("location")
+        if method == "GET" and url.path == "/readings/latest":
+            if location is None:
+                with _lock:
+                    return 200, _latest_body
+            entry = latest(location)
+            return (200, json.dumps(entry).encode()) if entry else (404, b'{"error": "no readings"}')
+        if method == "GET" and url.path == "/readings/history":
+            if location is None:
+                return 400, b'{"error": "location is required"}'
+            try:
+                limit = max(1, min(int(query.get("limit", 100)), HISTORY_SIZE))
+            except ValueError:
+                return 400, b'{"error": "limit must be a number"}'
+            return 200, history_body(location, limit)
+        if method == "GET" and url.path == "/metrics":
+            return 200, await self._cached("metrics", METRICS_TTL, metrics.snapshot)
+        if method == "GET" and url.path == "/health":
+            return 200, await self._cached("health", HEALTH_TTL, self._health)
+        if url.path == "/read":
+            if method != "POST":
+                return 405, b'{"error": "use POST"}'
+            if self.trigger is None:
+                return 503, b'{"error": "reading is not running"}'
+            queued = self.trigger(location)
+            if not queued:
+                return 404, json.dumps({"error": f"unknown meter {location}"}).encode()
+            metrics.count("api_read_requests")
+            return 202, json.dumps({"queued": queued}).encode()
+        return 404, b'{"error": "not found"}'
+
+    async def _handle(self, reader, writer):
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {k.strip().lower(): v.strip()
+                           for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                self.requests += 1
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:  # the body cannot be skipped, so the request framing is lost
+                    status, body, keep_alive = 400, b'{"error": "bad Content-Length"}', False
+                elif length > MAX_BODY_BYTES:
+                    status, body, keep_alive = 413, b'{"error": "request body too large"}', False
+                else:
+                    if length:
+                        await reader.readexactly(length)  # POST bodies are ignored
+                    status, body = await self._route(method, target)
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                             b"Connection: %s\r\n\r\n" % (status, _REASONS.get(status, b"OK"), len(body),
+                                                          b"keep-alive" if keep_alive else b"close") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self.connections.pop(asyncio.current_task(), None)
+
+    # ----- lifecycle -----
+
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES, backlog=256))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try:
+            self.loop.run_until_complete(self.server.serve_forever())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.run_until_complete(self._close_connections())
+            self.loop.run_until_complete(self.loop.shutdown_default_executor())
+            self.loop.close()
+
+    async def _close_connections(self):
+        """Ends the keep-alive clients still connected, so no handler outlives the loop"""
+        for writer in self.connections.values():
+            writer.close()  # the handler's pending read ends with IncompleteReadError and it returns
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._serve, name="node-api", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        print(f"✅ Node API listening on {self.host}:{self.port}")
+        return self
+
+    def shutdown(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+            self.thread.join(5)
+
+
+_REASONS = {200: b"OK", 202: b"Accepted", 400: b"Bad Request", 404: b"Not Found", 405: b"Method Not Allowed",
+            413: b"Payload Too Large", 503: b"Service Unavailable"}
+
+
+def start_node_api(port=API_PORT, host="0.0.0.0", trigger=None, health=None):
+    """Serves the node API on a background thread; returns it (call shutdown() to stop)"""
+    return NodeAPI(port, host, trigger, health).start()
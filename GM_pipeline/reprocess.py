@@ -0,0 +1,291 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from GM_data.db_setup import initialize_database
+from GM_data.db_utilities import get_connection, to_timestamp, use_database, write_transaction
+from GM_detection_cropping.detection_main import d_main
+from GM_reading.reading_main import DIAL_WORK_SIZE, _init_worker, read_gauges
+from GM_pipeline import metrics
+
+
+# ========== BATCH REPROCESSING OF ARCHIVED FRAMES ==========
+# Re-reads archived captures with the current detector/reader, e.g. after improving the reader:
+#
+#   python -m GM_pipeline.reprocess --run reader-v2 --glob "GM_captured_images/**/*_full.jpg" --location test_meter
+#   python -m GM_pipeline.reprocess --run reader-v2 --from-db --start 2025-11-01 --end 2025-12-01
+#
+# A reader thread prefetches the JPEG bytes from disk, a process pool decodes, detects and reads
+# every frame on all cores, and results go to the reprocessed_readings table (one row per run and
+# image) in bulk transactions. Every committed batch is a checkpoint: rerunning the same --run skips
+# the images it already has, so an interrupted run over 100k images just continues.
+#
+# Only full frames are re-read: the archive (RP_Camera/archive.py) stores trusted readings as a
+# montage of the dial crops or a 640 px frame, which detection can't be rerun on. Those images are
+# skipped; GMCapture_<stamp>.jpg files from before the tiered archive are full frames.
+
+CHECKPOINT_EVERY = 200   # results per bulk write (= checkpoint)
+READ_TIERS = {"full"}    # archive tiers that hold a whole frame
+CAPTURE_NAME = re.compile(r"GMCapture_(\d{8}_\d{6})(?:_([a-z]+))?$")  # GMCapture_<stamp>[_<tier>]
+PREFETCH = 16            # images read ahead of the workers, per worker
+
+INSERT_RESULT = """
+    INSERT OR REPLACE INTO reprocessed_readings
+    (run, image_path, reading_id, timestamp, location, reading, confidence, status, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# ----- image sources: (image_path, reading_id, timestamp, location) -----
+
+
+def capture_time(path):
+    """Capture time from a GMCapture_YYYYmmdd_HHMMSS[_<tier>].jpg name, else the file's modification time"""
+    match = CAPTURE_NAME.match(os.path.splitext(os.path.basename(path))[0])
+    try:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    except (AttributeError, ValueError):
+        return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def archive_tier(path):
+    """The archive tier of an image ("crops", "small" or "full"); untiered names are full frames"""
+    match = CAPTURE_NAME.match(os.path.splitext(os.path.basename(str(path)))[0])
+    return match.group(2) or "full" if match else "full"
+
+
+def images_from_glob(pattern, location=None):
+    for path in sorted(glob.iglob(pattern, recursive=True)):
+        yield path, None, to_timestamp(capture_time(path)), location
+
+
+def images_from_db(start=None, end=None, location=None):
+    """Archived images recorded with the original readings, oldest first"""
+    where, params = ["image_path IS NOT NULL"], []
+    if location is not None:
+        where.append("location = ?")
+        params.append(location)
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(to_timestamp(start))
+    if end is not None:
+        where.append("timestamp < ?")
+        params.append(to_timestamp(end))
+
+    cursor = get_connection().cursor()
+    cursor.execute(f"""
+    SELECT image_path, id, timestamp, location FROM readings
+    WHERE {' AND '.join(where)}
+    ORDER BY timestamp
+    """, params)
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            break
+        yield from rows
+
+
+def completed_images(run):
+    """Images this run already has a result for (the checkpoint)"""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT image_path FROM reprocessed_readings WHERE run = ?", (run,))
+    return {row[0] for row in cursor}
+
+
+# ----- prefetch thread -----
+
+
+def prefetch(images, depth):
+    """Reads image bytes on a background thread; yields (image, data) with data=None for unreadable files"""
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def reader():
+        try:
+            for image in images:
+                if stop.is_set():
+                    break
+                try:
+                    with open(image[0], "rb") as f:
+                        data = f.read()
+                except OSError:
+                    data = None
+                buffer.put((image, data))
+        finally:
+            buffer.put(done)
+
+    thread = threading.Thread(target=reader, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+
+
+# ----- worker -----
+
+
+def _reprocess_worker(job):
+    """Returns (result row, this worker's metrics since its last job)"""
+    return _reprocess_image(job), metrics.drain()
+
+
+def _reprocess_image(job):
+    """Decodes, detects and reads one frame; returns the result row"""
+    (image_path, reading_id, timestamp, location), data, run, options = job
+    reading, confidence, status, notes = None, None, "success", None
+    try:
+        with metrics.timer("decode"):
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("could not decode image")
+        # d_main/r_main narrate every step; keep the workers quiet
+        with contextlib.redirect_stdout(io.StringIO()):
+            gauges, boxes = d_main(frame, options["gauge_type"], False, detector=options["detector"], return_boxes=True)
+            if not gauges:
+                return run, image_path, reading_id, timestamp, location, None, None, "failed", "no gauges detected"
+            result = read_gauges(gauges, options["gauge_type"], False, work_size=options["work_size"],
+                                 engine=options["engine"], box_confidences=[b.get("confidence") for b in boxes])
+            reading, confidence = result["reading"], result["confidence"]
+        if len(gauges) != options["gauge_type"]:
+            # Read like the live loop does, but flag the incomplete layout
+            status, notes = "partial", f"{len(gauges)} of {options['gauge_type']} gauges detected"
+    except Exception as e:
+        status, notes = "failed", str(e)
+    return run, image_path, reading_id, timestamp, location, reading, confidence, status, notes
+
+
+# ----- driver -----
+
+
+def write_results(rows):
+    with write_transaction() as conn:
+        conn.executemany(INSERT_RESULT, rows)
+
+
+def reprocess(run, images, gauge_type=5, detector="hough", engine=None, work_size=DIAL_WORK_SIZE,
+              workers=None):
+    """
+    Reprocesses every full-frame image not yet done for this run; returns (processed, failed).
+    images: iterable of (image_path, reading_id, timestamp, location), e.g. images_from_glob/images_from_db.
+    engine: needle engine (None = reading_main.READING_ENGINE).
+    """
+    workers = workers or os.cpu_count()
+    options = {"gauge_type": gauge_type, "detector": detector, "engine": engine, "work_size": work_size}
+    done = completed_images(run)
+    if done:
+        print(f"Resuming run '{run}': {len(done)} images already processed.")
+    skipped = 0
+
+    def full_frames():
+        nonlocal skipped
+        for image in images:
+            if image[0] in done:
+                continue
+            if archive_tier(image[0]) not in READ_TIERS:
+                skipped += 1
+                continue
+            yield image
+
+    todo = full_frames()
+    processed = failed = 0
+    pending, rows = set(), []
+    start = time.perf_counter()
+
+    def collect(futures):
+        nonlocal processed, failed
+        for future in futures:
+            row, worker_metrics = future.result()
+            metrics.merge(worker_metrics)
+            rows.append(row)
+            processed += 1
+            failed += row[7] == "failed"
+        if len(rows) >= CHECKPOINT_EVERY:
+            write_results(rows)
+            rows.clear()
+            rate = processed / (time.perf_counter() - start)
+            print(f"✅ {processed} images reprocessed ({failed} failed, {rate:.1f} images/s)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        try:
+            for image, data in prefetch(todo, PREFETCH * workers):
+                if data is None:
+                    rows.append((run, image[0], image[1], image[2], image[3], None, None, "failed", "could not read file"))
+                    processed += 1
+                    failed += 1
+                    continue
+                pending.add(pool.submit(_reprocess_worker, (image, data, run, options)))
+                # Bounded in-flight work: never hold more than a few frames per worker in memory
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            collect(wait(pending)[0])
+            pending = set()
+        finally:
+            # Interrupted (Ctrl+C) or not: everything finished so far becomes the checkpoint
+            for future in pending:
+                future.cancel()
+            if rows:
+                write_results(rows)
+
+    print(f"✅ Run '{run}' complete: {processed} images reprocessed, {failed} failed.")
+    if skipped:
+        print(f"⚠️ {skipped} crops/small archive images skipped (not full frames, can't be detected on again).")
+    timers = metrics.export("sqlite")["timers"]  # per-stage cost of this run, for sizing hardware
+    for stage in ("decode", "detect", "read"):
+        if stage in timers:
+            print(f"   {stage}: mean {timers[stage]['mean_ms']:.1f} ms, p95 {timers[stage]['p95_ms']:.1f} ms")
+    return processed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-read archived gas meter captures in bulk.")
+    parser.add_argument("--run", required=True, help="run name; rerun the same name to resume")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--glob", help="image path pattern, e.g. 'GM_captured_images/**/*_full.jpg'")
+    source.add_argument("--from-db", action="store_true", help="images recorded in the readings table")
+    parser.add_argument("--location", help="meter location (filter for --from-db, label for --glob)")
+    parser.add_argument("--start", help="--from-db: first timestamp (inclusive, ISO)")
+    parser.add_argument("--end", help="--from-db: last timestamp (exclusive, ISO)")
+    parser.add_argument("--db", help="database file (default: DB_PATH)")
+    parser.add_argument("--gauges", type=int, default=5, help="number of gauges per meter")
+    parser.add_argument("--detector", default="hough", help="detector backend: hough, onnx or roboflow")
+    parser.add_argument("--engine", default=None, help="needle engine: hough or radial (default: READING_ENGINE)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        initialize_database(args.db)
+        use_database(args.db)
+    else:
+        initialize_database()
+
+    if args.glob:
+        images = images_from_glob(args.glob, args.location)
+    else:
+        images = images_from_db(args.start, args.end, args.location)
+    try:
+        reprocess(args.run, images, gauge_type=args.gauges, detector=args.detector, engine=args.engine,
+                  workers=args.workers)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Finished images are saved; rerun with --run {args.run} to resume.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import queue
+import threading
+import time
+
+from GM_pipeline import metrics
+
+
+# ========== PIPELINED READING SCHEDULER ==========
+# capture -> detect -> read -> store, each stage on its own thread with a bounded queue in between,
+# so frame N+1 is captured while frame N is still being detected or read. Captures are driven by a
+# fixed-rate ticker (tick k fires at start + k * period, so processing time never shifts the schedule),
+# or with interval= by an adaptive one (each tick fires interval() seconds after the previous one).
+#
+# Every stage is a function job -> job, where job is a dict that starts as
+# {"tick": k, "scheduled": monotonic time} and is filled in stage by stage.
+
+DROP_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class FixedRateTicker:
+    """Sleeps until the next tick of a drift-free schedule; ticks that are already over are skipped"""
+
+    def __init__(self, period, start=None):
+        self.period = period
+        self.start = time.monotonic() if start is None else start
+        self.tick = 0
+
+    def wait(self, wake_event):
+        """Blocks until the next tick; returns (tick, scheduled_time, ticks_missed), or None if woken early"""
+        scheduled = self.start + self.tick * self.period
+        now = time.monotonic()
+        missed = 0
+        if now - scheduled >= self.period:
+            # Fell behind by whole periods: skip them instead of bursting to catch up
+            missed = int((now - scheduled) // self.period)
+            self.tick += missed
+            scheduled = self.start + self.tick * self.period
+        if wake_event.wait(max(0.0, scheduled - time.monotonic())):
+            return None
+        tick = self.tick
+        self.tick += 1
+        return tick, scheduled, missed
+
+
+class AdaptiveTicker(FixedRateTicker):
+    """
+    Ticks interval() seconds apart, asked again after every tick, so the capture stage can change the
+    interval for the next tick (see GM_pipeline/adaptive.py); missed ticks are skipped the same way
+    """
+
+    def __init__(self, interval, start=None):
+        super().__init__(None, start)
+        self.interval = interval
+        self.last = None
+
+    def wait(self, wake_event):
+        if self.last is None:
+            scheduled = self.start
+        else:
+            self.period = self.interval()
+            scheduled = self.last + self.period
+        now = time.monotonic()
+        missed = 0
+        if self.period and now - scheduled >= self.period:
+            missed = int((now - scheduled) // self.period)
+            self.tick += missed
+            scheduled += missed * self.period
+        if wake_event.wait(max(0.0, scheduled - time.monotonic())):
+            return None
+        self.last = scheduled
+        tick = self.tick
+        self.tick += 1
+        return tick, scheduled, missed
+
+
+class StageQueue:
+    """Bounded queue between two stages with a policy for when the consumer falls behind"""
+
+    def __init__(self, name, maxsize, policy):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.name = name
+        self.policy = policy
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, job):
+        if job is None or self.policy == "block":
+            self.queue.put(job)  # backpressure: the producer waits (stop sentinels always wait)
+            return
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+            if self.policy == "drop_newest":
+                print(f"⚠️ {self.name} queue full, dropped frame of tick {job['tick']}.")
+                return
+            try:
+                old = self.queue.get_nowait()
+                print(f"⚠️ {self.name} queue full, dropped frame of tick {old['tick']}.")
+            except queue.Empty:
+                pass
+            self.queue.put(job)
+
+    def get(self):
+        return self.queue.get()
+
+
+class ReadingPipeline:
+    def __init__(self, capture, detect, read, store, period, queue_size=1, drop_policy="drop_oldest",
+                 late_tolerance=0.5, interval=None):
+        self.period = period
+        self.interval = interval  # callable: seconds to the next tick, asked after each tick (None = fixed period)
+        self.late_tolerance = late_tolerance  # seconds a capture may start after its tick before it counts as late
+        self.stages = [("detect", detect), ("read", read), ("store", store)]
+        self.capture = capture
+        self.queues = [StageQueue(name, queue_size, drop_policy) for name, _ in self.stages]
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()  # set on stop() or trigger(): interrupts the wait for the next tick
+        self.triggered = []
+        self.capturing = False
+        self.last_tick = 0
+        self.threads = []
+        self.lock = threading.Lock()
+        self.counters = {"ticks": 0, "late_ticks": 0, "missed_ticks": 0, "completed": 0, "failed": 0,
+                         "triggered": 0}
+        self.max_lateness = 0.0
+        self.last_latency = None
+
+    # ----- stage threads -----
+
+    def _capture_loop(self, ticker, max_ticks):
+        while max_ticks is None or self.counters["ticks"] < max_ticks:
+            tick = ticker.wait(self.wake)
+            if tick is None:
+                if self.stop_event.is_set():
+                    break
+                self._capture_triggered()
+                continue
+            k, scheduled, missed = tick
+            self.last_tick = k
+            lateness = time.monotonic() - scheduled
+            with self.lock:
+                self.counters["ticks"] += 1
+                self.counters["missed_ticks"] += missed
+                self.max_lateness = max(self.max_lateness, lateness)
+                if lateness > self.late_tolerance:
+                    self.counters["late_ticks"] += 1
+            if missed:
+                print(f"⚠️ Sampling interval not held: skipped {missed} tick(s) before tick {k}.")
+
+            job = self._run_stage("capture", self.capture, {"tick": k, "scheduled": scheduled})
+            if job is not None:
+                self.queues[0].put(job)
+        with self.lock:
+            self.capturing = False
+        self._capture_triggered()  # requested before capturing ended
+        self.queues[0].put(None)
+
+    def _capture_triggered(self):
+        """Extra captures requested through trigger(); the fixed-rate schedule is not shifted"""
+        self.wake.clear()
+        with self.lock:
+            pending, self.triggered = self.triggered, []
+        for fields in pending:
+            job = self._run_stage("capture", self.capture, dict(fields, tick=self.last_tick, scheduled=time.monotonic()))
+            if job is not None:
+                self.queues[0].put(job)
+
+    def _stage_loop(self, index):
+        name, fn = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        while True:
+            job = inbox.get()
+            if job is None:
+                if outbox is not None:
+                    outbox.put(None)
+                break
+            job = self._run_stage(name, fn, job)
+            if job is None:
+                continue
+            if outbox is not None:
+                outbox.put(job)
+            else:
+                with self.lock:
+                    self.counters["completed"] += 1
+                    self.last_latency = time.monotonic() - job["scheduled"]
+
+    def _run_stage(self, name, fn, job):
+        try:
+            with metrics.timer(f"stage.{name}"):
+                return fn(job)
+        except Exception as e:
+            print(f"Error during {name} stage (tick {job['tick']}): {e}")
+            metrics.count(f"{name}_failures")
+            with self.lock:
+                self.counters["failed"] += 1
+            return None
+
+    # ----- control -----
+
+    def start(self, max_ticks=None):
+        ticker = AdaptiveTicker(self.interval) if self.interval else FixedRateTicker(self.period)
+        self.capturing = True
+        self.threads = [threading.Thread(target=self._capture_loop, args=(ticker, max_ticks), name="capture", daemon=True)]
+        for i, (name, _) in enumerate(self.stages):
+            self.threads.append(threading.Thread(target=self._stage_loop, args=(i,), name=name, daemon=True))
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        """Stops capturing; frames already in flight are finished"""
+        self.stop_event.set()
+        self.wake.set()
+
+    def trigger(self, **fields):
+        """
+        Requests an immediate extra capture (e.g. a re-capture after a bad read); fields are added to its job.
+        Returns False when the pipeline no longer captures (stopped or max_ticks reached).
+        """
+        with self.lock:
+            if not self.capturing:
+                return False
+            self.triggered.append(fields)
+            self.counters["triggered"] += 1
+        self.wake.set()
+        return True
+
+    def join(self, timeout=None):
+        for t in self.threads:
+            t.join(timeout)
+
+    def run(self, max_ticks=None):
+        """Runs in the foreground until max_ticks captures (or Ctrl+C)"""
+        self.start(max_ticks)
+        try:
+            while any(t.is_alive() for t in self.threads):
+                self.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            self.join()
+        return self.stats()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["max_lateness"] = round(self.max_lateness, 3)
+            stats["last_latency"] = None if self.last_latency is None else round(self.last_latency, 3)
+        stats["dropped"] = {q.name: q.dropped for q in self.queues}
+        return stats
@@ -0,0 +1,94 @@
+import json
+import time
+
+import cv2
+
+from GM_detection_cropping.edges import edge_support
+
+
+# ========== FIXED-MOUNT DIAL GEOMETRY CACHE ==========
+# The circle calibrate_gauge finds for each dial (centre, radius, zero_angle) is stored per location
+# and dial position (in the settings table). Later reads reuse it after a cheap check that the cached
+# circle still lies on the dial's rim edges; HoughCircles only runs again when that check fails or
+# the geometry is older than RECALIBRATE_INTERVAL.
+#
+# Geometry is stored relative to the crop (x / width, y / height, r / height) so it survives small
+# changes in crop size between detections.
+
+RECALIBRATE_INTERVAL = 24 * 3600  # seconds; full recalibration at least this often (None = only on failure)
+MIN_SUPPORT_RATIO = 0.75          # cached circle must keep this share of the rim support it had at calibration
+CANNY_LOW, CANNY_HIGH = 60, 120
+
+_GEOMETRY = {}
+
+
+def _setting_key(location):
+    return f"geometry:{location}"
+
+
+def load_geometry(location):
+    """Returns {dial index: geometry} for this location ({} when nothing is cached)"""
+    if location in _GEOMETRY:
+        return _GEOMETRY[location]
+
+    from GM_data.db_utilities import get_setting  # the database is only needed here, not in the pool workers
+    raw = get_setting(_setting_key(location))
+    dials = {int(i): g for i, g in json.loads(raw).items()} if raw is not None else {}
+    _GEOMETRY[location] = dials
+    return dials
+
+
+def save_geometry(location, updates):
+    """Merges {dial index: geometry} into the cached geometry and persists it"""
+    from GM_data.db_utilities import update_setting
+    dials = load_geometry(location)
+    dials.update(updates)
+    update_setting(_setting_key(location), json.dumps({str(i): g for i, g in sorted(dials.items())}))
+
+
+def clear_geometry(location):
+    """Forgets every cached circle so all dials are recalibrated on the next read"""
+    from GM_data.db_utilities import delete_setting
+    _GEOMETRY.pop(location, None)
+    delete_setting(_setting_key(location))
+
+
+def dial_geometry(location, index, now=None):
+    """The cached geometry of one dial, or None when missing or due for scheduled recalibration"""
+    geometry = load_geometry(location).get(index)
+    if geometry is None:
+        return None
+    now = time.time() if now is None else now
+    if RECALIBRATE_INTERVAL is not None and now - geometry["calibrated_at"] > RECALIBRATE_INTERVAL:
+        return None
+    return geometry
+
+
+def rim_support(img, x, y, r):
+    """Fraction of the circle that lies on a Canny edge of the crop"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), CANNY_LOW, CANNY_HIGH)
+    return edge_support(edges, x, y, r)
+
+
+def make_geometry(img, x, y, r, zero_angle=0):
+    """Geometry record for a freshly calibrated circle (pixel circle -> crop-relative)"""
+    h, w = img.shape[:2]
+    return {
+        "x": x / float(w), "y": y / float(h), "r": r / float(h),
+        "zero_angle": zero_angle,
+        "support": rim_support(img, x, y, r),
+        "calibrated_at": time.time(),
+    }
+
+
+def cached_circle(img, geometry):
+    """
+    Maps the cached geometry onto this crop; returns (x, y, r, zero_angle), or None when the
+    circle no longer matches the rim edges (camera moved, crop shifted, dial obscured).
+    """
+    h, w = img.shape[:2]
+    x, y, r = int(round(geometry["x"] * w)), int(round(geometry["y"] * h)), int(round(geometry["r"] * h))
+    if rim_support(img, x, y, r) < MIN_SUPPORT_RATIO * geometry["support"]:
+        return None
+    return x, y, r, geometry["zero_angle"]
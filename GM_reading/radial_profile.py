@@ -0,0 +1,101 @@
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+
+# ========== RADIAL-PROFILE NEEDLE ENGINE ==========
+# Alternative to the HoughLinesP needle finder: the binarized annulus around the dial centre is
+# sampled in polar form through a precomputed remap LUT, collapsed into a 1-D angular profile
+# (ink per degree), and the needle angle is the profile's peak. One remap + one argmax per dial.
+#
+# The annulus skips the hub (where every direction is dark) and stops short of the printed
+# digits and tick marks near the rim, so the needle shaft is the dominant dark feature left.
+
+ANGLE_BINS = 360         # 1° per profile bin
+RADIAL_SAMPLES = 24      # samples along each ray
+INNER_RATIO = 0.30       # annulus, as a fraction of the dial radius
+OUTER_RATIO = 0.70
+SMOOTH_BINS = 5          # circular box filter over the profile (degrees)
+PEAK_EXCLUSION = 30      # the runner-up peak must lie this many degrees away from the needle
+
+
+@lru_cache(maxsize=64)
+def polar_maps(x, y, r, bins=ANGLE_BINS, samples=RADIAL_SAMPLES):
+    """
+    cv2.remap LUT for the annulus: row i is the ray at i * 360/bins degrees (0° = up, clockwise,
+    like angle_deg_from_center), columns run from the inner to the outer radius.
+    Cached, because a fixed mount sees the same (x, y, r) frame after frame.
+    """
+    theta = np.radians(np.arange(bins) * (360.0 / bins))[:, None]
+    rho = np.linspace(INNER_RATIO * r, OUTER_RATIO * r, samples)[None, :]
+    map_x = (x + rho * np.sin(theta)).astype(np.float32)
+    map_y = (y - rho * np.cos(theta)).astype(np.float32)
+    return map_x, map_y
+
+
+def binarize(img):
+    """Dark ink -> 255, same adaptive threshold as the Hough engine"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+
+
+def angular_profile(binary, x, y, r):
+    """Returns (profile, polar): ink fraction per angle bin and the sampled (bins, samples) annulus"""
+    map_x, map_y = polar_maps(int(x), int(y), int(r))
+    polar = cv2.remap(binary, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    # The needle widens towards the hub but is longest towards the rim: weight outer samples up
+    weights = np.linspace(0.5, 1.5, polar.shape[1], dtype=np.float32)
+    profile = polar.astype(np.float32) @ weights / (255.0 * weights.sum())
+
+    half = SMOOTH_BINS // 2
+    padded = np.concatenate((profile[-half:], profile, profile[:half]))
+    profile = np.convolve(padded, np.ones(SMOOTH_BINS, dtype=np.float32) / SMOOTH_BINS, "valid")
+    return profile, polar
+
+
+def peak_angle(profile):
+    """
+    Returns (angle_deg, confidence) for the profile's highest peak, or (None, 0.0) on a blank annulus.
+    The angle is refined between bins with a parabola through the peak and its neighbours;
+    confidence = how far the needle peak stands above the best peak elsewhere (0..1).
+    """
+    bins = len(profile)
+    i = int(np.argmax(profile))
+    peak = float(profile[i])
+    if peak <= 0.0:
+        return None, 0.0
+
+    left, right = float(profile[(i - 1) % bins]), float(profile[(i + 1) % bins])
+    denom = left - 2.0 * peak + right
+    offset = 0.5 * (left - right) / denom if denom < 0 else 0.0
+    angle = ((i + offset) * (360.0 / bins)) % 360.0
+
+    # Circular distance of every bin from the peak
+    dist = np.abs((np.arange(bins) - i + bins // 2) % bins - bins // 2) * (360.0 / bins)
+    rival = float(profile[dist > PEAK_EXCLUSION].max(initial=0.0))
+    confidence = float(np.clip((peak - rival) / peak, 0.0, 1.0))
+    return angle, confidence
+
+
+def needle_angle(img, x, y, r):
+    """Returns (angle_deg, confidence, binary, polar, profile); angle is None when no needle is found"""
+    binary = binarize(img)
+    profile, polar = angular_profile(binary, x, y, r)
+    angle, confidence = peak_angle(profile)
+    return angle, confidence, binary, polar, profile
+
+
+def draw_profile(profile, angle, height=120):
+    """Trace panel: the angular profile as a curve with the chosen angle marked"""
+    bins = len(profile)
+    panel = np.zeros((height + 40, bins, 3), dtype=np.uint8)
+    top = float(profile.max()) or 1.0
+    pts = np.stack((np.arange(bins), 40 + height - 1 - (profile / top) * (height - 1)), axis=1)
+    cv2.polylines(panel, [pts.astype(np.int32)], False, (0, 255, 255), 1, cv2.LINE_AA)
+    if angle is not None:
+        col = int(round(angle * bins / 360.0)) % bins
+        cv2.line(panel, (col, 40), (col, 40 + height), (0, 0, 255), 1)
+    cv2.putText(panel, "Angular profile", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+    return panel
@@ -1,17 +1,40 @@
 import cv2
 import numpy as np
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from GM_reading import radial_profile
+from GM_reading.geometry_cache import cached_circle, dial_geometry, make_geometry, save_geometry
+from GM_pipeline import metrics
 
-# ========== UTILITY FUNCTIONS ==========
 
+# Every dial crop is resized to this height (px) before reading, so HoughCircles/HoughLinesP
+# cost no longer depends on camera resolution and the fixed kernel sizes/vote thresholds always
+# see the dial at the same scale. It is the entry points' work_size default, bound at import: pass
+# work_size= to read at another size (None = read at native resolution)
+DIAL_WORK_SIZE = 320
+
+# Needle engine used by every reading entry point unless one is passed explicitly (engine=None); looked
+# up on each call, so setting reading_main.READING_ENGINE at runtime switches every later read:
+# "hough"  - adaptive threshold + ring masks + HoughLinesP + line scoring (original)
+# "radial" - polar sampling of the annulus + angular profile peak (radial_profile.py), with a confidence
+READING_ENGINE = "hough"
+
+# A digit counts as certain once the needle is this far (in digits, 1 = 36°) from the nearest
+# point where it would be read as a neighbouring digit; closer than that, its confidence drops linearly
+TICK_MARGIN = 0.25
+
+# Multi-frame fusion (fuse_readings): needle angles further than OUTLIER_DEG from the burst's medoid
+# angle are dropped; the dials agree once every frame read every dial within AGREE_DEG of the fused angle
+OUTLIER_DEG = 15.0
+AGREE_DEG = 6.0
 
-def avg_circles(circles, b):
-    avg_x = sum(circles[0][i][0] for i in range(b)) / b
-    avg_y = sum(circles[0][i][1] for i in range(b)) / b
-    avg_r = sum(circles[0][i][2] for i in range(b)) / b
-    return int(avg_x), int(avg_y), int(avg_r)
+_POOL = None
+
+
+# ========== UTILITY FUNCTIONS ==========
 
 
 def dist_2_pts(x1, y1, x2, y2):
@@ -24,6 +47,45 @@ def line_center_distance(cx, cy, x1, y1, x2, y2):
     return num / (den + 1e-6)
 
 
+def score_needle_lines(lines, x, y, r):
+    """
+    Needle filter + score for a whole HoughLinesP result in one pass.
+    Returns (segments (N, 4), keep mask, scores): a segment is kept when its near end lies in the
+    hub band (0.20r..0.45r) and its far end reaches the dial edge (0.60r..1.25r);
+    score = length - 8 * distance of the line from the centre.
+    """
+    segments = lines.reshape(-1, 4)
+    x1, y1, x2, y2 = segments.astype(np.int64).T
+    d1 = np.hypot(x1 - x, y1 - y)
+    d2 = np.hypot(x2 - x, y2 - y)
+    dn, df = np.minimum(d1, d2), np.maximum(d1, d2)
+    keep = (0.20 * r < dn) & (dn < 0.45 * r) & (0.60 * r < df) & (df < 1.25 * r)
+
+    dx, dy = x2 - x1, y2 - y1
+    length = np.hypot(dx, dy)
+    lc = np.abs(dy * x - dx * y + x2 * y1 - y2 * x1) / (length + 1e-6)
+    return segments, keep, length - 8.0 * lc
+
+
+def needle_margin(segments, keep, scores, x, y, angle, exclusion=30.0):
+    """
+    Hough-engine confidence 0..1: how far the best needle score stands above the best kept
+    candidate pointing more than `exclusion` degrees away (segments along the same needle don't count).
+    """
+    best = float(np.max(scores[keep]))
+    if best <= 0:
+        return 0.0
+    x1, y1, x2, y2 = segments[keep].astype(np.float64).T
+    far_first = np.hypot(x1 - x, y1 - y) > np.hypot(x2 - x, y2 - y)
+    tx, ty = np.where(far_first, x1, x2), np.where(far_first, y1, y2)
+    angles = (np.degrees(np.arctan2(tx - x, -(ty - y))) + 360.0) % 360.0
+    apart = np.abs((angles - angle + 180.0) % 360.0 - 180.0) > exclusion
+    if not apart.any():
+        return 1.0
+    rival = max(float(np.max(scores[keep][apart])), 0.0)
+    return float(np.clip((best - rival) / best, 0.0, 1.0))
+
+
 def angle_deg_from_center(cx, cy, tipx, tipy):
     # 0° = up; increases CLOCKWISE (0 at top, 1 to the right, ...)
     dx, dy = tipx - cx, tipy - cy
@@ -31,25 +93,70 @@ def angle_deg_from_center(cx, cy, tipx, tipy):
     return (ang + 360.0) % 360.0
 
 
-def draw_tick_marks(img, x, y, r, zero_angle=0):
+def dial_position(angle, counter_clockwise, zero_angle=0):
+    """Needle angle -> position on the printed scale in digits (0.0 <= p < 10.0), either direction"""
+    offset = (zero_angle - angle) if counter_clockwise else (angle - zero_angle)
+    return (offset % 360.0) / 36.0
+
+
+def resolve_digits(positions):
     """
-    Draw 0..9 ticks. zero_angle in degrees; 0° points up.
-    Angles increase CLOCKWISE to match printed digits.
+    Odometer-style digits for dial positions ordered least significant first (None = unread dial).
+    The least significant dial shows the last digit its needle has passed; every higher needle sits
+    a tenth of the lower dial's position past its digit, so digit = round(p - p_lower / 10).
+    Returns [(digit, tick_confidence, alternative)]; alternative is the digit across the nearest
+    rounding boundary (what the dial would read if the needle angle were slightly off).
+    """
+    digits = []
+    lower = None
+    for p in positions:
+        if p is None:
+            digits.append((0, 0.0, None))
+            lower = None
+            continue
+        if lower is None:
+            digit = math.floor(p)
+            frac = p - digit
+            margin, alternative = min(frac, 1.0 - frac), digit - 1 if frac < 0.5 else digit + 1
+        else:
+            u = p - lower / 10.0
+            digit = math.floor(u + 0.5)
+            margin, alternative = 0.5 - abs(u - digit), digit - 1 if u < digit else digit + 1
+        digits.append((digit % 10, float(min(1.0, margin / TICK_MARGIN)), alternative % 10))
+        lower = p
+    return digits
+
+
+def tick_marks(x, y, r, zero_angle=0):
+    """
+    0..9 tick positions without drawing anything. zero_angle in degrees; 0° points up.
     Returns: list of (angle_deg, value, label_x, label_y)
     """
     tick_marks = []
     for i in range(10):
         angle_deg = (zero_angle + i * 36) % 360
         ang = math.radians(angle_deg)
-        inner = (int(x + 0.85 * r * math.sin(ang)), int(y - 0.85 * r * math.cos(ang)))
-        outer = (int(x + 1.00 * r * math.sin(ang)), int(y - 1.00 * r * math.cos(ang)))
         label = (int(x + 1.15 * r * math.sin(ang)), int(y - 1.15 * r * math.cos(ang)))
-        cv2.line(img, inner, outer, (0, 255, 0), 2)
-        cv2.putText(img, str(i), label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2, cv2.LINE_AA)
         tick_marks.append((angle_deg, i, label[0], label[1]))
     return tick_marks
 
 
+def draw_tick_marks(img, x, y, r, zero_angle=0):
+    """
+    Draw 0..9 ticks. zero_angle in degrees; 0° points up.
+    Angles increase CLOCKWISE to match printed digits.
+    Returns: list of (angle_deg, value, label_x, label_y)
+    """
+    tick_list = tick_marks(x, y, r, zero_angle=zero_angle)
+    for angle_deg, i, label_x, label_y in tick_list:
+        ang = math.radians(angle_deg)
+        inner = (int(x + 0.85 * r * math.sin(ang)), int(y - 0.85 * r * math.cos(ang)))
+        outer = (int(x + 1.00 * r * math.sin(ang)), int(y - 1.00 * r * math.cos(ang)))
+        cv2.line(img, inner, outer, (0, 255, 0), 2)
+        cv2.putText(img, str(i), (label_x, label_y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2, cv2.LINE_AA)
+    return tick_list
+
+
 def hstack_same_height(a, b):
     h1, w1 = a.shape[:2]; h2, w2 = b.shape[:2]
     if h1 == h2: return np.hstack((a, b))
@@ -70,55 +177,87 @@ def vstack_same_width(a, b):
     return np.vstack((a, b))
 
 
-def maybe_show(title, img):
-    if SHOW_WINDOWS:
-        cv2.imshow(title, img); cv2.waitKey(0)
+def normalize_dial(gauge_img, work_size=DIAL_WORK_SIZE):
+    """Resizes a dial crop to the fixed working height (aspect ratio kept)"""
+    if not work_size:
+        return gauge_img
+    h, w = gauge_img.shape[:2]
+    if h == work_size:
+        return gauge_img
+    scale = work_size / float(h)
+    interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(gauge_img, (max(1, int(round(w * scale))), work_size), interpolation=interp)
+
+
+# ========== TRACE SINKS ==========
+# A trace sink is any callable trace(title, img). With trace=None (headless) no overlay,
+# panel or storyboard image is ever allocated; the sinks below are the built-in debug outputs.
+
+
+def show_window(title, img):
+    """Debug sink: shows every stage in a blocking OpenCV window"""
+    cv2.imshow(title, img); cv2.waitKey(0)
+
+
+def file_trace(out_dir, prefix="gauge_input"):
+    """Trace sink factory: writes every stage to <out_dir>/<prefix>-<n>-<title>.png"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counter = [0]
+
+    def sink(title, img):
+        counter[0] += 1
+        name = title.lower().replace(" ", "-")
+        cv2.imwrite(str(out_dir / f"{prefix}-{counter[0]:03d}-{name}.png"), img)
+    return sink
 
 
 # ========== MAIN FUNCTIONS ==========
 
 
-def calibrate_gauge(gauge_img, zero_angle=0):
+def calibrate_gauge(gauge_img, zero_angle=0, trace=None, circle=None):
+    """circle: a known (x, y, r), e.g. from the geometry cache, used instead of running HoughCircles"""
     if isinstance(gauge_img, np.ndarray):
-        img = gauge_img.copy()
-        filename = "gauge_input"
+        img = gauge_img  # only read from; overlays are drawn on a copy
     else:
         img = cv2.imread(str(gauge_img))
         if img is None:
             raise FileNotFoundError(f"Could not read {gauge_img}")
-        filename = gauge_img
 
-    h, w = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray_blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    if circle is not None:
+        x, y, r = circle
+    else:
+        h, w = img.shape[:2]
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray_blur = cv2.GaussianBlur(gray, (5, 5), 0)
 
-    circles = cv2.HoughCircles(
-        gray_blur, cv2.HOUGH_GRADIENT, dp=1.2, minDist=min(h, w)//2,
-        param1=120, param2=40,
-        minRadius=int(0.30 * h), maxRadius=int(0.55 * h)
-    )
-    if circles is None:
-        print("❌ No circle detected.")
-        return None
+        circles = cv2.HoughCircles(
+            gray_blur, cv2.HOUGH_GRADIENT, dp=1.2, minDist=min(h, w)//2,
+            param1=120, param2=40,
+            minRadius=int(0.30 * h), maxRadius=int(0.55 * h)
+        )
+        if circles is None:
+            print("❌ No circle detected.")
+            return None
+
+        # Strongest circle (HoughCircles orders by accumulator votes), not an average over every candidate
+        x, y, r = (int(v) for v in circles[0][0])
 
-    a, b, _ = circles.shape
-    x, y, r = avg_circles(circles, b)
+    if trace is None:
+        return x, y, r, tick_marks(x, y, r, zero_angle=zero_angle), None
 
     vis = img.copy()
     cv2.circle(vis, (x, y), r, (0, 0, 255), 2)
     cv2.circle(vis, (x, y), 4, (0, 0, 255), -1)
-    cv2.putText(vis, "Detected dial circle", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+    cv2.putText(vis, "Cached dial circle" if circle is not None else "Detected dial circle", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
     tick_list = draw_tick_marks(vis, x, y, r, zero_angle=zero_angle)
-
-    # Save + show
-    out_cal = Path(filename).with_suffix("").as_posix() + "-calibration.png"
-    # cv2.imwrite(out_cal, vis)
-    maybe_show("Calibration", vis)
+    trace("Calibration", vis)
 
     return x, y, r, tick_list, vis
 
 
-def get_current_value(img, x, y, r, tick_list, outname, zero_angle=0):
+def needle_angle_hough(img, x, y, r, trace=None):
+    """Returns (angle_deg, confidence, panels); confidence is the score margin over rival lines (needle_margin)"""
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     # Threshold + cleanup
@@ -137,131 +276,396 @@ def get_current_value(img, x, y, r, tick_list, outname, zero_angle=0):
     cv2.circle(ring_mask, (x, y), int(0.15 * r), 0, -1)
     binary_ring = cv2.bitwise_and(binary_hub, ring_mask)
 
-    panel_binary = cv2.cvtColor(binary_ring, cv2.COLOR_GRAY2BGR)
-    cv2.putText(panel_binary, "Preprocessed (binary) for needle", (10, 25),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
-    # cv2.imwrite(Path(outname).with_suffix("").as_posix() + "-binary.png", panel_binary)
-    maybe_show("Binary", panel_binary)
+    panel_binary = panel_lines = panel_candidates = None
+    if trace is not None:
+        panel_binary = cv2.cvtColor(binary_ring, cv2.COLOR_GRAY2BGR)
+        cv2.putText(panel_binary, "Preprocessed (binary) for needle", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+        trace("Binary", panel_binary)
 
     # Lines
     lines = cv2.HoughLinesP(binary_ring, rho=1, theta=np.pi/180, threshold=60,
                             minLineLength=int(0.20 * r), maxLineGap=6)
-
-    panel_lines = img.copy()
+    metrics.count("hough_candidates", 0 if lines is None else len(lines))
+
+    if trace is not None:
+        panel_lines = img.copy()
+        if lines is not None:
+            for L in lines:
+                x1, y1, x2, y2 = L[0]
+                cv2.line(panel_lines, (x1, y1), (x2, y2), (0, 255, 255), 1)
+        cv2.putText(panel_lines, "All candidate lines", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+        trace("All Lines", panel_lines)
+
+    # Filter + score (every HoughLinesP segment at once)
+    best = segments = keep = scores = None
     if lines is not None:
-        for L in lines:
-            x1, y1, x2, y2 = L[0]
-            cv2.line(panel_lines, (x1, y1), (x2, y2), (0, 255, 255), 1)
-    cv2.putText(panel_lines, "All candidate lines", (10, 25),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
-    # cv2.imwrite(Path(outname).with_suffix("").as_posix() + "-lines.png", panel_lines)
-    maybe_show("All Lines", panel_lines)
-
-    # Filter + score
-    candidates = []
-    if lines is not None:
-        for L in lines:
-            x1, y1, x2, y2 = L[0]
-            d1 = dist_2_pts(x, y, x1, y1)
-            d2 = dist_2_pts(x, y, x2, y2)
-            dn, df = (d1, d2) if d1 < d2 else (d2, d1)
-            if not (0.20 * r < dn < 0.45 * r and 0.60 * r < df < 1.25 * r):
-                continue
-            lc = line_center_distance(x, y, x1, y1, x2, y2)
-            length = dist_2_pts(x1, y1, x2, y2)
-            score = length - 8.0 * lc
-            candidates.append((score, [x1, y1, x2, y2]))
-
-    panel_candidates = img.copy()
-    if candidates:
-        for _, L in candidates:
-            cv2.line(panel_candidates, (L[0], L[1]), (L[2], L[3]), (0, 255, 0), 2)
-    cv2.putText(panel_candidates, "Needle-like candidates", (10, 25),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
-    # cv2.imwrite(Path(outname).with_suffix("").as_posix() + "-candidates.png", panel_candidates)
-    maybe_show("Candidates", panel_candidates)
-
-    if not candidates:
+        segments, keep, scores = score_needle_lines(lines, x, y, r)
+        if keep.any():
+            best = segments[np.argmax(np.where(keep, scores, -np.inf))]
+
+    if trace is not None:
+        panel_candidates = img.copy()
+        if best is not None:
+            for L in segments[keep]:
+                cv2.line(panel_candidates, (int(L[0]), int(L[1])), (int(L[2]), int(L[3])), (0, 255, 0), 2)
+        cv2.putText(panel_candidates, "Needle-like candidates", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+        trace("Candidates", panel_candidates)
+
+    if best is None:
         print("❌ No needle-like line after scoring.")
-        return None, panel_binary, panel_lines, panel_candidates
+        return None, None, (panel_binary, panel_lines, panel_candidates)
 
-    # Best line
-    candidates.sort(key=lambda t: -t[0])
-    x1, y1, x2, y2 = candidates[0][1]
+    # Best line (argmax takes the first of equal scores, like the stable sort it replaces)
+    x1, y1, x2, y2 = (int(v) for v in best)
     tip = (x1, y1) if dist_2_pts(x, y, x1, y1) > dist_2_pts(x, y, x2, y2) else (x2, y2)
-
-    # Angle-based snapping
     ang = angle_deg_from_center(x, y, tip[0], tip[1])
-    value = int((ang + 18.0) // 36.0) % 10
+    return ang, needle_margin(segments, keep, scores, x, y, ang), (panel_binary, panel_lines, panel_candidates)
 
-    # Final overlay
-    vis = img.copy()
-    cv2.circle(vis, (x, y), r, (0, 0, 255), 2)
-    draw_tick_marks(vis, x, y, r, zero_angle=zero_angle)
-    cv2.line(vis, (x1, y1), (x2, y2), (255, 0, 0), 2)
-    cv2.arrowedLine(vis, (x, y), tip, (255, 0, 0), 2, tipLength=0.15)
-    cv2.circle(vis, tip, 6, (0, 0, 255), -1)
-    cv2.putText(vis, f"Angle: {ang:.1f} deg", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 128, 0), 2, cv2.LINE_AA)
-    cv2.putText(vis, f"Reading: {value}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 128, 0), 2, cv2.LINE_AA)
 
-    out_final = Path(outname).with_suffix("").as_posix() + "-needle.png"
-    # cv2.imwrite(out_final, vis)
-    maybe_show("Final", vis)
+def needle_angle_radial(img, x, y, r, trace=None):
+    """Returns (angle_deg, confidence, panels) from the annulus' angular profile (radial_profile.py)"""
+    ang, confidence, binary, polar, profile = radial_profile.needle_angle(img, x, y, r)
 
-    return value, panel_binary, panel_lines, panel_candidates
+    panels = (None, None, None)
+    if trace is not None:
+        panel_binary = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
+        cv2.circle(panel_binary, (x, y), int(radial_profile.INNER_RATIO * r), (0, 0, 255), 1)
+        cv2.circle(panel_binary, (x, y), int(radial_profile.OUTER_RATIO * r), (0, 0, 255), 1)
+        cv2.putText(panel_binary, "Binary + sampled annulus", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+        trace("Binary", panel_binary)
 
+        # Unwrapped annulus: one column per degree, inner radius at the top
+        panel_polar = cv2.cvtColor(cv2.resize(polar.T, (polar.shape[0], 4 * polar.shape[1]),
+                                              interpolation=cv2.INTER_NEAREST), cv2.COLOR_GRAY2BGR)
+        trace("Polar", panel_polar)
 
-def save_storyboard(panel_circle, panel_binary, panel_lines, panel_candidates, outname):
+        panel_profile = radial_profile.draw_profile(profile, ang)
+        trace("Profile", panel_profile)
+        panels = (panel_binary, panel_polar, panel_profile)
+
+    if ang is None:
+        print("❌ No needle found in the angular profile.")
+    return ang, confidence, panels
+
+
+NEEDLE_ENGINES = {
+    "hough": needle_angle_hough,
+    "radial": needle_angle_radial,
+}
+
+
+def get_current_value(img, x, y, r, tick_list, outname, zero_angle=0, trace=None, engine=None,
+                      counter_clockwise=False):
+    """
+    Returns (value, angle_deg, confidence, panel_binary, panel_lines, panel_candidates);
+    value/angle are None when the engine finds no needle. value is the last digit the needle has
+    passed on the dial's own scale (resolve_digits of this dial alone).
+    """
+    engine = engine or READING_ENGINE
+    if engine not in NEEDLE_ENGINES:
+        raise ValueError(f"Unknown reading engine: {engine}")
+    with metrics.timer(f"needle.{engine}"):
+        ang, confidence, panels = NEEDLE_ENGINES[engine](img, x, y, r, trace=trace)
+    if ang is None:
+        return (None, None, confidence) + panels
+
+    value = resolve_digits([dial_position(ang, counter_clockwise, zero_angle)])[0][0]
+
+    # Final overlay
+    if trace is not None:
+        rad = math.radians(ang)
+        tip = (int(x + r * math.sin(rad)), int(y - r * math.cos(rad)))
+        vis = img.copy()
+        cv2.circle(vis, (x, y), r, (0, 0, 255), 2)
+        draw_tick_marks(vis, x, y, r, zero_angle=zero_angle)
+        cv2.arrowedLine(vis, (x, y), tip, (255, 0, 0), 2, tipLength=0.15)
+        cv2.circle(vis, tip, 6, (0, 0, 255), -1)
+        cv2.putText(vis, f"Angle: {ang:.1f} deg", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 128, 0), 2, cv2.LINE_AA)
+        cv2.putText(vis, f"Reading: {value}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 128, 0), 2, cv2.LINE_AA)
+        trace("Final", vis)
+
+    return (value, ang, confidence) + panels
+
+
+def save_storyboard(panel_circle, panel_binary, panel_lines, panel_candidates, outname, trace=None):
+    if trace is None:
+        return
     row1 = hstack_same_height(panel_circle, panel_binary)
     row2 = hstack_same_height(panel_lines, panel_candidates)
     board = vstack_same_width(row1, row2)
-    out_story = Path(outname).with_suffix("").as_posix() + "-storyboard.png"
-    # cv2.imwrite(out_story, board)
-    maybe_show("Storyboard", board)
+    trace("Storyboard", board)
 
 
 # ========== MAIN ==========
 # @TODO future: program still miss-reads the arrows direction, make sure it only reads the longest detection of the arrow
-# @TODO future: take in parameter of previous gauge value to help in reading when between two values
 
 
-def run_reading(gauge_img, counter_clockwise):
+def read_dial(gauge_img, counter_clockwise, trace=None, work_size=DIAL_WORK_SIZE, engine=None,
+              geometry=None, cache_geometry=False):
+    """
+    Reads one dial; returns {"value", "angle", "position", "confidence", "geometry", "recalibrated"} or
+    None when no dial circle or needle is found. value is the dial's digit read on its own, the same
+    rule resolve_digits applies to a least significant dial; angle is the raw needle angle (0° = up,
+    clockwise), position the same on the printed scale (dial_position); confidence is the needle
+    engine's. geometry is a cached dial geometry (geometry_cache.py): its circle
+    is used when it still fits the crop, otherwise the dial is recalibrated (recalibrated=True). Only
+    with cache_geometry (a location to save it for) is the returned "geometry" then the new one.
+    """
     zero_angle = 0 # adjust if the photo is rotated; 0° = up
 
-    calib = calibrate_gauge(gauge_img, zero_angle=zero_angle)
+    circle = None
+    if isinstance(gauge_img, np.ndarray):
+        gauge_img = normalize_dial(gauge_img, work_size)
+        if geometry is not None:
+            zero_angle = geometry["zero_angle"]
+            with metrics.timer("geometry_check"):
+                cached = cached_circle(gauge_img, geometry)
+            circle = None if cached is None else cached[:3]
+            metrics.count("geometry_cache_hits" if circle is not None else "geometry_cache_misses")
+
+    with metrics.timer("calibrate" if circle is None else "calibrate.cached"):
+        calib = calibrate_gauge(gauge_img, zero_angle=zero_angle, trace=trace, circle=circle)
     if calib is None:
-        return 0
+        metrics.count("dial_failures")
+        return None
     x, y, r, tick_list, panel_circle = calib
 
-    value, panel_binary, panel_lines, panel_candidates = get_current_value(
-        gauge_img, x, y, r, tick_list, "gauge_input", zero_angle=zero_angle
+    value, ang, confidence, panel_binary, panel_lines, panel_candidates = get_current_value(
+        gauge_img, x, y, r, tick_list, "gauge_input", zero_angle=zero_angle, trace=trace, engine=engine,
+        counter_clockwise=counter_clockwise
     )
     if value is None:
+        metrics.count("dial_failures")
         print("Could not determine the reading.")
-        return 0
-
-    if counter_clockwise:
-        value = 9 - value
+        return None
+    metrics.count("dials_read")
 
-    save_storyboard(panel_circle, panel_binary, panel_lines, panel_candidates, "gauge_input")
+    save_storyboard(panel_circle, panel_binary, panel_lines, panel_candidates, "gauge_input", trace=trace)
 
-    if SHOW_WINDOWS:
+    if trace is show_window:
         cv2.destroyAllWindows()
 
-    return value
+    recalibrated = circle is None and isinstance(gauge_img, np.ndarray)
+    if recalibrated and cache_geometry:  # rim support costs a Canny pass; only worth it when it gets saved
+        geometry = make_geometry(gauge_img, x, y, r, zero_angle)
+
+    return {"value": value, "angle": ang, "position": dial_position(ang, counter_clockwise, zero_angle),
+            "confidence": confidence, "geometry": geometry, "recalibrated": recalibrated}
+
+
+def run_reading(gauge_img, counter_clockwise, trace=None, work_size=DIAL_WORK_SIZE, engine=None):
+    result = read_dial(gauge_img, counter_clockwise, trace=trace, work_size=work_size, engine=engine)
+    return 0 if result is None else result["value"]
+
+
+# ========== WORKER POOL ==========
+
+
+def _init_worker():
+    # One OpenCV thread per process, otherwise the workers fight over the same cores
+    cv2.setNumThreads(1)
+    metrics.reset()  # a forked worker starts with a copy of the parent's registry; only report its own work
+
+
+def _read_gauge_worker(job):
+    """Returns (read_dial result, this worker's metrics since its last job)"""
+    gauge, counter_clockwise, work_size, engine, geometry, cache = job
+    result = read_dial(gauge, counter_clockwise, work_size=work_size, engine=engine, geometry=geometry,
+                       cache_geometry=cache)
+    return result, metrics.drain()
+
+
+def start_reading_pool(workers=None):
+    """Starts the persistent dial-reading pool (once); later calls return the same pool"""
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker)
+    return _POOL
+
 
+def stop_reading_pool():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True)
+        _POOL = None
 
-def r_main(cropped_gauges, gauge_type, debug):
-    global SHOW_WINDOWS
-    SHOW_WINDOWS = debug
+
+def _dial_jobs(cropped_gauges, gauge_type, work_size, engine, location, directions):
+    # when increment is even (True), arrow turns counter-clockwise 0, 1, 2, 3, 4 (unless the meter says otherwise)
+    engine = engine or READING_ENGINE  # resolved here, so pool workers use this process's setting
+    return [(gauge, _counter_clockwise(directions, i), work_size, engine,
+             dial_geometry(location, i) if location else None, bool(location))
+            for i, gauge in enumerate(cropped_gauges[:gauge_type])]
+
+
+def _counter_clockwise(directions, i):
+    return directions[i] == "ccw" if directions else (i % 2 == 0)
+
+
+def _run_jobs(jobs, parallel, trace):
+    """read_dial results of the jobs, in order; on the reading pool when parallel"""
+    # Trace sinks live in this process, so traced runs stay sequential
+    if parallel and trace is None and len(jobs) > 1:
+        results = []
+        for result, worker_metrics in start_reading_pool().map(_read_gauge_worker, jobs):
+            metrics.merge(worker_metrics)
+            results.append(result)
+        return results
+    return [read_dial(gauge, ccw, trace=trace, work_size=size, engine=eng, geometry=geometry, cache_geometry=cache)
+            for gauge, ccw, size, eng, geometry, cache in jobs]
+
+
+def _save_recalibrated(location, frame_results):
+    """Saves the first recalibrated geometry of every dial"""
+    if not location:
+        return
+    updates = {}
+    for results in frame_results:
+        for i, result in enumerate(results):
+            if result and result["recalibrated"] and i not in updates:
+                updates[i] = result["geometry"]
+    if updates:
+        save_geometry(location, updates)
+
+
+def combine_dials(results, gauge_type, box_confidences=None):
+    """read_dial results (least significant first, None = unread) -> {"reading", "confidence", "dials"}"""
+    positions = [None if result is None else result["position"] for result in results]
+    dials = []
+    for i, (result, (digit, tick_confidence, alternative)) in enumerate(zip(results, resolve_digits(positions))):
+        box_confidence = box_confidences[i] if box_confidences and i < len(box_confidences) else None
+        dial = {"digit": digit, "alternative": alternative, "angle": None, "position": None, "confidence": 0.0}
+        if result is not None:
+            confidence = tick_confidence
+            for part in (result["confidence"], box_confidence):
+                if part is not None:
+                    confidence *= part
+            dial.update(angle=result["angle"], position=result["position"], confidence=round(confidence, 3))
+        dials.append(dial)
 
     final_reading = 0
-    for i, gauge in enumerate(cropped_gauges):
-        if i > gauge_type - 1:
-            print("ERROR: More than five gauge readings!")
-            break
-        # when increment is even (True), arrow turns counter-clockwise 0, 1, 2, 3, 4
-        reading = run_reading(gauge, (i % 2 == 0))
-        print(f"Reading of Gauge {i + 1}: {reading}.")
-        final_reading += reading * (10 ** (i + 3))
-    return final_reading
+    for i, dial in enumerate(dials):
+        print(f"Reading of Gauge {i + 1}: {dial['digit']} (confidence {dial['confidence']:.2f}).")
+        final_reading += dial["digit"] * (10 ** (i + 3))
+
+    confidence = min((dial["confidence"] for dial in dials), default=0.0) if len(dials) == gauge_type else 0.0
+    return {"reading": final_reading, "confidence": confidence, "dials": dials}
+
+
+def read_gauges(cropped_gauges, gauge_type, debug, parallel=False, trace=None, work_size=DIAL_WORK_SIZE,
+                engine=None, location=None, box_confidences=None, directions=None):
+    """
+    Reads every dial and combines them odometer-style (resolve_digits).
+    Returns {"reading", "confidence", "dials"}; dials are least significant first, each with digit,
+    alternative, angle, position and confidence = needle x tick x detector box confidence (missing
+    parts count as 1). The reading's confidence is its weakest dial's, and 0 when dials are missing.
+
+    debug shows every stage in a window; trace takes any other sink (e.g. file_trace(dir)).
+    With neither, the dials are read headless and no diagnostic images are built.
+    engine picks the needle finder ("hough" or "radial", see NEEDLE_ENGINES; None = READING_ENGINE).
+    location enables the per-dial geometry cache: cached circles replace HoughCircles while they
+    still fit, and every recalibrated circle is saved back for the next cycle.
+    box_confidences: the detector's confidence per crop, same order as cropped_gauges.
+    directions: "cw"/"ccw" per dial, least significant first; None = alternating, starting with ccw.
+    """
+    if debug and trace is None:
+        trace = show_window
+
+    if len(cropped_gauges) > gauge_type:
+        print("ERROR: More than five gauge readings!")
+    jobs = _dial_jobs(cropped_gauges, gauge_type, work_size, engine, location, directions)
+
+    with metrics.timer("read"):
+        results = _run_jobs(jobs, parallel, trace)
+    _save_recalibrated(location, [results])
+    return combine_dials(results, gauge_type, box_confidences)
+
+
+# ========== MULTI-FRAME FUSION ==========
+# A burst of frames of the same meter is read dial by dial and every dial's needle angles are fused
+# before snapping to digits, so one blurred or glared frame no longer decides a digit on its own.
+
+
+def circular_distance(a, b):
+    """Smallest difference between two angles in degrees (0..180)"""
+    d = abs(a - b) % 360.0
+    return min(d, 360.0 - d)
+
+
+def fuse_angles(angles, weights=None, outlier=OUTLIER_DEG):
+    """
+    Robust circular mean: the medoid angle (least total distance to the others) anchors the set,
+    angles further than outlier from it are dropped, the rest are averaged as unit vectors (weighted).
+    Returns (angle, spread, inliers): spread is the largest inlier distance from the fused angle.
+    """
+    medoid = min(angles, key=lambda a: sum(circular_distance(a, b) for b in angles))
+    inliers = [i for i, a in enumerate(angles) if circular_distance(a, medoid) <= outlier]
+    w = [1.0 if not weights or weights[i] is None else weights[i] for i in inliers]
+    if sum(w) <= 0:
+        w = [1.0] * len(inliers)
+    s = sum(wi * math.sin(math.radians(angles[i])) for wi, i in zip(w, inliers))
+    c = sum(wi * math.cos(math.radians(angles[i])) for wi, i in zip(w, inliers))
+    angle = math.degrees(math.atan2(s, c)) % 360.0
+    return angle, max(circular_distance(angles[i], angle) for i in inliers), inliers
+
+
+def read_frames(crop_sets, gauge_type, parallel=False, work_size=DIAL_WORK_SIZE, engine=None,
+                location=None, directions=None):
+    """
+    read_dial results for the dial crops of several frames ([frame][dial], None = unread); every dial
+    of every frame is one job, so the whole burst is read at once on the reading pool when parallel.
+    """
+    jobs = [_dial_jobs(crops, gauge_type, work_size, engine, location, directions) for crops in crop_sets]
+    with metrics.timer("read"):
+        flat = _run_jobs([job for frame_jobs in jobs for job in frame_jobs], parallel, None)
+    frame_results, start = [], 0
+    for frame_jobs in jobs:
+        frame_results.append(flat[start:start + len(frame_jobs)])
+        start += len(frame_jobs)
+    _save_recalibrated(location, frame_results)
+    return frame_results
+
+
+def fuse_readings(frame_results, gauge_type, box_confidences=None, directions=None):
+    """
+    Combines read_frames results into one read_gauges-style result: each dial's angle is fused over
+    the frames that read it (fuse_angles, weighted by needle confidence), its needle confidence is the
+    inliers' mean times the share of frames that agreed. Adds "frames" and "agreed" (every frame read
+    every dial within AGREE_DEG of its fused angle).
+    """
+    dial_count = max((len(results) for results in frame_results), default=0)
+    fused, agreed = [], dial_count == gauge_type
+    for i in range(dial_count):
+        reads = [results[i] for results in frame_results if i < len(results) and results[i] is not None]
+        if not reads:
+            fused.append(None)
+            agreed = False
+            continue
+        angle, spread, inliers = fuse_angles([r["angle"] for r in reads], [r["confidence"] for r in reads])
+        agreed = agreed and len(inliers) == len(frame_results) and spread <= AGREE_DEG
+        confidences = [reads[j]["confidence"] for j in inliers if reads[j]["confidence"] is not None]
+        share = len(inliers) / len(frame_results)
+        confidence = (sum(confidences) / len(confidences) if confidences else 1.0) * share
+
+        # Shift a frame's position by the fused angle's offset (positions run against the angle for ccw dials)
+        ref = reads[inliers[0]]
+        offset = (angle - ref["angle"] + 180.0) % 360.0 - 180.0
+        sign = -1.0 if _counter_clockwise(directions, i) else 1.0
+        fused.append({"angle": round(angle, 2), "position": (ref["position"] + sign * offset / 36.0) % 10.0,
+                      "confidence": confidence})
+        metrics.count("fused_outliers", len(reads) - len(inliers))
+
+    result = combine_dials(fused, gauge_type, box_confidences)
+    result.update(frames=len(frame_results), agreed=agreed)
+    return result
+
+
+def r_main(cropped_gauges, gauge_type, debug, parallel=False, trace=None, work_size=DIAL_WORK_SIZE,
+           engine=None, location=None, directions=None):
+    """The combined reading alone (see read_gauges)"""
+    return read_gauges(cropped_gauges, gauge_type, debug, parallel=parallel, trace=trace, work_size=work_size,
+                       engine=engine, location=location, directions=directions)["reading"]
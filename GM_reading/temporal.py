@@ -0,0 +1,87 @@
+from datetime import datetime
+from itertools import combinations
+
+from GM_data.db_utilities import get_latest_reading
+
+
+# ========== TEMPORAL CONSISTENCY ==========
+# A gas meter only counts up, and no faster than the installation can draw gas. Every new reading is
+# checked against the last trusted one for its location:
+#   success   - plausible as read
+#   corrected - implausible, but swapping uncertain dials to their alternative digit makes it plausible
+#   rejected  - neither; stored for inspection but never used as the reference for later readings
+# The reference is kept in memory (seeded from the database), since stored readings may still sit
+# in the write buffer.
+
+MAX_FLOW_PER_HOUR = 2000      # cubic feet; faster increases are treated as misreads
+ALTERNATIVE_CONFIDENCE = 0.5  # only dials less confident than this may be swapped for their alternative
+MAX_SWAPS = 2                 # at most this many dials changed by one correction
+MAX_REJECTIONS = 5            # after this many rejections in a row, trust the meter again (re-baseline)
+
+_LAST = {}        # location -> (reading, datetime) of the last trusted reading
+_REJECTIONS = {}  # location -> consecutive rejections
+
+
+def previous_reading(location):
+    """(reading, datetime) of the last trusted reading, or None"""
+    if location not in _LAST:
+        row = get_latest_reading(location)
+        _LAST[location] = None if row is None else (row[0], datetime.fromisoformat(row[1]))
+    return _LAST[location]
+
+
+def plausible(reading, previous, elapsed_hours, scale, step):
+    """Monotonic (modulo a full-scale rollover) and no faster than MAX_FLOW_PER_HOUR"""
+    increase = (reading - previous) % scale
+    return increase <= max(step, MAX_FLOW_PER_HOUR * max(elapsed_hours, 0.0))
+
+
+def corrections(dials):
+    """Alternative readings from swapping uncertain dials, fewest and least confident swaps first"""
+    uncertain = [i for i, d in enumerate(dials)
+                 if d["alternative"] is not None and d["confidence"] < ALTERNATIVE_CONFIDENCE]
+    options = []
+    for n in range(1, min(MAX_SWAPS, len(uncertain)) + 1):
+        for swap in combinations(uncertain, n):
+            digits = [d["alternative"] if i in swap else d["digit"] for i, d in enumerate(dials)]
+            reading = sum(digit * 10 ** (i + 3) for i, digit in enumerate(digits))
+            options.append((n, sum(dials[i]["confidence"] for i in swap), reading, swap))
+    options.sort(key=lambda o: o[:2])
+    return [(reading, swap) for _, _, reading, swap in options]
+
+
+def assess(location, result, timestamp):
+    """
+    Checks a read_gauges result against the location's last trusted reading (nothing is recorded).
+    Returns {"status": "success" | "corrected" | "rejected", "reading", "notes"}.
+    """
+    reading, dials = result["reading"], result["dials"]
+    previous = previous_reading(location)
+    if previous is None or not dials:
+        return {"status": "success", "reading": reading, "notes": None}
+
+    prev_reading, prev_time = previous
+    elapsed = (timestamp - prev_time).total_seconds() / 3600.0
+    scale, step = 10 ** (len(dials) + 3), 10 ** 3
+    if plausible(reading, prev_reading, elapsed, scale, step):
+        return {"status": "success", "reading": reading, "notes": None}
+
+    for candidate, swap in corrections(dials):
+        if plausible(candidate, prev_reading, elapsed, scale, step):
+            gauges = ", ".join(str(i + 1) for i in swap)
+            return {"status": "corrected", "reading": candidate,
+                    "notes": f"read {reading}, corrected gauge {gauges} (previous {prev_reading})"}
+
+    if _REJECTIONS.get(location, 0) + 1 >= MAX_REJECTIONS:
+        return {"status": "success", "reading": reading,
+                "notes": f"re-baselined after {MAX_REJECTIONS} rejected readings (previous {prev_reading})"}
+    return {"status": "rejected", "reading": reading, "notes": f"implausible after {prev_reading}"}
+
+
+def record(location, decision, timestamp):
+    """Makes a stored decision the reference for the next assess()"""
+    if decision["status"] == "rejected":
+        _REJECTIONS[location] = _REJECTIONS.get(location, 0) + 1
+        return
+    _REJECTIONS[location] = 0
+    _LAST[location] = (decision["reading"], timestamp)
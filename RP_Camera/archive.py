@@ -0,0 +1,195 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from GM_pipeline import metrics
+
+
+# ========== IMAGE ARCHIVE ==========
+# Keeps GM_captured_images bounded. Each stored reading gets one archive image in a tier chosen by
+# how much the image is worth keeping:
+#   "crops"  the dial crops side by side (trusted, high-confidence readings)
+#   "small"  the frame downscaled to SMALL_MAX_SIDE (trusted readings when there are no crops)
+#   "full"   the full-resolution frame (rejected or low-confidence readings, worth a second look)
+# An image whose difference hashes (dHash, one per crop or one of the frame) are each within
+# DUPLICATE_DISTANCE bits of the last image archived for the same meter and tier, with the same
+# reading, is not written again; its reading points to the earlier image. Files go to
+# <root>/<location>/<YYYYMMDD>/, so no directory grows without bound, and the oldest are deleted once
+# the archive is over MAX_ARCHIVE_BYTES or older than MAX_ARCHIVE_DAYS.
+#
+# Hashing (a few hundred pixels per image) runs on the caller; the montage, encoding, writing and
+# retention run on one background thread behind a bounded queue, with writes throttled to
+# MAX_WRITE_RATE. When the queue is full the image is dropped (the reading is stored without one)
+# instead of stalling the reading.
+
+MAX_ARCHIVE_BYTES = 2 * 1024 ** 3   # oldest images deleted above this
+MAX_ARCHIVE_DAYS = 90               # images deleted after this
+MAX_WRITE_RATE = 4 * 1024 ** 2      # bytes/s written on average
+QUEUE_SIZE = 16                     # images waiting to be written
+DUPLICATE_DISTANCE = 3              # dHash bits (of 64) within which two frames count as the same
+SMALL_MAX_SIDE = 640
+CROP_HEIGHT = 240
+QUALITY = {"crops": 85, "small": 80, "full": 92}
+
+
+def dhash(image, size=8):
+    """64-bit difference hash: brightness gradients of a (size+1) x size thumbnail"""
+    # Subsample first so a full-resolution frame costs about as much as a thumbnail
+    step = max(1, min(image.shape[0] // (size * 8), image.shape[1] // ((size + 1) * 8)))
+    sample = np.ascontiguousarray(image[::step, ::step])
+    gray = cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY) if sample.ndim == 3 else sample
+    thumb = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def montage(crops, height=CROP_HEIGHT):
+    """The dial crops resized to one height, side by side"""
+    return cv2.hconcat([cv2.resize(c, (max(1, round(c.shape[1] * height / c.shape[0])), height),
+                                   interpolation=cv2.INTER_AREA) for c in crops])
+
+
+def downscale(image, max_side=SMALL_MAX_SIDE):
+    scale = max_side / max(image.shape[:2])
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (round(image.shape[1] * scale), round(image.shape[0] * scale)),
+                      interpolation=cv2.INTER_AREA)
+
+
+class ArchiveManager:
+    def __init__(self, root, max_bytes=MAX_ARCHIVE_BYTES, max_days=MAX_ARCHIVE_DAYS, write_rate=MAX_WRITE_RATE,
+                 queue_size=QUEUE_SIZE):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self.max_days = max_days
+        self.write_rate = write_rate
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.last = {}          # (location, tier) -> (hash, reading, path) of the last image archived
+        self.files = None       # deque of (mtime, size, path), oldest first; built by the writer thread
+        self.total = 0
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def archive(self, frame, capture_time, location, tier="full", crops=None, reading=None):
+        """
+        Queues the tier's image of a frame (see module notes); returns the path it will be written to,
+        the earlier image's path for a duplicate, or None when the queue is full.
+        """
+        crops = [c for c in crops or [] if c is not None and c.size]
+        if tier == "crops" and not crops:
+            tier = "small"
+        image = crops if tier == "crops" else frame
+
+        key = (location, tier)
+        with metrics.timer("archive_hash"):
+            fingerprint = [dhash(part) for part in (crops if tier == "crops" else [frame])]
+        last = self.last.get(key)
+        if last is not None and last[1] == reading and len(last[0]) == len(fingerprint) and \
+                all(hamming(a, b) <= DUPLICATE_DISTANCE for a, b in zip(last[0], fingerprint)):
+            metrics.count("archive_duplicates")
+            return last[2]
+
+        stamp = capture_time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.root, str(location), stamp[:8], f"GMCapture_{stamp}_{tier}.jpg")
+        try:
+            self.jobs.put_nowait((path, image, tier))
+        except queue.Full:
+            metrics.count("archive_dropped")
+            print("⚠️ Image archive is behind; this reading is stored without an image.")
+            return None
+        self.last[key] = (fingerprint, reading, path)
+        self._start()
+        return path
+
+    def _start(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="archive", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        self._index()
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                self._write(*job)
+                self._enforce()
+            except Exception as e:
+                metrics.count("archive_failures")
+                print(f"Error archiving {job[0]}: {e}")
+
+    def _write(self, path, image, tier):
+        with metrics.timer("archive"):
+            if tier == "crops":
+                image = montage(image)
+            elif tier == "small":
+                image = downscale(image)
+            ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, QUALITY[tier]])
+            if not ok:
+                raise OSError("JPEG encoding failed")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data.tobytes())
+        metrics.count(f"archive_{tier}")
+        self.files.append((time.time(), len(data), path))
+        self.total += len(data)
+        # Throttle: keep the average write rate at or below write_rate
+        time.sleep(len(data) / self.write_rate)
+
+    def _index(self):
+        """One scan of the archive at start-up (including images from before this layout), oldest first"""
+        found = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.startswith("GMCapture_") and name.endswith(".jpg"):  # never anything else in the folder
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, stat.st_size, path))
+        found.sort()
+        self.files = deque(found)
+        self.total = sum(size for _, size, _ in found)
+
+    def _enforce(self):
+        """Deletes the oldest images while over the size cap or past the age limit"""
+        oldest_allowed = time.time() - self.max_days * 86400
+        deleted = 0
+        while self.files and (self.total > self.max_bytes or self.files[0][0] < oldest_allowed):
+            _, size, path = self.files.popleft()
+            self.total -= size
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            directory = os.path.dirname(path)
+            if directory != self.root and not os.listdir(directory):
+                os.rmdir(directory)
+        if deleted:
+            metrics.count("archive_deleted", deleted)
+
+    def usage(self):
+        """(images, bytes) currently in the archive as tracked by the writer"""
+        return (len(self.files), self.total) if self.files is not None else (None, None)
+
+    def close(self):
+        """Writes whatever is queued, then stops the writer"""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self.jobs.put(None)
+            worker.join()
@@ -1,25 +1,40 @@
-from picamera2 import Picamera2, Preview
 from datetime import datetime
+import threading
+import cv2
 import os
 
+try:
+    from picamera2 import Picamera2, Preview
+except ImportError:  # USB-only nodes (UsbCameraController) don't need the Pi camera stack
+    Picamera2 = Preview = None
+
+from GM_pipeline import metrics
+
 
 class CameraController:
-    def __init__(self, save_dir="", resolution=(3280, 2464)):
+    def __init__(self, save_dir="", resolution=(3280, 2464), persistent=False):
         # Upon making the instance, ensures it has a dir to save images
         self.save_dir = save_dir
         os.makedirs(self.save_dir, exist_ok=True)
 
         # Initializes camera
+        if Picamera2 is None:
+            raise RuntimeError("picamera2 is not installed; use a USB camera source instead.")
         self.picam2 = Picamera2()
         self.resolution = resolution
         self.running = False
 
+        # persistent: keep the camera configured and streaming between captures (no warm-up per shot)
+        self.persistent = persistent
+        self._lock = threading.Lock()  # meters sharing this camera capture from different threads
+
         print(f"Camera initialized. Set Resolution: {resolution[0]}x{resolution[1]}")
 
     def start(self):
         """Start the camera and capture the image"""
         if not self.running:
-            config = self.picam2.create_still_configuration(main_size=self.resolution)
+            # RGB888 is BGR in memory, i.e. frames are already in OpenCV channel order
+            config = self.picam2.create_still_configuration(main={"size": self.resolution, "format": "RGB888"})
             self.picam2.configure(config)
             self.picam2.start()
             self.running = True
@@ -32,6 +47,10 @@ class CameraController:
             self.running = False
             print("CAMERA OFF.")
 
+    def close(self):
+        """Stop the camera (archive images are written by RP_Camera/archive.py)"""
+        self.stop()
+
     def capture(self, filename=None):
         """Captures a single image and saves it to a file at 'filename'"""
 
@@ -47,13 +66,44 @@ class CameraController:
             os.makedirs(self.save_dir)
             print(f"Created directory: {self.save_dir}")
 
-        self.picam2.capture_file(filepath)
+        with metrics.timer("capture"):
+            self.picam2.capture_file(filepath)
         print(f"Captured image saved at: {filepath}")
 
-        self.stop()
+        if not self.persistent:
+            self.stop()
 
         return filepath, capture_time
 
+    def capture_array(self):
+        """Captures a single frame as a BGR numpy array, straight from the camera buffer (no JPEG)"""
+
+        with self._lock:
+            self.start()
+
+            capture_time = datetime.now()
+            with metrics.timer("capture"):
+                frame = self.picam2.capture_array("main")
+
+            if not self.persistent:
+                self.stop()
+
+        return frame, capture_time
+
+    def capture_burst(self, count):
+        """count frames in quick succession from one warm session; returns [(frame, capture_time)]"""
+        frames = []
+        with self._lock:
+            self.start()
+            with metrics.timer("capture_burst"):
+                for _ in range(count):
+                    frames.append((self.picam2.capture_array("main"), datetime.now()))
+
+            if not self.persistent:
+                self.stop()
+
+        return frames
+
     def set_resolution(self, width=3280, height=2464):
         """Manually set the resolution of the camera"""
 
@@ -61,7 +111,104 @@ class CameraController:
 
         self.resolution = (width, height)
         self.picam2.stop()
-        config = self.picam2.create_still_configuration(main={"size": self.resolution})
+        config = self.picam2.create_still_configuration(main={"size": self.resolution, "format": "RGB888"})
         self.picam2.configure(config)
         self.picam2.start()
+        self.running = True
         print(f"Resolution changed to {width}x{height}")
+
+
+class UsbCameraController(CameraController):
+    """Same interface as CameraController for a USB (V4L2) camera, read through OpenCV"""
+
+    def __init__(self, index=0, save_dir="", resolution=(1920, 1080), persistent=False):
+        self.save_dir = save_dir
+        os.makedirs(self.save_dir, exist_ok=True)
+
+        self.index = index
+        self.cap = None
+        self.resolution = resolution
+        self.running = False
+        self.persistent = persistent
+        self._lock = threading.Lock()
+
+        print(f"USB camera {index} initialized. Set Resolution: {resolution[0]}x{resolution[1]}")
+
+    def start(self):
+        if not self.running:
+            self.cap = cv2.VideoCapture(self.index)
+            if not self.cap.isOpened():
+                raise RuntimeError(f"Could not open USB camera {self.index}.")
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # keep the driver from handing out stale frames
+            self.running = True
+            print(f"USB CAMERA {self.index} ON.")
+
+    def stop(self):
+        if self.running:
+            self.cap.release()
+            self.cap = None
+            self.running = False
+            print(f"USB CAMERA {self.index} OFF.")
+
+    def capture_array(self):
+        """Captures a single BGR frame"""
+        with self._lock:
+            self.start()
+
+            capture_time = datetime.now()
+            with metrics.timer("capture"):
+                self.cap.grab()  # drop the frame buffered since the last capture
+                ok, frame = self.cap.read()
+
+            if not self.persistent:
+                self.stop()
+
+        if not ok:
+            raise RuntimeError(f"USB camera {self.index} returned no frame.")
+        return frame, capture_time
+
+    def capture_burst(self, count):
+        """count consecutive frames (after dropping the buffered one); returns [(frame, capture_time)]"""
+        frames = []
+        with self._lock:
+            self.start()
+            with metrics.timer("capture_burst"):
+                self.cap.grab()
+                for _ in range(count):
+                    ok, frame = self.cap.read()
+                    if not ok:
+                        break
+                    frames.append((frame, datetime.now()))
+
+            if not self.persistent:
+                self.stop()
+
+        if not frames:
+            raise RuntimeError(f"USB camera {self.index} returned no frame.")
+        return frames
+
+    def capture(self, filename=None):
+        """Captures a single image and saves it to a file at 'filename'"""
+        frame, capture_time = self.capture_array()
+        if filename is None:
+            filename = "GMCapture_" + capture_time.strftime("%Y%m%d_%H%M%S") + ".jpg"
+        filepath = os.path.join(self.save_dir, filename)
+        cv2.imwrite(filepath, frame)
+        print(f"Captured image saved at: {filepath}")
+        return filepath, capture_time
+
+    def set_resolution(self, width=1920, height=1080):
+        self.stop()
+        self.resolution = (width, height)
+        print(f"Resolution changed to {width}x{height}")
+
+
+def open_camera(source, save_dir="", persistent=True):
+    """A camera controller for a meter's camera source: "picamera" or "usb:<index>" """
+    if source == "picamera":
+        return CameraController(save_dir=save_dir, persistent=persistent)
+    if source.startswith("usb:"):
+        return UsbCameraController(int(source[4:]), save_dir=save_dir, persistent=persistent)
+    raise ValueError(f"Unknown camera source: {source}")
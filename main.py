@@ -1,56 +1,362 @@
 from pathlib import Path
-from time import sleep
+from time import monotonic
 import datetime
+import threading
 
-from RP_Camera.capture import CameraController
-from GM_reading.reading_main import r_main
-from GM_detection_cropping.detection_main import d_main
+from RP_Camera.capture import open_camera
+from RP_Camera.archive import ArchiveManager
+from GM_reading.reading_main import fuse_readings, read_frames, read_gauges, stop_reading_pool
+from GM_reading.temporal import assess, record
+from GM_detection_cropping.detection_main import crop_gauges, d_main
+from GM_detection_cropping.detectors import DetectorUnavailable
+from GM_detection_cropping import offline_queue
+from GM_data.db_setup import initialize_database
 from GM_data.db_utilities import *
+from GM_pipeline.scheduler import ReadingPipeline
+from GM_pipeline.meter_scheduler import MeterScheduler
+from GM_pipeline.adaptive import AdaptiveSchedule, schedule_settings
+from GM_pipeline import node_api
+from GM_pipeline import metrics
+from GM_data.sync import replicated_id, start_sync_server
+from GM_data.rollups import start_retention
 
 
-period = 15  # seconds
+period = 15  # seconds between readings when adaptive_schedule is off
+adaptive_schedule = True  # probe faster while the last dial moves, back off while idle (intervals: settings table)
 gauge_type = 5  # number of gauges to read
+location = "test_meter"  # meter name, also keys the cached gauge layout and dial geometry
 debug = False  # output images of the deciphering process
+parallel_reading = True  # read the dials concurrently on a persistent process pool
+detector_backend = "roboflow"  # "roboflow" (hosted API), "hough" or "onnx" (local, works offline)
+reading_engine = "hough"  # needle finder: "hough" (HoughLinesP) or "radial" (angular profile, faster, has a confidence)
+archive_frames = True  # archive an image per reading in the background (False = no disk writes)
+archive_success = "crops"  # image kept for trusted, confident readings: "crops", "small" (downscaled) or "full"
+archive_confidence = 0.6  # below this (or not trusted) the full frame is kept
+pipelined = True  # overlap capture/detect/read/store on a fixed-rate schedule instead of one cycle at a time
+drop_policy = "drop_oldest"  # when a stage falls behind: "drop_oldest", "drop_newest" or "block"
+burst_frames = 4  # most frames fused into one reading (1 = read single frames)
+burst_first = 2  # frames captured back to back per reading, at least 2 to fuse; more follow while the dials disagree
+recapture_confidence = 0.1  # re-capture right away (instead of next period) below this reading confidence
+max_recaptures = 2  # extra captures per period for rejected or low-confidence readings
+metrics_target = "sqlite"  # stage timings/counters every metrics.EXPORT_INTERVAL s: "sqlite", a .jsonl path or None
+profile_first_cycle = False  # write a cProfile + tracemalloc report of one full cycle to profile_dir
+sync_port = 8471  # serve readings to the central server's incremental pull on this port (None = off)
+api_port = 8472  # node HTTP API: latest reading, history, timings, health, read now (None = off)
+
+# Meters read by this node; missing keys fall back to the single-meter settings above
+#   location    meter name (keys its readings, cached layout/geometry and offline queue)
+#   camera      "picamera" or "usb:<index>"; meters in one camera's view share the camera
+#   gauge_type  number of dials
+#   directions  "cw"/"ccw" per dial, least significant first (None = alternating, ccw first)
+#   roi         [x, y, w, h] of the frame that holds this meter (None = the whole frame)
+#   period      seconds between readings (when adaptive_schedule is off)
+meters = [
+    {"location": location, "camera": "picamera"},
+    # {"location": "basement_2", "camera": "usb:0", "gauge_type": 4, "directions": ["cw", "ccw", "cw", "ccw"],
+    #  "roi": [640, 0, 1280, 1080], "period": 60},
+]
+meter_workers = 2  # reading cycles run at once when several meters are configured (dials share one reading pool)
 
 # Define directories
 base_dir = Path(__file__).resolve().parent
 img_dir = base_dir / "GM_captured_images"  # "GM_captured_images" or "GM_sample_images" for testing
+profile_dir = base_dir / "GM_profiles"
 
+schedules = {}  # location -> AdaptiveSchedule
+requested = set()  # locations whose next capture is read whatever the probe says ("read now")
+wakers = {}  # location -> callable that makes the meter capture now (set by the running loop/pipeline/scheduler)
+read_now = threading.Event()  # wakes the single-meter loop
 
-def reading_loop():
-    camera = CameraController(save_dir=str(img_dir))
+# Tiered, deduplicated, size/age-capped image archive (see RP_Camera/archive.py)
+archive = ArchiveManager(img_dir)
 
-    try:
-        filename, capture_time = camera.capture()
 
-        # Build file path string for processing
-        filepath = img_dir / filename  # filename or "GM5.png" for testing
-        image_path = str(filepath)
+def meter_config(meter):
+    """A meters entry with the single-meter settings filled in"""
+    return dict({"camera": "picamera", "gauge_type": gauge_type, "directions": None, "roi": None, "period": period},
+                **meter)
+
+
+def meter_view(meter, frame):
+    """The part of the frame that holds this meter"""
+    if meter["roi"] is None:
+        return frame
+    x, y, w, h = meter["roi"]
+    return frame[y:y + h, x:x + w]
+
+
+def schedule_for(meter):
+    if meter["location"] not in schedules:
+        schedules[meter["location"]] = AdaptiveSchedule(meter["location"])
+    return schedules[meter["location"]]
+
+
+def probe(meter, frame):
+    """Whether this frame gets read; with adaptive_schedule it also sets the meter's next interval"""
+    forced = meter["location"] in requested
+    requested.discard(meter["location"])
+    if not adaptive_schedule:
+        return True
+    return schedule_for(meter).should_read(meter_view(meter, frame), force=forced)
+
+
+def next_interval(meter):
+    return schedule_for(meter).next_interval() if adaptive_schedule else meter["period"]
+
+
+def request_reading(location=None):
+    """Node API "read now": the meter (None = every meter) captures and reads right away; returns the locations"""
+    locations = [m["location"] for m in meters if location in (None, m["location"])]
+    for loc in locations:
+        requested.add(loc)
+        if loc in wakers:
+            wakers[loc]()
+    return locations
+
+
+def node_health():
+    """Node API /health details: expected reading interval and offline backlog per meter, archive size"""
+    status = {}
+    for meter in map(meter_config, meters):
+        expected = schedule_settings()[0] if adaptive_schedule else meter["period"]
+        status[meter["location"]] = {"expected_interval": expected,
+                                     "offline_backlog": offline_queue.backlog(meter["location"])}
+    images, size = archive.usage()
+    return {"meters": status, "archive": {"images": images, "bytes": size}}
+
+
+def archive_frame(meter, frame, capture_time, result, decision, crops=None):
+    """Queues the frame's archive image; returns its path (None when not archived)"""
+    if not archive_frames:
+        return None
+    confident = decision["status"] in TRUSTED_STATUSES and result["confidence"] >= archive_confidence
+    tier = archive_success if confident else "full"
+    return archive.archive(frame, capture_time, meter["location"], tier, crops=crops, reading=decision["reading"])
+
+
+def detect_frame(meter, frame):
+    return d_main(meter_view(meter, frame), meter["gauge_type"], debug, detector=detector_backend,
+                  location=meter["location"], return_boxes=True)
+
+
+def read_crops(meter, cropped_gauges, boxes):
+    return read_gauges(cropped_gauges, meter["gauge_type"], debug, parallel=parallel_reading, engine=reading_engine,
+                       location=meter["location"], box_confidences=[b.get("confidence") for b in boxes],
+                       directions=meter["directions"])
+
+
+def capture_burst(camera):
+    """The rest of a reading's first burst, captured right after its first frame"""
+    return [f for f, _ in camera.capture_burst(burst_first - 1)] if burst_frames > 1 and burst_first > 1 else []
+
+
+def read_burst(meter, camera, frames, cropped_gauges, boxes):
+    """
+    Reads the dials of every frame (the first one's crops and boxes are given) and fuses their needle
+    angles; while the dials disagree, captures more frames up to burst_frames. Returns the fused result.
+    """
+    if len(frames) < 2 or not boxes:
+        return read_crops(meter, cropped_gauges, boxes)
+    crops_of = lambda f: crop_gauges(meter_view(meter, f), boxes, False)  # fixed mount: the first frame's boxes
+    crop_sets = [cropped_gauges] + [crops_of(f) for f in frames[1:]]
+    frame_results = []
+    while True:
+        frame_results += read_frames(crop_sets, meter["gauge_type"], parallel=parallel_reading, engine=reading_engine,
+                                     location=meter["location"], directions=meter["directions"])
+        result = fuse_readings(frame_results, meter["gauge_type"], [b.get("confidence") for b in boxes],
+                               meter["directions"])
+        if result["agreed"] or len(frame_results) >= burst_frames:
+            metrics.count(f"burst_frames_{len(frame_results)}")
+            return result
+        more = camera.capture_burst(min(burst_first, burst_frames - len(frame_results)))
+        crop_sets = [crops_of(f) for f, _ in more]
+
 
-        # Crops and orders all detected gauges on image
-        cropped_gauges = d_main(image_path, gauge_type, debug)
+def read_frame(meter, frame):
+    """Detects and reads one frame; returns the read_gauges result (reading, confidence, dials)"""
+    return read_crops(meter, *detect_frame(meter, frame))
 
-        # Reads each gauge in order
-        final_reading = r_main(cropped_gauges, gauge_type, debug)
 
-        print(f"\n[{capture_time.strftime('%Y-%m-%d %H:%M:%S')}] " f"Final reading: {final_reading} Cubic Feet.")
+def needs_recapture(result, decision):
+    return decision["status"] == "rejected" or result["confidence"] < recapture_confidence
 
-        # Add readings to data log
-        add_reading(final_reading, timestamp=capture_time, location="test_meter", confidence=None, image_path=image_path, status="success")
 
+def store_reading(meter, result, decision, capture_time, frame, crops=None):
+    location = meter["location"]
+    image_path = archive_frame(meter, frame, capture_time, result, decision, crops)
+    record(location, decision, capture_time)
+    metrics.count(f"readings_{decision['status']}")
+    print(f"\n[{capture_time.strftime('%Y-%m-%d %H:%M:%S')}] {location}: Final reading: {decision['reading']} Cubic Feet "
+          f"({decision['status']}, confidence {result['confidence']:.2f}).")
+
+    # Add readings to data log (batched; written on size/time or at shutdown)
+    queue_reading(decision["reading"], timestamp=capture_time, location=location, confidence=result["confidence"],
+                  image_path=image_path, status=decision["status"], notes=decision["notes"])
+    node_api.publish(location, {"timestamp": capture_time.isoformat(timespec="seconds"), "reading": decision["reading"],
+                                "confidence": result["confidence"], "status": decision["status"],
+                                "image_path": image_path, "notes": decision["notes"]})
+    metrics.maybe_export(metrics_target)
+
+
+def defer_frame(meter, frame, capture_time):
+    """
+    Queues the frame if the detector is (still) unreachable and reads the oldest queued frames;
+    returns False when the frame should be read now
+    """
+    location = meter["location"]
+    if not offline_queue.backlog(location):
+        return False
+
+    def read_queued(queued_frame, queued_time, _image_path):
+        crops, boxes = detect_frame(meter, queued_frame)
+        result = read_crops(meter, crops, boxes)
+        store_reading(meter, result, assess(location, result, queued_time), queued_time, queued_frame, crops)
+
+    # Readings are stored in capture order, so this frame waits behind the queued ones
+    offline_queue.enqueue(frame, capture_time, location)
+    offline_queue.drain(location, read_queued)
+    return True
+
+
+def reading_loop(meter, camera):
+    try:
+        with metrics.timer("cycle"):
+            reading_cycle(meter, camera)
     except Exception as e:
+        metrics.count("cycle_failures")
         print(f"Error during reading cycle: {e}")
 
-    finally:
-        # Ensure camera resources are released properly
+
+def reading_cycle(meter, camera):
+    location = meter["location"]
+    for attempt in range(max_recaptures + 1):
+        # Frame stays in memory; its archive image is picked once the reading is known
+        frame, capture_time = camera.capture_array()
+        if attempt == 0 and not probe(meter, frame):
+            return  # meter idle: nothing new to read
+        burst = capture_burst(camera)
+        if defer_frame(meter, frame, capture_time):
+            return
+
+        # Crops, orders and reads all gauges on the image, then checks against the last reading
+        try:
+            crops, boxes = detect_frame(meter, frame)
+        except DetectorUnavailable as e:
+            print(f"⚠️ {e}; reading this frame once the detector is back.")
+            offline_queue.enqueue(frame, capture_time, location)
+            return
+        result = read_burst(meter, camera, [frame] + burst, crops, boxes)
+        decision = assess(location, result, capture_time)
+        if attempt == max_recaptures or not needs_recapture(result, decision):
+            break
+        metrics.count("recaptures")
+        print(f"⚠️ Unreliable reading ({decision['status']}, confidence {result['confidence']:.2f}); re-capturing.")
+
+    store_reading(meter, result, decision, capture_time, frame, crops)
+
+
+def build_pipeline(meter, camera):
+    """The reading_loop steps of one meter as pipeline stages; each one fills in the job dict"""
+    location = meter["location"]
+
+    def capture(job):
+        job["frame"], job["capture_time"] = camera.capture_array()
+        if "attempt" not in job and not probe(meter, job["frame"]):
+            return None  # meter idle: nothing new to read (re-captures are always read)
+        job["burst"] = capture_burst(camera)
+        return job
+
+    def detect(job):
+        frame = job["frame"]  # kept until store picks its archive image
+        if defer_frame(meter, frame, job["capture_time"]):
+            return None
         try:
-            camera.stop()
-        except Exception:
-            pass
+            job["gauges"], job["boxes"] = detect_frame(meter, frame)
+        except DetectorUnavailable as e:
+            print(f"⚠️ {e}; reading this frame once the detector is back.")
+            offline_queue.enqueue(frame, job["capture_time"], location)
+            return None
+        return job
+
+    def read(job):
+        job["result"] = read_burst(meter, camera, [job["frame"]] + job.pop("burst"), job["gauges"], job.pop("boxes"))
+        return job
+
+    def store(job):
+        decision = assess(location, job["result"], job["capture_time"])
+        attempt = job.get("attempt", 0)
+        if attempt < max_recaptures and needs_recapture(job["result"], decision):
+            # Re-capture now instead of waiting a whole period; this read is superseded
+            if pipeline.trigger(attempt=attempt + 1):
+                metrics.count("recaptures")
+                print(f"⚠️ Unreliable reading ({decision['status']}, confidence {job['result']['confidence']:.2f}); "
+                      f"re-capturing.")
+                return job
+        store_reading(meter, job["result"], decision, job["capture_time"], job.pop("frame"), job.pop("gauges"))
+        metrics.record("cycle", monotonic() - job["scheduled"])  # tick to stored reading
+        return job
+
+    pipeline = ReadingPipeline(capture, detect, read, store, meter["period"], drop_policy=drop_policy,
+                               interval=(lambda: next_interval(meter)) if adaptive_schedule else None)
+    wakers[location] = pipeline.trigger
+    return pipeline
 
 
 if __name__ == "__main__":
-    while True:
-        reading_loop()
-        sleep(period)
-        break
+    if burst_frames > 1 and burst_first < 2:
+        # A one-frame first burst never reaches read_burst's fusion, so burst reading would be silently off
+        raise ValueError(f"burst_first must be at least 2 when burst_frames > 1 (got {burst_first}); "
+                         f"set burst_frames = 1 to read single frames")
+    initialize_database()  # creates/upgrades tables in place; existing readings are kept
+    configured = [meter_config(m) for m in meters]
+    # One warm session per camera for the whole run (instead of a configure/start/stop per reading),
+    # shared by every meter in its view
+    cameras = {}
+    sync_server = start_sync_server(sync_port) if sync_port else None
+    # Daily, in the background: thin out raw readings the rollups summarize (and the master already holds)
+    retention = start_retention(replicated=replicated_id if sync_port else None)
+    for meter in configured:
+        node_api.seed_history(meter["location"])  # the API serves history from memory from here on
+    api = node_api.start_node_api(api_port, trigger=request_reading, health=node_health) if api_port else None
+    try:
+        for meter in configured:
+            if meter["camera"] not in cameras:
+                cameras[meter["camera"]] = open_camera(meter["camera"], save_dir=str(img_dir), persistent=True)
+
+        meter, camera = configured[0], cameras[configured[0]["camera"]]
+        if profile_first_cycle:
+            metrics.profile_cycle(lambda: reading_loop(meter, camera), profile_dir)
+        if len(configured) > 1:
+            # Each meter reads one cycle at a time; meters run side by side on shared workers
+            scheduler = MeterScheduler(configured, lambda m: reading_cycle(m, cameras[m["camera"]]),
+                                       workers=meter_workers, interval=next_interval if adaptive_schedule else None)
+            for m in configured:
+                wakers[m["location"]] = lambda location=m["location"]: scheduler.trigger(location)
+            print(f"Meter scheduler stopped: {scheduler.run()}")
+        elif pipelined:
+            stats = build_pipeline(meter, camera).run()
+            print(f"Pipeline stopped: {stats}")
+        else:
+            while True:
+                wakers[meter["location"]] = read_now.set
+                reading_loop(meter, camera)
+                read_now.wait(next_interval(meter))  # or until a "read now" request
+                read_now.clear()
+                break
+    finally:
+        archive.close()  # writes the images still queued
+        # Ensure camera resources are released properly
+        for camera in cameras.values():
+            try:
+                camera.close()
+            except Exception:
+                pass
+        retention.set()
+        if sync_server is not None:
+            sync_server.shutdown()
+        if api is not None:
+            api.shutdown()
+        stop_reading_pool()
+        if metrics_target:
+            metrics.export(metrics_target)  # the last partial interval
+        close_database()  # flush any queued readings